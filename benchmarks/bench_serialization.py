@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Per-document cost of rendering a GET /posts page.
+
+Compares the model pipeline (Post -> PostResponse -> response_model validation ->
+jsonable_encoder -> json) with the raw-document pipeline (render_post -> orjson).
+No database is needed.
+
+Usage:
+    python benchmarks/bench_serialization.py [--docs 500] [--rounds 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from api.endpoints.post.model import Post
+from api.endpoints.post.router import render_post, to_post_response
+from api.endpoints.post.schemas import PostPage
+from api.utilities import dumps
+
+
+def make_documents(count: int) -> list:
+    user_id = ObjectId()
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "title": f"Post number {index}",
+            "upvotes": index % 97,
+            "downvotes": index % 13,
+            "created_at": datetime.utcnow(),
+            "comment_id": ObjectId() if index % 2 else None,
+        }
+        for index in range(count)
+    ]
+
+
+def render_with_models(docs: list) -> bytes:
+    page = PostPage(items=[to_post_response(Post(**doc)) for doc in docs], next_cursor=None)
+    # FastAPI re-validates the return value against response_model before encoding it
+    validated = PostPage.model_validate(page.model_dump())
+    return json.dumps(jsonable_encoder(validated), separators=(",", ":")).encode("utf-8")
+
+
+def render_raw(docs: list) -> bytes:
+    return dumps({"items": [render_post(doc) for doc in docs], "next_cursor": None})
+
+
+def measure(render, docs: list, rounds: int) -> float:
+    """Return microseconds per document (best of `rounds`)."""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        render(docs)
+        best = min(best, time.perf_counter() - started)
+    return best / len(docs) * 1e6
+
+
+def run(docs_count: int = 500, rounds: int = 50) -> dict:
+    docs = make_documents(docs_count)
+    before = measure(render_with_models, docs, rounds)
+    after = measure(render_raw, docs, rounds)
+    return {
+        "docs": docs_count,
+        "models_us_per_doc": round(before, 3),
+        "raw_orjson_us_per_doc": round(after, 3),
+        "speedup": round(before / after, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.docs, args.rounds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Fan-out of one topic's events to many subscribers through the in-process event broker.
+
+Every subscriber listens on the same topic, as the connections watching one busy post
+would. Fast subscribers consume in a task of their own; slow ones never read, so they
+are dropped once their queue is full. Events are published one at a time, each after
+the previous one reached every fast subscriber. No database or server is needed.
+
+Reported:
+    deliver   time of the publishing `deliver` call, i.e. what a write request pays
+    fan_out   time until an event reached every fast subscriber
+    delivery  time from publishing to each subscriber receiving the event
+
+Usage:
+    python benchmarks/fanout.py [--subscribers 10000] [--events 300] [--slow-fraction 0.01]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from stats import add_report_arguments, finish, summarize
+
+from api.utilities import Event, EventBroker, Subscription, settings, topic
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "fanout.json")
+
+TOPIC = topic("post", "benchmark")
+
+
+class Progress:
+    """Counts the fast subscribers still to receive the current event."""
+
+    def __init__(self):
+        self.remaining = 0
+        self.done = asyncio.Event()
+
+    def expect(self, count: int) -> None:
+        self.remaining = count
+        self.done.clear()
+
+    def arrived(self) -> None:
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.done.set()
+
+
+async def consume(subscription: Subscription, sent: List[float], latencies: List[float], progress: Progress) -> None:
+    while True:
+        event = await subscription.get()
+        if event is None:
+            return
+        latencies.append(time.perf_counter() - sent[int(event.message)])
+        progress.arrived()
+
+
+async def fan_out(subscribers: int, events: int, queue_size: int, slow_fraction: float) -> Dict[str, Dict[str, Any]]:
+    broker = EventBroker(queue_size)
+    slow = int(subscribers * slow_fraction)
+    fast = subscribers - slow
+    sent: List[float] = []
+    delivery_latencies: List[float] = []
+    progress = Progress()
+    consumers = [
+        asyncio.create_task(consume(broker.subscribe([TOPIC]), sent, delivery_latencies, progress))
+        for _ in range(fast)
+    ]
+    for _ in range(slow):
+        broker.subscribe([TOPIC])
+    # Let every consumer reach its first wait
+    await asyncio.sleep(0)
+
+    deliver_latencies: List[float] = []
+    fan_out_latencies: List[float] = []
+    started = time.perf_counter()
+    for index in range(events):
+        progress.expect(fast)
+        sent.append(time.perf_counter())
+        broker.deliver(Event("comment.created", (TOPIC,), str(index)))
+        deliver_latencies.append(time.perf_counter() - sent[index])
+        if fast:
+            await progress.done.wait()
+        fan_out_latencies.append(time.perf_counter() - sent[index])
+    elapsed = time.perf_counter() - started
+
+    broker.close_all()
+    await asyncio.gather(*consumers)
+    return {
+        "deliver": summarize(deliver_latencies, elapsed),
+        "fan_out": {**summarize(fan_out_latencies, elapsed), "dropped_subscribers": broker.dropped},
+        "delivery": summarize(delivery_latencies, elapsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=300)
+    parser.add_argument("--queue-size", type=int, default=settings.events_queue_size, help="events buffered per subscriber")
+    parser.add_argument("--slow-fraction", type=float, default=0.01, help="share of subscribers that never read")
+    add_report_arguments(parser, DEFAULT_BASELINE)
+    args = parser.parse_args()
+
+    results = asyncio.run(fan_out(args.subscribers, args.events, args.queue_size, args.slow_fraction))
+    config = {
+        "subscribers": args.subscribers,
+        "events": args.events,
+        "queue_size": args.queue_size,
+        "slow_fraction": args.slow_fraction,
+    }
+    sys.exit(finish(results, config, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""HTTP load driver exercising every API route with a read-heavy mix.
+
+Needs a running server over a database filled by `seed.py`; sample IDs are read
+from MongoDB up front. With `--bootstrap-users` the driver instead creates its own
+data through the API, e.g. against the in-memory storage backend. Writes only touch
+users, posts and comments the driver created itself, so the seeded data set stays
+stable across runs.
+
+Usage:
+    python benchmarks/load.py --url http://localhost:8000 --concurrency 64 --duration 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from seed import MANIFEST_COLLECTION, PASSWORD
+from stats import add_report_arguments, finish, summarize
+
+from api.utilities import settings
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "load.json")
+
+# Documents of each kind sampled from the database to pick request targets from
+SAMPLE_SIZE = 2000
+
+# Items per batch-create and ids-lookup request
+BATCH_ITEMS = 20
+
+
+class State:
+    """Sampled IDs, login tokens and the resources created during the run."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.user_ids: List[str] = []
+        self.emails: List[str] = []
+        self.post_ids: List[str] = []
+        self.comment_ids: List[str] = []
+        self.tokens: List[Tuple[str, str]] = []  # (user_id, token)
+        self.password = ""
+        self.created_users: List[str] = []
+        self.created_posts: List[str] = []  # Posts without a comment yet
+        self.commented_posts: List[str] = []
+        self.created_comments: List[str] = []
+        self.etags: Dict[str, str] = {}  # Last ETag seen per polled URL
+
+    def pick(self, values: List[str]) -> str:
+        return self.rng.choice(values)
+
+    def pop(self, values: List[str]) -> Optional[str]:
+        return values.pop(self.rng.randrange(len(values))) if values else None
+
+    def auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.rng.choice(self.tokens)[1]}"}
+
+
+# Sends one request and returns it, or None when there is nothing to act on
+Send = Callable[[httpx.AsyncClient, State], Awaitable[Optional[httpx.Response]]]
+
+
+class Operation(NamedTuple):
+    method: str
+    route: str
+    weight: int
+    send: Send
+    expected: Tuple[int, ...]  # Error statuses that are valid answers
+
+
+OPERATIONS: Dict[str, Operation] = {}
+
+
+def operation(name: str, method: str, route: str, weight: int, expected: Tuple[int, ...] = ()):
+    def _decorator(send: Send) -> Send:
+        OPERATIONS[name] = Operation(method, route, weight, send, expected)
+        return send
+    return _decorator
+
+
+# --- Reads --------------------------------------------------------------------
+
+@operation("get_post", "GET", "/api/posts/{post_id}", 120)
+async def get_post(client, state):
+    return await client.get(f"/api/posts/{state.pick(state.post_ids)}")
+
+
+@operation("poll_post", "GET", "/api/posts/{post_id}", 40)
+async def poll_post(client, state):
+    # Polling client revalidating its copy; mostly answered with 304
+    url = f"/api/posts/{state.pick(state.post_ids[:BATCH_ITEMS])}"
+    etag = state.etags.get(url)
+    response = await client.get(url, headers={"If-None-Match": etag} if etag else None)
+    if "etag" in response.headers:
+        state.etags[url] = response.headers["etag"]
+    return response
+
+
+@operation("get_post_fields", "GET", "/api/posts/{post_id}", 20)
+async def get_post_fields(client, state):
+    return await client.get(f"/api/posts/{state.pick(state.post_ids)}", params={"fields": "id,title,upvotes"})
+
+
+@operation("list_posts", "GET", "/api/posts", 40)
+async def list_posts(client, state):
+    return await client.get("/api/posts", params={"limit": 20})
+
+
+@operation("lookup_posts", "GET", "/api/posts", 20)
+async def lookup_posts(client, state):
+    ids = state.rng.sample(state.post_ids, BATCH_ITEMS)
+    return await client.get("/api/posts", params={"ids": ",".join(ids)})
+
+
+@operation("user_posts", "GET", "/api/users/{user_id}/posts", 30)
+async def user_posts(client, state):
+    return await client.get(f"/api/users/{state.pick(state.user_ids)}/posts", params={"limit": 20})
+
+
+@operation("get_user", "GET", "/api/users/{user_id}", 40)
+async def get_user(client, state):
+    return await client.get(f"/api/users/{state.pick(state.user_ids)}")
+
+
+@operation("lookup_users", "GET", "/api/users", 10)
+async def lookup_users(client, state):
+    ids = state.rng.sample(state.user_ids, BATCH_ITEMS)
+    return await client.get("/api/users", params={"ids": ",".join(ids)})
+
+
+@operation("get_comment", "GET", "/api/comments/{comment_id}", 40)
+async def get_comment(client, state):
+    return await client.get(f"/api/comments/{state.pick(state.comment_ids)}")
+
+
+# Only some posts have a comment, so a 404 is a valid answer
+@operation("post_comment", "GET", "/api/posts/{post_id}/comment", 30, expected=(404,))
+async def post_comment(client, state):
+    return await client.get(f"/api/posts/{state.pick(state.post_ids)}/comment")
+
+
+@operation("list_comments", "GET", "/api/comments", 20)
+async def list_comments(client, state):
+    return await client.get("/api/comments", params={"limit": 20})
+
+
+@operation("lookup_comments", "GET", "/api/comments", 10)
+async def lookup_comments(client, state):
+    ids = state.rng.sample(state.post_ids, BATCH_ITEMS)
+    return await client.get("/api/comments", params={"post_ids": ",".join(ids)})
+
+
+@operation("user_comments", "GET", "/api/users/{user_id}/comments", 20)
+async def user_comments(client, state):
+    return await client.get(f"/api/users/{state.pick(state.user_ids)}/comments", params={"limit": 20})
+
+
+@operation("feed", "GET", "/api/feed", 60)
+async def feed(client, state):
+    return await client.get("/api/feed", params={"limit": 20, "sort": state.rng.choice(("created_at", "score"))})
+
+
+@operation("user_feed", "GET", "/api/users/{user_id}/feed", 20)
+async def user_feed(client, state):
+    return await client.get(f"/api/users/{state.pick(state.user_ids)}/feed", params={"limit": 20})
+
+
+@operation("metrics", "GET", "/metrics", 1)
+async def metrics(client, state):
+    return await client.get("/metrics")
+
+
+# --- Writes -------------------------------------------------------------------
+# Updates may race a concurrent delete of the same resource, so they accept a 404
+
+@operation("login", "POST", "/api/auth/login", 5)
+async def login(client, state):
+    index = state.rng.randrange(len(state.emails))
+    return await client.post("/api/auth/login", json={"email": state.emails[index], "password": state.password})
+
+
+@operation("upvote", "POST", "/api/posts/{post_id}/upvote", 40)
+async def upvote(client, state):
+    return await client.post(f"/api/posts/{state.pick(state.post_ids)}/upvote", json={}, headers=state.auth())
+
+
+@operation("downvote", "POST", "/api/posts/{post_id}/downvote", 15)
+async def downvote(client, state):
+    return await client.post(f"/api/posts/{state.pick(state.post_ids)}/downvote", json={}, headers=state.auth())
+
+
+@operation("create_user", "POST", "/api/users", 3)
+async def create_user(client, state):
+    name = f"load-{uuid.uuid4().hex[:16]}"
+    response = await client.post(
+        "/api/users", json={"username": name, "email": f"{name}@bench.io", "password": state.password}
+    )
+    if response.status_code == 201:
+        state.created_users.append(response.json()["id"])
+    return response
+
+
+@operation("update_user", "PUT", "/api/users/{user_id}", 2, expected=(404,))
+async def update_user(client, state):
+    if not state.created_users:
+        return None
+    name = f"load-{uuid.uuid4().hex[:16]}"
+    return await client.put(f"/api/users/{state.pick(state.created_users)}", json={"username": name})
+
+
+@operation("delete_user", "DELETE", "/api/users/{user_id}", 1)
+async def delete_user(client, state):
+    user_id = state.pop(state.created_users)
+    return await client.delete(f"/api/users/{user_id}") if user_id else None
+
+
+@operation("create_post", "POST", "/api/posts", 15)
+async def create_post(client, state):
+    response = await client.post("/api/posts", json={"title": "Load test post"}, headers=state.auth())
+    if response.status_code == 201:
+        state.created_posts.append(response.json()["id"])
+    return response
+
+
+@operation("create_posts_batch", "POST", "/api/posts:batch", 2)
+async def create_posts_batch(client, state):
+    items = [{"title": f"Batch post {index}"} for index in range(BATCH_ITEMS)]
+    response = await client.post("/api/posts:batch", json={"items": items}, headers=state.auth())
+    if response.status_code == 200:
+        state.created_posts.extend(result["id"] for result in response.json()["results"] if result.get("id"))
+    return response
+
+
+@operation("update_post", "PUT", "/api/posts/{post_id}", 5, expected=(404,))
+async def update_post(client, state):
+    if not state.created_posts:
+        return None
+    return await client.put(f"/api/posts/{state.pick(state.created_posts)}", json={"title": "Edited load test post"})
+
+
+@operation("delete_post", "DELETE", "/api/posts/{post_id}", 3)
+async def delete_post(client, state):
+    post_id = state.pop(state.commented_posts) or state.pop(state.created_posts)
+    return await client.delete(f"/api/posts/{post_id}") if post_id else None
+
+
+@operation("create_comment", "POST", "/api/comments", 8)
+async def create_comment(client, state):
+    post_id = state.pop(state.created_posts)
+    if post_id is None:
+        return None
+    response = await client.post(
+        "/api/comments", json={"title": "Load test comment", "post_id": post_id}, headers=state.auth()
+    )
+    if response.status_code == 201:
+        state.created_comments.append(response.json()["id"])
+        state.commented_posts.append(post_id)
+    return response
+
+
+@operation("create_comments_batch", "POST", "/api/comments:batch", 1)
+async def create_comments_batch(client, state):
+    post_ids = [state.pop(state.created_posts) for _ in range(min(BATCH_ITEMS, len(state.created_posts)))]
+    if not post_ids:
+        return None
+    items = [{"title": "Batch comment", "post_id": post_id} for post_id in post_ids]
+    response = await client.post("/api/comments:batch", json={"items": items}, headers=state.auth())
+    if response.status_code == 200:
+        for result in response.json()["results"]:
+            if result.get("id"):
+                state.created_comments.append(result["id"])
+                state.commented_posts.append(post_ids[result["index"]])
+    return response
+
+
+@operation("update_comment", "PUT", "/api/comments/{comment_id}", 3, expected=(404,))
+async def update_comment(client, state):
+    if not state.created_comments:
+        return None
+    return await client.put(f"/api/comments/{state.pick(state.created_comments)}", json={"title": "Edited comment"})
+
+
+# Deleting a post removes its comment in the background, so the comment may be gone already
+@operation("delete_comment", "DELETE", "/api/comments/{comment_id}", 2, expected=(404,))
+async def delete_comment(client, state):
+    comment_id = state.pop(state.created_comments)
+    return await client.delete(f"/api/comments/{comment_id}") if comment_id else None
+
+
+# --- Driver -------------------------------------------------------------------
+
+def load_samples(state: State, mongodb_url: str, database: str) -> None:
+    client = MongoClient(mongodb_url)
+    db = client[database]
+    manifest = db[MANIFEST_COLLECTION].find_one({"_id": "manifest"})
+    if manifest is None:
+        raise SystemExit(f"No seed manifest in {database}.{MANIFEST_COLLECTION}; run seed.py first")
+    state.password = manifest["password"]
+
+    def _sample(collection: str, projection: Dict[str, int]) -> List[Dict[str, Any]]:
+        return list(db[collection].aggregate([{"$sample": {"size": SAMPLE_SIZE}}, {"$project": projection}]))
+
+    users = _sample("users", {"email": 1})
+    state.user_ids = [str(doc["_id"]) for doc in users]
+    state.emails = [doc["email"] for doc in users]
+    state.post_ids = [str(doc["_id"]) for doc in _sample("posts", {"_id": 1})]
+    state.comment_ids = [str(doc["_id"]) for doc in _sample("comments", {"_id": 1})]
+    client.close()
+    if min(len(state.user_ids), len(state.post_ids), len(state.comment_ids)) < BATCH_ITEMS:
+        raise SystemExit("The seeded data set is too small; seed more users, posts and comments")
+
+
+async def bootstrap(client: httpx.AsyncClient, state: State, users: int, posts_per_user: int) -> None:
+    """Create users, posts and comments through the API, for servers without a seeded database."""
+    state.password = PASSWORD
+    run = uuid.uuid4().hex[:8]
+
+    async def _user(index: int) -> None:
+        name = f"bench-{run}-{index}"
+        email = f"{name}@bench.io"
+        response = await client.post("/api/users", json={"username": name, "email": email, "password": PASSWORD})
+        response.raise_for_status()
+        user_id = response.json()["id"]
+        response = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        items = [{"title": f"Bootstrap post {number}"} for number in range(posts_per_user)]
+        response = await client.post("/api/posts:batch", json={"items": items}, headers=headers)
+        response.raise_for_status()
+        post_ids = [result["id"] for result in response.json()["results"] if result.get("id")]
+        # Comment on every other post
+        items = [{"title": "Bootstrap comment", "post_id": post_id} for post_id in post_ids[::2]]
+        response = await client.post("/api/comments:batch", json={"items": items}, headers=headers)
+        response.raise_for_status()
+        state.user_ids.append(user_id)
+        state.emails.append(email)
+        state.tokens.append((user_id, headers["Authorization"].split()[1]))
+        state.post_ids.extend(post_ids)
+        state.comment_ids.extend(result["id"] for result in response.json()["results"] if result.get("id"))
+
+    await asyncio.gather(*(_user(index) for index in range(users)))
+    if min(len(state.user_ids), len(state.post_ids), len(state.comment_ids)) < BATCH_ITEMS:
+        raise SystemExit(f"Bootstrap too small; use at least {BATCH_ITEMS} users")
+
+
+async def log_in(client: httpx.AsyncClient, state: State, count: int) -> None:
+    for index in range(min(count, len(state.emails))):
+        response = await client.post(
+            "/api/auth/login", json={"email": state.emails[index], "password": state.password}
+        )
+        response.raise_for_status()
+        state.tokens.append((state.user_ids[index], response.json()["access_token"]))
+
+
+async def uncovered_routes(client: httpx.AsyncClient) -> List[str]:
+    """Routes in the OpenAPI schema that no operation exercises."""
+    schema = (await client.get("/openapi.json")).json()
+    exposed = {
+        (method.upper(), path) for path, methods in schema["paths"].items() for method in methods
+    }
+    covered = {(spec.method, spec.route) for spec in OPERATIONS.values()}
+    return sorted(f"{method} {path}" for method, path in exposed - covered)
+
+
+async def drive(
+    client: httpx.AsyncClient, state: State, duration: float, concurrency: int
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    names = list(OPERATIONS)
+    weights = [OPERATIONS[name].weight for name in names]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def _worker() -> None:
+        while time.perf_counter() < deadline:
+            name = state.rng.choices(names, weights)[0]
+            spec = OPERATIONS[name]
+            started = time.perf_counter()
+            try:
+                response = await spec.send(client, state)
+            except httpx.HTTPError:
+                errors[name] += 1
+                continue
+            if response is None:
+                continue
+            if response.status_code >= 400 and response.status_code not in spec.expected:
+                errors[name] += 1
+            else:
+                latencies[name].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    state = State(random.Random(args.seed))
+    if not args.bootstrap_users:
+        load_samples(state, args.mongodb_url, args.database)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        uncovered = await uncovered_routes(client)
+        if args.bootstrap_users:
+            await bootstrap(client, state, args.bootstrap_users, args.bootstrap_posts)
+        else:
+            await log_in(client, state, args.logins)
+        if args.warmup:
+            await drive(client, state, args.warmup, args.concurrency)
+        latencies, errors, elapsed = await drive(client, state, args.duration, args.concurrency)
+
+    results = {
+        name: summarize(latencies.get(name, []), elapsed, errors.get(name, 0))
+        for name in OPERATIONS
+        if name in latencies or name in errors
+    }
+    results["total"] = summarize(
+        [value for values in latencies.values() for value in values], elapsed, sum(errors.values())
+    )
+    return results, uncovered
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--mongodb-url", default=settings.mongodb_url)
+    parser.add_argument("--database", default=settings.database_name)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--logins", type=int, default=50, help="users to log in for authenticated writes")
+    parser.add_argument(
+        "--bootstrap-users", type=int, default=0,
+        help="create this many users with posts and comments through the API instead of reading a seed manifest"
+    )
+    parser.add_argument("--bootstrap-posts", type=int, default=20, help="posts per bootstrapped user")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    add_report_arguments(parser, DEFAULT_BASELINE)
+    args = parser.parse_args()
+
+    results, uncovered = asyncio.run(run(args))
+    for route in uncovered:
+        print(f"Route not exercised by the load mix: {route}", file=sys.stderr)
+    config = {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "bootstrap_users": args.bootstrap_users,
+        "uncovered_routes": uncovered,
+    }
+    sys.exit(finish(results, config, args))
+
+
+if __name__ == "__main__":
+    main()
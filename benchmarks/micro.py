@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks of password hashing, model construction and response building.
+
+Each benchmark times single calls in a loop; no database is needed.
+
+Usage:
+    python benchmarks/micro.py [--iterations 2000] [--hash-iterations 50]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_serialization import make_documents, render_raw, render_with_models
+from stats import add_report_arguments, finish, summarize
+
+from bson import ObjectId
+from pydantic import SecretStr
+
+from api.endpoints.post.model import Post
+from api.endpoints.post.router import render_post, to_post_response
+from api.endpoints.user.model import User
+from api.utilities import decode_cursor, dumps, encode_cursor, hash, issue_token, settings, verify, verify_token
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+# Documents per page in the page-rendering benchmarks
+PAGE_SIZE = 20
+
+
+def measure(func: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    """Time `iterations` calls of `func` after a short warm-up."""
+    for _ in range(min(10, iterations)):
+        func()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def benchmarks(hash_iterations: int, iterations: int) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    password = SecretStr("benchmark-password")
+    salt = SecretStr("0123456789abcdef0123456789abcdef")
+    pepper = settings.password_pepper
+    hashed = hash(password, salt, pepper)
+
+    doc = make_documents(1)[0]
+    post = Post(**doc)
+    page = make_documents(PAGE_SIZE)
+    user_doc = {
+        "_id": ObjectId(),
+        "username": "benchmark",
+        "email": "benchmark@bench.io",
+        "password": hashed,
+        "password_salt": salt.get_secret_value(),
+        "created_at": datetime.utcnow(),
+    }
+    token = issue_token(str(ObjectId()), settings.token_secret, settings.token_ttl_seconds)
+    cursor = encode_cursor([datetime.utcnow(), ObjectId()])
+
+    return {
+        "password_hash": lambda: measure(lambda: hash(password, salt, pepper), hash_iterations),
+        "password_verify": lambda: measure(lambda: verify(hashed, password, salt, pepper), hash_iterations),
+        "post_model": lambda: measure(lambda: Post(**doc), iterations),
+        "user_model": lambda: measure(lambda: User(**user_doc), iterations),
+        "post_response_model": lambda: measure(lambda: to_post_response(post), iterations),
+        "post_response_raw": lambda: measure(lambda: dumps(render_post(doc)), iterations),
+        "post_page_models": lambda: measure(lambda: render_with_models(page), iterations),
+        "post_page_raw": lambda: measure(lambda: render_raw(page), iterations),
+        "cursor_round_trip": lambda: measure(lambda: decode_cursor(encode_cursor([doc["created_at"], doc["_id"]])), iterations),
+        "cursor_decode": lambda: measure(lambda: decode_cursor(cursor), iterations),
+        "token_issue": lambda: measure(
+            lambda: issue_token(str(doc["user_id"]), settings.token_secret, settings.token_ttl_seconds), iterations
+        ),
+        "token_verify": lambda: measure(lambda: verify_token(token, settings.token_secret), iterations),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--hash-iterations", type=int, default=50, help="iterations of the Argon2 benchmarks")
+    parser.add_argument("--only", help="comma-separated benchmark names to run")
+    add_report_arguments(parser, DEFAULT_BASELINE)
+    args = parser.parse_args()
+
+    selected = set(args.only.split(",")) if args.only else None
+    results = {
+        name: run()
+        for name, run in benchmarks(args.hash_iterations, args.iterations).items()
+        if selected is None or name in selected
+    }
+    config = {
+        "iterations": args.iterations,
+        "hash_iterations": args.hash_iterations,
+        "argon2": {
+            "time_cost": settings.argon2_time_cost,
+            "memory_cost": settings.argon2_memory_cost,
+            "parallelism": settings.argon2_parallelism,
+        },
+    }
+    sys.exit(finish(results, config, args))
+
+
+if __name__ == "__main__":
+    main()
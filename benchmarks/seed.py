@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Bulk-load synthetic users, posts, comments and votes into a local mongod.
+
+Documents are generated deterministically from `--seed`, so two runs with the
+same options produce the same data set. Every user shares one password (stored
+in the `benchmark_seed` manifest) so the load driver can log in as any of them.
+
+Usage:
+    python benchmarks/seed.py --users 100000 --posts 1000000 [--drop]
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import SecretStr
+from pymongo import MongoClient
+
+from api import router as _routes  # noqa: F401  (registers every collection's indexes)
+from api.core import ensure_indexes
+from api.utilities import hash, settings
+
+
+PASSWORD = "benchmark-password"
+
+MANIFEST_COLLECTION = "benchmark_seed"
+
+# Timestamp prefixes keeping generated IDs of different kinds apart
+USER_ID_PREFIX = 0x60000000
+POST_ID_PREFIX = 0x61000000
+COMMENT_ID_PREFIX = 0x62000000
+
+SEED_START = datetime(2024, 1, 1)
+
+WORDS = (
+    "fast", "mongo", "async", "index", "cache", "query", "batch", "cursor", "shard", "replica",
+    "latency", "python", "argon2", "feed", "vote", "comment", "review", "release", "debug", "profile",
+)
+
+
+def object_id(prefix: int, index: int) -> ObjectId:
+    """Deterministic ObjectId for the `index`-th document of a kind."""
+    return ObjectId("%08x%016x" % (prefix, index))
+
+
+def user_id(index: int) -> ObjectId:
+    return object_id(USER_ID_PREFIX, index)
+
+
+def post_id(index: int) -> ObjectId:
+    return object_id(POST_ID_PREFIX, index)
+
+
+def comment_id(index: int) -> ObjectId:
+    return object_id(COMMENT_ID_PREFIX, index)
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_users(count: int, password: str, password_salt: str) -> Iterator[Dict[str, Any]]:
+    for index in range(count):
+        yield {
+            "_id": user_id(index),
+            "username": f"user{index}",
+            "email": f"user{index}@bench.io",
+            "password": password,
+            "password_salt": password_salt,
+            "created_at": SEED_START + timedelta(seconds=index),
+        }
+
+
+def make_posts(rng: random.Random, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    for index in range(args.posts):
+        upvotes = rng.randint(0, args.votes_per_post)
+        yield {
+            "_id": post_id(index),
+            "user_id": user_id(rng.randrange(args.users)),
+            "title": sentence(rng, rng.randint(3, 10)),
+            "upvotes": upvotes,
+            "downvotes": args.votes_per_post - upvotes,
+            "score": 2 * upvotes - args.votes_per_post,
+            "created_at": SEED_START + timedelta(seconds=index),
+            "comment_id": comment_id(index) if rng.random() < args.comment_ratio else None,
+        }
+
+
+def make_comments(posts: List[Dict[str, Any]], rng: random.Random, users: int) -> Iterator[Dict[str, Any]]:
+    for post in posts:
+        if post["comment_id"] is None:
+            continue
+        yield {
+            "_id": post["comment_id"],
+            "user_id": user_id(rng.randrange(users)),
+            "title": sentence(rng, rng.randint(5, 20)),
+            "post_id": post["_id"],
+            "created_at": post["created_at"] + timedelta(minutes=5),
+        }
+
+
+def make_votes(posts: List[Dict[str, Any]], rng: random.Random, users: int) -> Iterator[Dict[str, Any]]:
+    """One vote per counted upvote and downvote, each from a distinct user."""
+    for post in posts:
+        total = post["upvotes"] + post["downvotes"]
+        for position, voter in enumerate(rng.sample(range(users), min(total, users))):
+            yield {
+                "user_id": user_id(voter),
+                "post_id": post["_id"],
+                "value": 1 if position < post["upvotes"] else -1,
+                "created_at": post["created_at"] + timedelta(minutes=10),
+            }
+
+
+def insert_all(collection, docs: Iterator[Dict[str, Any]], batch_size: int,
+               on_batch: Callable[[List[Dict[str, Any]]], None] = None) -> int:
+    """Insert documents in unordered `insert_many` batches; returns the number inserted."""
+    inserted = 0
+    batch: List[Dict[str, Any]] = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            inserted += _flush(collection, batch, on_batch)
+            batch = []
+    if batch:
+        inserted += _flush(collection, batch, on_batch)
+    return inserted
+
+
+def _flush(collection, batch: List[Dict[str, Any]], on_batch) -> int:
+    collection.insert_many(batch, ordered=False)
+    if on_batch is not None:
+        on_batch(batch)
+    return len(batch)
+
+
+async def _ensure_indexes(mongodb_url: str, database: str) -> Dict[str, List[str]]:
+    client = AsyncIOMotorClient(mongodb_url)
+    try:
+        return await ensure_indexes(client[database])
+    finally:
+        client.close()
+
+
+def seed(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.votes_per_post > args.users:
+        raise SystemExit("--votes-per-post cannot exceed --users (one vote per user and post)")
+    client = MongoClient(args.mongodb_url)
+    database = client[args.database]
+    if args.drop:
+        for name in ("users", "posts", "comments", "votes", "jobs", MANIFEST_COLLECTION):
+            database.drop_collection(name)
+
+    rng = random.Random(args.seed)
+    # Hashing millions of passwords would dominate seeding, so all users share one hash
+    password_salt = secrets.token_hex(16)
+    password = hash(SecretStr(PASSWORD), SecretStr(password_salt), settings.password_pepper)
+
+    timings: Dict[str, float] = {}
+    counts: Dict[str, int] = {"comments": 0, "votes": 0}
+
+    started = time.perf_counter()
+    counts["users"] = insert_all(database["users"], make_users(args.users, password, password_salt), args.batch_size)
+    timings["users"] = time.perf_counter() - started
+
+    def _children(posts: List[Dict[str, Any]]) -> None:
+        # Comments and votes are derived per batch so posts never have to be held in memory
+        counts["comments"] += insert_all(database["comments"], make_comments(posts, rng, args.users), args.batch_size)
+        counts["votes"] += insert_all(database["votes"], make_votes(posts, rng, args.users), args.batch_size)
+
+    started = time.perf_counter()
+    counts["posts"] = insert_all(database["posts"], make_posts(rng, args), args.batch_size, _children)
+    timings["posts_comments_votes"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexes = asyncio.run(_ensure_indexes(args.mongodb_url, args.database))
+    timings["indexes"] = time.perf_counter() - started
+
+    manifest = {
+        "_id": "manifest",
+        "seed": args.seed,
+        "password": PASSWORD,
+        "created_at": datetime.utcnow(),
+        **counts,
+    }
+    database[MANIFEST_COLLECTION].replace_one({"_id": "manifest"}, manifest, upsert=True)
+    client.close()
+    return {
+        "counts": counts,
+        "seconds": {name: round(value, 2) for name, value in timings.items()},
+        "indexes": indexes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongodb-url", default=settings.mongodb_url)
+    parser.add_argument("--database", default=settings.database_name)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--comment-ratio", type=float, default=0.5, help="fraction of posts with a comment")
+    parser.add_argument("--votes-per-post", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--drop", action="store_true", help="drop the collections first")
+    args = parser.parse_args()
+    report = seed(args)
+    print(f"Seeded {report['counts']} in {report['seconds']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
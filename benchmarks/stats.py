@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Latency summaries, JSON reports and baseline comparison shared by the benchmarks."""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Benchmarks with fewer samples than this are too noisy to gate on
+MIN_SAMPLES_TO_COMPARE = 20
+
+# Latency changes below this many milliseconds are ignored as noise
+MIN_P99_DELTA_MS = 0.05
+
+# Largest tolerated increase of the error rate (errors per request)
+MAX_ERROR_RATE_INCREASE = 0.01
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile `q` (0-100) of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Summarize latencies (seconds) measured over `elapsed` seconds of wall time."""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "count": count,
+        "errors": errors,
+        "rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 4) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if count else 0.0,
+    }
+
+
+def _error_rate(summary: Dict[str, Any]) -> float:
+    return summary["errors"] / max(1, summary["count"] + summary["errors"])
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """List regressions: throughput below, or p99 above, the baseline by more than `tolerance`."""
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if min(current["count"], previous["count"]) < MIN_SAMPLES_TO_COMPARE:
+            continue
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} req/s vs baseline {previous['rps']} req/s")
+        if (current["p99_ms"] > previous["p99_ms"] * (1 + tolerance)
+                and current["p99_ms"] - previous["p99_ms"] > MIN_P99_DELTA_MS):
+            regressions.append(f"{name}: p99 {current['p99_ms']} ms vs baseline {previous['p99_ms']} ms")
+        if _error_rate(current) > _error_rate(previous) + MAX_ERROR_RATE_INCREASE:
+            regressions.append(f"{name}: {current['errors']} errors vs baseline {previous['errors']}")
+    return regressions
+
+
+def add_report_arguments(parser: argparse.ArgumentParser, default_baseline: str) -> None:
+    """Add the output and baseline options every benchmark accepts."""
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", default=default_baseline, help="baseline report to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression (default 15%%)")
+
+
+def finish(results: Dict[str, Dict[str, Any]], config: Dict[str, Any], args: argparse.Namespace) -> int:
+    """Write the report, update or compare against the baseline; returns the exit code."""
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": config,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as output:
+            output.write(text + "\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as baseline:
+        return json.load(baseline)["results"]
@@ -1,3 +1,43 @@
 from .database import *
+from .monitoring import *
+from .indexes import *
+from .memory import *
+from .repository import *
+from .jobs import *
 
-__all__ = ["client", "db", "settings"]
\ No newline at end of file
+__all__ = [
+    "Settings",
+    "client_options",
+    "get_client",
+    "get_mongo_database",
+    "close_client",
+    "settings",
+    "QueryShape",
+    "register_indexes",
+    "register_query_shape",
+    "registered_indexes",
+    "ensure_indexes",
+    "find_collection_scans",
+    "MemoryCollection",
+    "MemoryCursor",
+    "MemoryDatabase",
+    "MONGODB_BACKEND",
+    "MEMORY_BACKEND",
+    "Repository",
+    "CollectionRef",
+    "get_database",
+    "ping_database",
+    "get_collection",
+    "CHECKOUT_WAIT_BUCKETS",
+    "PoolMonitor",
+    "pool_monitor",
+    "pool_stats",
+    "COMMAND_LATENCY_BUCKETS",
+    "CommandMonitor",
+    "event_listeners",
+    "JobQueue",
+    "job_queue",
+    "throttle",
+    "delete_in_batches",
+    "update_in_batches",
+]
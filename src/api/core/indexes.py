@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+
+
+class QueryShape(NamedTuple):
+    """A query the service layer issues, used to check that it is index-backed."""
+
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+# Indexes declared by the service modules, keyed by collection name
+_indexes: Dict[str, List[IndexModel]] = {}
+
+# Query shapes declared by the service modules
+_query_shapes: List[QueryShape] = []
+
+
+def register_indexes(collection: str, indexes: List[IndexModel]) -> None:
+    """Declares indexes a collection needs.
+
+    Args:
+        collection (str             , required): Collection name.
+        indexes    (List[IndexModel], required): Indexes to ensure on startup.
+    """
+    _indexes.setdefault(collection, []).extend(indexes)
+
+
+def register_query_shape(
+    collection: str,
+    filter: Dict[str, Any],
+    sort: Optional[List[Tuple[str, int]]] = None,
+) -> None:
+    """Declares a query shape so `find_collection_scans` can check its plan.
+
+    Args:
+        collection (str                          , required): Collection name.
+        filter     (Dict[str, Any]               , required): Representative filter.
+        sort       (Optional[List[Tuple[str, int]]], optional): Sort specification.
+    """
+    _query_shapes.append(QueryShape(collection, filter, sort))
+
+
+def registered_indexes() -> Dict[str, List[IndexModel]]:
+    """Returns the declared indexes keyed by collection name."""
+    return {collection: list(indexes) for collection, indexes in _indexes.items()}
+
+
+async def ensure_indexes(database: AsyncIOMotorDatabase) -> Dict[str, List[str]]:
+    """Creates every declared index; existing identical indexes are left untouched.
+
+    Args:
+        database (AsyncIOMotorDatabase, required): Database to create indexes in.
+
+    Returns:
+        Dict[str, List[str]]: Index names ensured per collection.
+    """
+    _ensured: Dict[str, List[str]] = {}
+    for _collection, _models in _indexes.items():
+        _ensured[_collection] = await database[_collection].create_indexes(_models)
+    return _ensured
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    if isinstance(plan, list):
+        return [_stage for _item in plan for _stage in _plan_stages(_item)]
+    if not isinstance(plan, dict):
+        return []
+    _stages = [plan["stage"]] if isinstance(plan.get("stage"), str) else []
+    for _key in ("inputStage", "inputStages", "queryPlan", "thenStage", "elseStage"):
+        if _key in plan:
+            _stages.extend(_plan_stages(plan[_key]))
+    return _stages
+
+
+async def find_collection_scans(database: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """Explains every declared query shape and reports those planned as a COLLSCAN.
+
+    Args:
+        database (AsyncIOMotorDatabase, required): Database to explain queries against.
+
+    Returns:
+        List[Dict[str, Any]]: Offending query shapes with their winning plan stages.
+    """
+    _scans: List[Dict[str, Any]] = []
+    for _shape in _query_shapes:
+        _cursor = database[_shape.collection].find(_shape.filter)
+        if _shape.sort:
+            _cursor = _cursor.sort(_shape.sort)
+        _explain = await _cursor.limit(1).explain()
+        _stages = _plan_stages(_explain.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in _stages:
+            _scans.append({
+                "collection": _shape.collection,
+                "filter": _shape.filter,
+                "sort": _shape.sort,
+                "stages": _stages,
+            })
+    return _scans
+
+
+__all__ = [
+    "QueryShape",
+    "register_indexes",
+    "register_query_shape",
+    "registered_indexes",
+    "ensure_indexes",
+    "find_collection_scans",
+]
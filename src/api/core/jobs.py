@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from .database import settings
+from .indexes import register_indexes, register_query_shape
+from .repository import Repository, get_collection
+
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+PENDING = "pending"
+RUNNING = "running"
+FAILED = "failed"
+
+register_indexes("jobs", [
+    IndexModel([("status", ASCENDING), ("run_at", ASCENDING)], name="status_run_at"),
+    IndexModel([("status", ASCENDING), ("locked_until", ASCENDING)], name="status_locked_until"),
+])
+register_query_shape("jobs", {"status": PENDING, "run_at": {"$lte": datetime(1970, 1, 1)}}, [("run_at", ASCENDING)])
+register_query_shape("jobs", {"status": RUNNING, "locked_until": {"$lt": datetime(1970, 1, 1)}})
+
+
+class JobQueue:
+    """Durable background jobs stored in MongoDB and run by in-process async workers.
+
+    Jobs are claimed atomically with `find_one_and_update`, so several processes can
+    share one queue. A job whose worker died is picked up again once its lock expires,
+    and failing jobs are retried with exponential backoff up to `max_attempts` times.
+
+    Args:
+        collection           (Repository, required): Collection jobs are stored in.
+        workers              (int       , required): Concurrent workers; 0 only enqueues.
+        poll_interval_ms     (int       , required): Idle wait before polling for due jobs.
+        lock_timeout_seconds (int       , required): Time a claimed job stays locked.
+        max_attempts         (int       , required): Runs before a job is marked failed.
+    """
+
+    def __init__(
+        self,
+        collection: Repository,
+        workers: int,
+        poll_interval_ms: int,
+        lock_timeout_seconds: int,
+        max_attempts: int,
+    ):
+        self._collection = collection
+        self._workers = workers
+        self._poll_interval = poll_interval_ms / 1000
+        self._lock_timeout = timedelta(seconds=lock_timeout_seconds)
+        self._max_attempts = max_attempts
+        self._handlers: Dict[str, Handler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def register(self, kind: str) -> Callable[[Handler], Handler]:
+        """Decorator registering the handler that runs jobs of a kind."""
+        def _decorator(handler: Handler) -> Handler:
+            self._handlers[kind] = handler
+            return handler
+        return _decorator
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any]) -> ObjectId:
+        """Persist a job; it runs as soon as a worker is free."""
+        _now = datetime.utcnow()
+        _result = await self._collection.insert_one({
+            "kind": kind,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "run_at": _now,
+            "created_at": _now,
+        })
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return _result.inserted_id
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        _now = datetime.utcnow()
+        return await self._collection.find_one_and_update(
+            {"$or": [
+                {"status": PENDING, "run_at": {"$lte": _now}},
+                # Recover jobs whose worker stopped before finishing
+                {"status": RUNNING, "locked_until": {"$lt": _now}},
+            ]},
+            {"$set": {"status": RUNNING, "locked_until": _now + self._lock_timeout}, "$inc": {"attempts": 1}},
+            sort=[("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def run_next(self) -> bool:
+        """Claim and run one due job; returns False if none was due."""
+        _job = await self._claim()
+        if _job is None:
+            return False
+        _handler = self._handlers.get(_job["kind"])
+        try:
+            if _handler is None:
+                raise LookupError(f"No handler registered for job kind {_job['kind']!r}")
+            await _handler(_job["payload"])
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", _job["_id"], _job["kind"])
+            if _job["attempts"] >= self._max_attempts:
+                self.failed += 1
+                _update = {"status": FAILED, "error": str(e)}
+            else:
+                self.retried += 1
+                _backoff = timedelta(seconds=self._poll_interval * 2 ** _job["attempts"])
+                _update = {"status": PENDING, "error": str(e), "run_at": datetime.utcnow() + _backoff}
+            await self._collection.update_one({"_id": _job["_id"]}, {"$set": _update, "$unset": {"locked_until": ""}})
+            return True
+        self.completed += 1
+        await self._collection.delete_one({"_id": _job["_id"]})
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                if await self.run_next():
+                    continue
+            except Exception:
+                logger.exception("Failed to claim a job")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        """Start the workers."""
+        if self._tasks or self._workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self._workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running are retried after their lock expires."""
+        for _task in self._tasks:
+            _task.cancel()
+        for _task in self._tasks:
+            try:
+                await _task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._wakeup = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns worker and outcome counters."""
+        return {
+            "workers": len(self._tasks),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+async def throttle() -> None:
+    """Pauses between cleanup batches so large jobs do not starve request traffic."""
+    await asyncio.sleep(settings.job_batch_delay_ms / 1000)
+
+
+async def delete_in_batches(collection: Repository, query: Dict[str, Any]) -> int:
+    """Deletes matching documents in `job_batch_size` chunks of `delete_many`.
+
+    Args:
+        collection (Repository    , required): Collection to delete from.
+        query      (Dict[str, Any], required): Filter of the documents to delete.
+
+    Returns:
+        int: Number of documents deleted.
+    """
+    _deleted = 0
+    while True:
+        _cursor = collection.find(query, {"_id": 1}).limit(settings.job_batch_size)
+        _ids = [_doc["_id"] async for _doc in _cursor]
+        if not _ids:
+            return _deleted
+        _result = await collection.delete_many({"_id": {"$in": _ids}})
+        _deleted += _result.deleted_count
+        await throttle()
+
+
+async def update_in_batches(
+    collection: Repository, query: Dict[str, Any], update: Dict[str, Any]
+) -> int:
+    """Updates matching documents in `job_batch_size` chunks of `update_many`.
+
+    The update must make documents stop matching `query`, or the loop would not end.
+
+    Args:
+        collection (Repository    , required): Collection to update.
+        query      (Dict[str, Any], required): Filter of the documents to update.
+        update     (Dict[str, Any], required): Update applied to each chunk.
+
+    Returns:
+        int: Number of documents modified.
+    """
+    _modified = 0
+    while True:
+        _cursor = collection.find(query, {"_id": 1}).limit(settings.job_batch_size)
+        _ids = [_doc["_id"] async for _doc in _cursor]
+        if not _ids:
+            return _modified
+        _result = await collection.update_many({**query, "_id": {"$in": _ids}}, update)
+        if not _result.modified_count:
+            return _modified
+        _modified += _result.modified_count
+        await throttle()
+
+
+job_queue = JobQueue(
+    get_collection("jobs"),
+    settings.job_workers,
+    settings.job_poll_interval_ms,
+    settings.job_lock_timeout_seconds,
+    settings.job_max_attempts,
+)
+
+
+__all__ = [
+    "JobQueue",
+    "job_queue",
+    "throttle",
+    "delete_in_batches",
+    "update_in_batches",
+]
@@ -0,0 +1,853 @@
+# -*- coding: utf-8 -*-
+"""In-process storage backend implementing the subset of Motor the services use.
+
+Only equality and `$in` conditions on `_id` or on the leading field of a registered
+index narrow a query through the lookup maps. A query without one scans the whole
+collection on every call. Range filters such as keyset `$gt` pages and `$or` filters
+such as the feed keyset are examples. Sorts rank every matching document, in
+O(n log limit) when a limit follows. So each page of an unfiltered listing or of the
+feed costs O(n) in the collection size, however small the page.
+"""
+import heapq
+import itertools
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+
+# Stands in for a field a document does not have
+_MISSING = object()
+
+SortSpec = List[Tuple[str, int]]
+
+
+def _get(doc: Mapping[str, Any], path: str) -> Any:
+    """Value at a dotted path, or `_MISSING`."""
+    _value: Any = doc
+    for _part in path.split("."):
+        if not isinstance(_value, Mapping) or _part not in _value:
+            return _MISSING
+        _value = _value[_part]
+    return _value
+
+
+def _set(doc: Dict[str, Any], path: str, value: Any) -> None:
+    """Sets a dotted path, copying embedded documents so stored documents are never shared."""
+    _parts = path.split(".")
+    for _part in _parts[:-1]:
+        _child = doc.get(_part)
+        _child = dict(_child) if isinstance(_child, dict) else {}
+        doc[_part] = _child
+        doc = _child
+    doc[_parts[-1]] = value
+
+
+def _unset(doc: Dict[str, Any], path: str) -> None:
+    _parts = path.split(".")
+    for _part in _parts[:-1]:
+        _child = doc.get(_part)
+        if not isinstance(_child, dict):
+            return
+        _child = doc[_part] = dict(_child)
+        doc = _child
+    doc.pop(_parts[-1], None)
+
+
+def _to_bson(value: Any) -> Any:
+    """Normalizes a value the way a BSON round trip does: datetimes become naive UTC at millisecond precision."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {_key: _to_bson(_item) for _key, _item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_bson(_item) for _item in value]
+    return value
+
+
+def _type_rank(value: Any) -> int:
+    """Position of a value's type in the BSON comparison order."""
+    if value is None or value is _MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, (list, tuple)):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_value(value: Any) -> Tuple[int, Any]:
+    _rank = _type_rank(value)
+    if _rank == 0:
+        return (0, 0)
+    if _rank in (3, 10):
+        return (_rank, repr(value))
+    return (_rank, value)
+
+
+class _Descending:
+    """Inverts the ordering of a sort key."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: Any):
+        self.key = key
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.key < self.key
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.key == other.key
+
+
+def _sort_spec(key_or_list: Any, direction: Optional[int] = None) -> SortSpec:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, Mapping):
+        return list(key_or_list.items())
+    return [(_key, _direction) for _key, _direction in key_or_list]
+
+
+def _sort_key(spec: SortSpec) -> Callable[[Mapping[str, Any]], Tuple[Any, ...]]:
+    def _key(doc: Mapping[str, Any]) -> Tuple[Any, ...]:
+        return tuple(
+            _sort_value(_get(doc, _field)) if _direction >= 0 else _Descending(_sort_value(_get(doc, _field)))
+            for _field, _direction in spec
+        )
+    return _key
+
+
+def _sorted(docs: Iterable[Dict[str, Any]], spec: SortSpec, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Sorts documents; with a limit only the first `limit` are kept, in O(n log limit)."""
+    if limit:
+        return heapq.nsmallest(limit, docs, key=_sort_key(spec))
+    return sorted(docs, key=_sort_key(spec))
+
+
+def _compare(value: Any, other: Any) -> Optional[int]:
+    """-1, 0 or 1, or None when the values are of different BSON types and do not compare."""
+    if value is _MISSING or _type_rank(value) != _type_rank(other):
+        return None
+    _value, _other = _sort_value(value), _sort_value(other)
+    return (_value > _other) - (_value < _other)
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return any(_equals(_item, expected) for _item in value)
+    return _type_rank(value) == _type_rank(expected) and value == expected
+
+
+def _match_operator(value: Any, operator: str, argument: Any) -> bool:
+    if operator == "$eq":
+        return _equals(value, argument)
+    if operator == "$ne":
+        return not _equals(value, argument)
+    if operator == "$in":
+        return any(_equals(value, _item) for _item in argument)
+    if operator == "$nin":
+        return not any(_equals(value, _item) for _item in argument)
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(argument)
+    if operator in ("$lt", "$lte", "$gt", "$gte"):
+        _order = _compare(value, argument)
+        if _order is None:
+            return False
+        return {"$lt": _order < 0, "$lte": _order <= 0, "$gt": _order > 0, "$gte": _order >= 0}[operator]
+    raise OperationFailure(f"Unsupported query operator {operator}")
+
+
+def _is_operator_document(condition: Any) -> bool:
+    return isinstance(condition, Mapping) and bool(condition) and all(_key.startswith("$") for _key in condition)
+
+
+def _matches(doc: Mapping[str, Any], query: Mapping[str, Any]) -> bool:
+    """Whether a document matches a MongoDB query filter."""
+    for _key, _condition in query.items():
+        if _key == "$or":
+            if not any(_matches(doc, _branch) for _branch in _condition):
+                return False
+        elif _key == "$and":
+            if not all(_matches(doc, _branch) for _branch in _condition):
+                return False
+        elif _key == "$nor":
+            if any(_matches(doc, _branch) for _branch in _condition):
+                return False
+        elif _key.startswith("$"):
+            raise OperationFailure(f"Unsupported query operator {_key}")
+        elif _is_operator_document(_condition):
+            _value = _get(doc, _key)
+            if not all(_match_operator(_value, _op, _arg) for _op, _arg in _condition.items()):
+                return False
+        elif not _equals(_get(doc, _key), _condition):
+            return False
+    return True
+
+
+def _equality_values(condition: Any) -> Optional[List[Any]]:
+    """Values a condition matches by equality, or None if it is not an equality or `$in`."""
+    if not _is_operator_document(condition):
+        return None if isinstance(condition, (dict, list)) else [condition]
+    if set(condition) == {"$in"}:
+        return list(condition["$in"])
+    if set(condition) == {"$eq"}:
+        return [condition["$eq"]]
+    return None
+
+
+def _index_value(value: Any) -> Any:
+    if value is _MISSING:
+        return None
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _include(source: Mapping[str, Any], target: Dict[str, Any], parts: List[str]) -> None:
+    _key = parts[0]
+    if _key not in source:
+        return
+    _value = source[_key]
+    if len(parts) == 1:
+        target[_key] = _value
+    elif isinstance(_value, dict):
+        _include(_value, target.setdefault(_key, {}), parts[1:])
+    elif isinstance(_value, list):
+        # Sub-field projections apply to every embedded document of an array
+        _items = [_item for _item in _value if isinstance(_item, dict)]
+        _projected = target.setdefault(_key, [{} for _ in _items])
+        for _item, _out in zip(_items, _projected):
+            _include(_item, _out, parts[1:])
+
+
+def _project(doc: Mapping[str, Any], projection: Any) -> Dict[str, Any]:
+    """Copy of a document reduced by an inclusion or exclusion projection."""
+    if not projection:
+        return dict(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {_field: 1 for _field in projection}
+    _fields = {_key: _flag for _key, _flag in projection.items() if _key != "_id"}
+    _include_id = projection.get("_id", 1)
+    if any(_fields.values()) or (not _fields and _include_id):
+        _result: Dict[str, Any] = {}
+        if _include_id and "_id" in doc:
+            _result["_id"] = doc["_id"]
+        for _path, _flag in _fields.items():
+            if _flag:
+                _include(doc, _result, _path.split("."))
+        return _result
+    _result = dict(doc)
+    for _path in _fields:
+        _unset(_result, _path)
+    if not _include_id:
+        _result.pop("_id", None)
+    return _result
+
+
+def _evaluate(doc: Mapping[str, Any], expression: Any) -> Any:
+    """Evaluates the aggregation expressions the services use: field paths and arithmetic."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        _value = _get(doc, expression[1:])
+        return None if _value is _MISSING else _value
+    if _is_operator_document(expression) and len(expression) == 1:
+        (_operator, _arguments), = expression.items()
+        if _operator == "$ifNull":
+            for _argument in _arguments[:-1]:
+                _value = _evaluate(doc, _argument)
+                if _value is not None:
+                    return _value
+            return _evaluate(doc, _arguments[-1])
+        _values = [_evaluate(doc, _argument) for _argument in _arguments]
+        if any(_value is None for _value in _values):
+            return None
+        if _operator == "$add":
+            return sum(_values)
+        if _operator == "$subtract":
+            return _values[0] - _values[1]
+        if _operator == "$multiply":
+            _product = 1
+            for _value in _values:
+                _product *= _value
+            return _product
+        raise OperationFailure(f"Unsupported expression operator {_operator}")
+    return expression
+
+
+def _apply_pipeline_update(doc: Dict[str, Any], pipeline: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Returns a copy of a document updated by an aggregation pipeline of $set and $unset stages."""
+    _new = dict(doc)
+    for _stage in pipeline:
+        (_operator, _spec), = _stage.items()
+        if _operator in ("$set", "$addFields"):
+            # Expressions see the document as the previous stage left it
+            _values = {_path: _evaluate(_new, _expression) for _path, _expression in _spec.items()}
+            for _path, _value in _values.items():
+                _set(_new, _path, _to_bson(_value))
+        elif _operator == "$unset":
+            for _path in [_spec] if isinstance(_spec, str) else _spec:
+                _unset(_new, _path)
+        else:
+            raise OperationFailure(f"Unsupported update pipeline stage {_operator}")
+    return _new
+
+
+def _apply_update(doc: Dict[str, Any], update: Any, inserting: bool) -> Dict[str, Any]:
+    """Returns an updated copy of a document; `update` is an operator document or a pipeline."""
+    if isinstance(update, list):
+        return _apply_pipeline_update(doc, update)
+    if not update or not all(_key.startswith("$") for _key in update):
+        raise ValueError("update only works with $ operators")
+    _new = dict(doc)
+    for _operator, _fields in update.items():
+        if _operator == "$set" or (_operator == "$setOnInsert" and inserting):
+            for _path, _value in _fields.items():
+                _set(_new, _path, _to_bson(_value))
+        elif _operator == "$setOnInsert":
+            continue
+        elif _operator == "$inc":
+            for _path, _amount in _fields.items():
+                _current = _get(_new, _path)
+                _set(_new, _path, _amount if _current is _MISSING else _current + _amount)
+        elif _operator == "$unset":
+            for _path in _fields:
+                _unset(_new, _path)
+        else:
+            raise OperationFailure(f"Unsupported update operator {_operator}")
+    return _new
+
+
+class _Cursor(ABC):
+    """Async iteration and `to_list` over a result computed on first use."""
+
+    @abstractmethod
+    def _results(self) -> List[Dict[str, Any]]:
+        """Computes the documents the cursor yields."""
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        _docs = self._results()
+        return _docs[:length] if length else _docs
+
+    async def _iterate(self) -> AsyncIterator[Dict[str, Any]]:
+        for _doc in self._results():
+            yield _doc
+
+    def __aiter__(self):
+        return self._iterate()
+
+
+class MemoryCursor(_Cursor):
+    """Result of `MemoryCollection.find`, supporting the Motor cursor modifiers the services chain."""
+
+    def __init__(
+        self,
+        collection: "MemoryCollection",
+        filter: Mapping[str, Any],
+        projection: Any,
+        sort: Optional[SortSpec],
+        limit: int,
+        skip: int,
+    ):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort = sort
+        self._limit = limit
+        self._skip = skip
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    async def explain(self) -> Dict[str, Any]:
+        raise OperationFailure("explain is not supported by the in-memory backend")
+
+    def _results(self) -> List[Dict[str, Any]]:
+        _docs = self._collection._select(self._filter)
+        _end = self._skip + self._limit if self._limit else None
+        if self._sort:
+            _docs = _sorted(_docs, self._sort, _end)
+        return [_project(_doc, self._projection) for _doc in itertools.islice(_docs, self._skip, _end)]
+
+
+class MemoryAggregation(_Cursor):
+    """Result of `MemoryCollection.aggregate`."""
+
+    def __init__(self, collection: "MemoryCollection", pipeline: List[Mapping[str, Any]]):
+        self._collection = collection
+        self._pipeline = pipeline
+
+    def _results(self) -> List[Dict[str, Any]]:
+        return self._collection._aggregate(self._pipeline)
+
+
+class MemoryCollection:
+    """Dict-backed collection implementing the subset of the Motor collection API the services use.
+
+    Documents are kept by `_id`. Each registered index adds a map from the value of its
+    leading field to document IDs, used for equality and `$in` filters, and unique
+    indexes are enforced with `DuplicateKeyError` like MongoDB does. Operations run
+    without awaiting, so each is atomic with respect to other coroutines.
+
+    Args:
+        database (MemoryDatabase, required): Database the collection belongs to.
+        name     (str           , required): Collection name.
+    """
+
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+        # Leading index field -> value -> IDs of the documents holding it
+        self._lookups: Dict[str, Dict[Any, Set[Any]]] = {}
+        # Unique index name -> (fields, key -> ID)
+        self._unique: Dict[str, Tuple[Tuple[str, ...], Dict[Tuple[Any, ...], Any]]] = {}
+
+    # Indexes ---------------------------------------------------------------
+
+    async def create_indexes(self, indexes: List[IndexModel]) -> List[str]:
+        _names = []
+        for _model in indexes:
+            _spec = _model.document
+            _fields = tuple(_spec["key"])
+            if _spec.get("unique") and _spec["name"] not in self._unique:
+                _keys: Dict[Tuple[Any, ...], Any] = {}
+                for _doc in self._docs.values():
+                    _key = self._unique_key(_doc, _fields)
+                    if _key in _keys:
+                        raise self._duplicate(_spec["name"], _fields, _key)
+                    _keys[_key] = _doc["_id"]
+                self._unique[_spec["name"]] = (_fields, _keys)
+            if _fields[0] != "_id" and _fields[0] not in self._lookups:
+                _lookup: Dict[Any, Set[Any]] = {}
+                for _doc in self._docs.values():
+                    _lookup.setdefault(_index_value(_get(_doc, _fields[0])), set()).add(_doc["_id"])
+                self._lookups[_fields[0]] = _lookup
+            _names.append(_spec["name"])
+        return _names
+
+    @staticmethod
+    def _unique_key(doc: Mapping[str, Any], fields: Tuple[str, ...]) -> Tuple[Any, ...]:
+        return tuple(_index_value(_get(doc, _field)) for _field in fields)
+
+    def _duplicate(self, index: str, fields: Tuple[str, ...], key: Tuple[Any, ...]) -> DuplicateKeyError:
+        _message = f"E11000 duplicate key error collection: {self.database.name}.{self.name} index: {index} dup key: {key}"
+        # Details shaped like the server's, which name the fields of the violated index
+        return DuplicateKeyError(_message, 11000, {
+            "code": 11000,
+            "errmsg": _message,
+            "keyPattern": {_field: 1 for _field in fields},
+            "keyValue": dict(zip(fields, key)),
+        })
+
+    def _check_unique(self, doc: Mapping[str, Any]) -> None:
+        for _name, (_fields, _keys) in self._unique.items():
+            _owner = _keys.get(self._unique_key(doc, _fields), _MISSING)
+            if _owner is not _MISSING and _owner != doc["_id"]:
+                raise self._duplicate(_name, _fields, self._unique_key(doc, _fields))
+
+    def _index(self, doc: Mapping[str, Any]) -> None:
+        for _fields, _keys in self._unique.values():
+            _keys[self._unique_key(doc, _fields)] = doc["_id"]
+        for _field, _lookup in self._lookups.items():
+            _lookup.setdefault(_index_value(_get(doc, _field)), set()).add(doc["_id"])
+
+    def _unindex(self, doc: Mapping[str, Any]) -> None:
+        for _fields, _keys in self._unique.values():
+            _key = self._unique_key(doc, _fields)
+            if _keys.get(_key) == doc["_id"]:
+                del _keys[_key]
+        for _field, _lookup in self._lookups.items():
+            _value = _index_value(_get(doc, _field))
+            _ids = _lookup.get(_value)
+            if _ids is not None:
+                _ids.discard(doc["_id"])
+                if not _ids:
+                    del _lookup[_value]
+
+    # Storage ---------------------------------------------------------------
+
+    def _candidates(self, query: Mapping[str, Any]) -> Optional[Iterable[Any]]:
+        """IDs that may match, from the `_id` key or an indexed field; None means scan."""
+        for _field in itertools.chain(("_id",), self._lookups):
+            if _field not in query:
+                continue
+            _values = _equality_values(query[_field])
+            if _values is None:
+                continue
+            if _field == "_id":
+                return [_index_value(_value) for _value in _values]
+            _lookup = self._lookups[_field]
+            _ids: Set[Any] = set()
+            for _value in _values:
+                _ids.update(_lookup.get(_index_value(_value), ()))
+            return _ids
+        return None
+
+    def _select(self, query: Optional[Mapping[str, Any]]) -> Iterator[Dict[str, Any]]:
+        query = query or {}
+        _ids = self._candidates(query)
+        if _ids is None:
+            _docs: Iterable[Dict[str, Any]] = list(self._docs.values())
+        else:
+            _docs = [self._docs[_id] for _id in _ids if _id in self._docs]
+        return (_doc for _doc in _docs if _matches(_doc, query))
+
+    def _first(self, query: Optional[Mapping[str, Any]], sort: Any) -> Optional[Dict[str, Any]]:
+        _docs = self._select(query)
+        if sort:
+            _docs = iter(_sorted(_docs, _sort_spec(sort), 1))
+        return next(_docs, None)
+
+    def _targets(self, query: Mapping[str, Any], many: bool) -> List[Dict[str, Any]]:
+        if many:
+            return list(self._select(query))
+        _doc = self._first(query, None)
+        return [_doc] if _doc is not None else []
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        # Like MongoDB, keep _id as the first field
+        _doc = {"_id": document["_id"], **_to_bson(document)}
+        if _doc["_id"] in self._docs:
+            raise self._duplicate("_id_", ("_id",), (_doc["_id"],))
+        self._check_unique(_doc)
+        self._docs[_doc["_id"]] = _doc
+        self._index(_doc)
+        return _doc["_id"]
+
+    def _replace(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        if new.get("_id") != old["_id"]:
+            raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'")
+        self._check_unique(new)
+        self._unindex(old)
+        self._docs[new["_id"]] = new
+        self._index(new)
+
+    def _remove(self, doc: Dict[str, Any]) -> None:
+        self._unindex(doc)
+        del self._docs[doc["_id"]]
+
+    def _upsert_document(self, query: Mapping[str, Any], update: Mapping[str, Any]) -> Dict[str, Any]:
+        _doc: Dict[str, Any] = {}
+        for _key, _condition in query.items():
+            if not _key.startswith("$") and not _is_operator_document(_condition):
+                _set(_doc, _key, _condition)
+        _doc = _apply_update(_doc, update, inserting=True)
+        _doc.setdefault("_id", ObjectId())
+        return _doc
+
+    def _update(
+        self, query: Mapping[str, Any], update: Mapping[str, Any], upsert: bool, many: bool
+    ) -> Tuple[int, int, Any]:
+        """Applies an update; returns (matched, modified, upserted ID)."""
+        _docs = self._targets(query, many)
+        if not _docs:
+            if not upsert:
+                return 0, 0, None
+            return 0, 0, self._insert(self._upsert_document(query, update))
+        _modified = 0
+        for _doc in _docs:
+            _new = _apply_update(_doc, update, inserting=False)
+            if _new != _doc:
+                self._replace(_doc, _new)
+                _modified += 1
+        return len(_docs), _modified, None
+
+    def _delete(self, query: Mapping[str, Any], many: bool) -> int:
+        _docs = self._targets(query, many)
+        for _doc in _docs:
+            self._remove(_doc)
+        return len(_docs)
+
+    @staticmethod
+    def _filter(filter: Any) -> Mapping[str, Any]:
+        if filter is None:
+            return {}
+        return filter if isinstance(filter, Mapping) else {"_id": filter}
+
+    # Motor collection API --------------------------------------------------
+
+    def find(
+        self,
+        filter: Any = None,
+        projection: Any = None,
+        sort: Any = None,
+        limit: int = 0,
+        skip: int = 0,
+        **kwargs: Any,
+    ) -> MemoryCursor:
+        return MemoryCursor(self, self._filter(filter), projection, _sort_spec(sort) if sort else None, limit, skip)
+
+    async def find_one(self, filter: Any = None, projection: Any = None, *args: Any, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        _doc = self._first(self._filter(filter), kwargs.get("sort"))
+        return _project(_doc, projection) if _doc is not None else None
+
+    async def find_one_and_update(
+        self,
+        filter: Mapping[str, Any],
+        update: Mapping[str, Any],
+        projection: Any = None,
+        sort: Any = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs: Any,
+    ) -> Optional[Dict[str, Any]]:
+        _doc = self._first(filter, sort)
+        if _doc is None:
+            if not upsert:
+                return None
+            _new = self._upsert_document(filter, update)
+            self._insert(_new)
+            return _project(_new, projection) if return_document == ReturnDocument.AFTER else None
+        _new = _apply_update(_doc, update, inserting=False)
+        self._replace(_doc, _new)
+        return _project(_new if return_document == ReturnDocument.AFTER else _doc, projection)
+
+    async def find_one_and_delete(
+        self, filter: Mapping[str, Any], projection: Any = None, sort: Any = None, **kwargs: Any
+    ) -> Optional[Dict[str, Any]]:
+        _doc = self._first(filter, sort)
+        if _doc is None:
+            return None
+        self._remove(_doc)
+        return _project(_doc, projection)
+
+    async def insert_one(self, document: Dict[str, Any], *args: Any, **kwargs: Any) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(
+        self, documents: Iterable[Dict[str, Any]], ordered: bool = True, *args: Any, **kwargs: Any
+    ) -> InsertManyResult:
+        _inserted: List[Any] = []
+        _errors: List[Dict[str, Any]] = []
+        for _index, _document in enumerate(documents):
+            try:
+                _inserted.append(self._insert(_document))
+            except DuplicateKeyError as e:
+                _errors.append({"index": _index, **e.details, "op": _document})
+                if ordered:
+                    break
+        if _errors:
+            raise BulkWriteError({
+                "writeErrors": _errors,
+                "writeConcernErrors": [],
+                "nInserted": len(_inserted),
+                "nUpserted": 0,
+                "nMatched": 0,
+                "nModified": 0,
+                "nRemoved": 0,
+                "upserted": [],
+            })
+        return InsertManyResult(_inserted, True)
+
+    async def count_documents(self, filter: Mapping[str, Any], **kwargs: Any) -> int:
+        return sum(1 for _ in self._select(filter))
+
+    async def estimated_document_count(self, **kwargs: Any) -> int:
+        return len(self._docs)
+
+    async def update_one(
+        self, filter: Mapping[str, Any], update: Mapping[str, Any], upsert: bool = False, **kwargs: Any
+    ) -> UpdateResult:
+        return self._update_result(*self._update(filter, update, upsert, many=False))
+
+    async def update_many(
+        self, filter: Mapping[str, Any], update: Mapping[str, Any], upsert: bool = False, **kwargs: Any
+    ) -> UpdateResult:
+        return self._update_result(*self._update(filter, update, upsert, many=True))
+
+    @staticmethod
+    def _update_result(matched: int, modified: int, upserted_id: Any) -> UpdateResult:
+        _raw: Dict[str, Any] = {"n": matched, "nModified": modified}
+        if upserted_id is not None:
+            _raw.update(n=1, upserted=upserted_id)
+        return UpdateResult(_raw, True)
+
+    async def delete_one(self, filter: Mapping[str, Any], **kwargs: Any) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, many=False)}, True)
+
+    async def delete_many(self, filter: Mapping[str, Any], **kwargs: Any) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, many=True)}, True)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs: Any) -> BulkWriteResult:
+        _result: Dict[str, Any] = {
+            "writeErrors": [],
+            "writeConcernErrors": [],
+            "nInserted": 0,
+            "nUpserted": 0,
+            "nMatched": 0,
+            "nModified": 0,
+            "nRemoved": 0,
+            "upserted": [],
+        }
+        for _index, _request in enumerate(requests):
+            # pymongo keeps the operation arguments in private attributes
+            try:
+                if isinstance(_request, InsertOne):
+                    self._insert(_request._doc)
+                    _result["nInserted"] += 1
+                elif isinstance(_request, (UpdateOne, UpdateMany)):
+                    _matched, _modified, _upserted_id = self._update(
+                        _request._filter, _request._doc, bool(_request._upsert), isinstance(_request, UpdateMany)
+                    )
+                    _result["nMatched"] += _matched
+                    _result["nModified"] += _modified
+                    if _upserted_id is not None:
+                        _result["nUpserted"] += 1
+                        _result["upserted"].append({"index": _index, "_id": _upserted_id})
+                elif isinstance(_request, (DeleteOne, DeleteMany)):
+                    _result["nRemoved"] += self._delete(_request._filter, isinstance(_request, DeleteMany))
+                else:
+                    raise OperationFailure(f"Unsupported bulk write operation {type(_request).__name__}")
+            except DuplicateKeyError as e:
+                _result["writeErrors"].append({"index": _index, **e.details})
+                if ordered:
+                    break
+        if _result["writeErrors"]:
+            raise BulkWriteError(_result)
+        return BulkWriteResult(_result, True)
+
+    def aggregate(self, pipeline: List[Mapping[str, Any]], **kwargs: Any) -> MemoryAggregation:
+        return MemoryAggregation(self, pipeline)
+
+    # Aggregation -----------------------------------------------------------
+
+    def _aggregate(self, pipeline: List[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        _stages = [next(iter(_stage.items())) for _stage in pipeline]
+        # A leading $match can be served by the indexes
+        _query = _stages.pop(0)[1] if _stages and _stages[0][0] == "$match" else {}
+        _docs = [dict(_doc) for _doc in self._select(_query)]
+        for _position, (_operator, _spec) in enumerate(_stages):
+            if _operator == "$match":
+                _docs = [_doc for _doc in _docs if _matches(_doc, _spec)]
+            elif _operator == "$sort":
+                _next = _stages[_position + 1] if _position + 1 < len(_stages) else None
+                _docs = _sorted(_docs, _sort_spec(_spec), _next[1] if _next and _next[0] == "$limit" else None)
+            elif _operator == "$limit":
+                _docs = _docs[:_spec]
+            elif _operator == "$skip":
+                _docs = _docs[_spec:]
+            elif _operator in ("$addFields", "$set"):
+                for _doc in _docs:
+                    for _path, _expression in _spec.items():
+                        _set(_doc, _path, _evaluate(_doc, _expression))
+            elif _operator == "$project":
+                _docs = [_project(_doc, _spec) for _doc in _docs]
+            elif _operator == "$lookup":
+                _docs = self._lookup(_docs, _spec)
+            elif _operator == "$unwind":
+                _docs = list(self._unwind(_docs, _spec))
+            else:
+                raise OperationFailure(f"Unsupported aggregation stage {_operator}")
+        return _docs
+
+    def _lookup(self, docs: List[Dict[str, Any]], spec: Mapping[str, Any]) -> List[Dict[str, Any]]:
+        _foreign = self.database.get_collection(spec["from"])
+        for _doc in docs:
+            _local = _get(_doc, spec["localField"])
+            if isinstance(_local, list):
+                _condition: Any = {"$in": _local}
+            else:
+                _condition = None if _local is _MISSING else _local
+            _doc[spec["as"]] = [dict(_match) for _match in _foreign._select({spec["foreignField"]: _condition})]
+        return docs
+
+    @staticmethod
+    def _unwind(docs: List[Dict[str, Any]], spec: Any) -> Iterator[Dict[str, Any]]:
+        _path = (spec if isinstance(spec, str) else spec["path"])[1:]
+        _preserve = isinstance(spec, Mapping) and spec.get("preserveNullAndEmptyArrays", False)
+        for _doc in docs:
+            _value = _get(_doc, _path)
+            if isinstance(_value, list) and _value:
+                for _item in _value:
+                    _copy = dict(_doc)
+                    _set(_copy, _path, _item)
+                    yield _copy
+            elif _value is _MISSING or _value is None or isinstance(_value, list):
+                if _preserve:
+                    _copy = dict(_doc)
+                    if isinstance(_value, list):
+                        _unset(_copy, _path)
+                    yield _copy
+            else:
+                yield _doc
+
+
+class MemoryDatabase:
+    """In-process stand-in for a Motor database; collections are created on first use.
+
+    Args:
+        name (str, required): Database name, used in error messages.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        _collection = self._collections.get(name)
+        if _collection is None:
+            _collection = self._collections[name] = MemoryCollection(self, name)
+        return _collection
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def drop_collection(self, name: str) -> None:
+        self._collections.pop(name, None)
+
+    async def command(self, command: Any, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        _name = command if isinstance(command, str) else next(iter(command))
+        if _name in ("ping", "hello", "isMaster", "ismaster"):
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command {_name}")
+
+
+__all__ = [
+    "MemoryCollection",
+    "MemoryCursor",
+    "MemoryDatabase",
+]
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from pymongo import monitoring
+
+
+# Upper bounds, in seconds, of the connection checkout wait histogram
+CHECKOUT_WAIT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Records connection pool usage per server so pool starvation is visible.
+
+    Tracks open and checked-out connections, checkout wait times (as a histogram)
+    and checkout failures by reason. Events arrive on driver threads, so counters
+    are guarded by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pools: Dict[str, Dict[str, Any]] = {}
+
+    def _pool(self, address: Tuple[str, int]) -> Dict[str, Any]:
+        _key = f"{address[0]}:{address[1]}"
+        _pool = self._pools.get(_key)
+        if _pool is None:
+            _pool = self._pools[_key] = {
+                "open": 0,
+                "in_use": 0,
+                "checkouts": 0,
+                "checkout_failures": {},
+                "wait_seconds_total": 0.0,
+                "wait_seconds_max": 0.0,
+                "wait_buckets": [0] * len(CHECKOUT_WAIT_BUCKETS),
+                "cleared": 0,
+            }
+        return _pool
+
+    def _observe_wait(self, pool: Dict[str, Any], event: Any) -> None:
+        _duration = getattr(event, "duration", None)
+        if _duration is None:
+            # Older drivers do not time checkouts; start and end arrive on the same thread
+            _started = getattr(self._local, "started", None)
+            if _started is None:
+                return
+            _duration = time.monotonic() - _started
+        pool["wait_seconds_total"] += _duration
+        pool["wait_seconds_max"] = max(pool["wait_seconds_max"], _duration)
+        for _index, _bound in enumerate(CHECKOUT_WAIT_BUCKETS):
+            if _duration <= _bound:
+                pool["wait_buckets"][_index] += 1
+                break
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self._pool(event.address)["open"] += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self._pool(event.address)["open"] -= 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._local.started = time.monotonic()
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        with self._lock:
+            _pool = self._pool(event.address)
+            _failures = _pool["checkout_failures"]
+            _failures[event.reason] = _failures.get(event.reason, 0) + 1
+            self._observe_wait(_pool, event)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        with self._lock:
+            _pool = self._pool(event.address)
+            _pool["checkouts"] += 1
+            _pool["in_use"] += 1
+            self._observe_wait(_pool, event)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self._pool(event.address)["in_use"] -= 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns a snapshot of the counters, keyed by server address."""
+        with self._lock:
+            return {
+                _address: {
+                    **_pool,
+                    "checkout_failures": dict(_pool["checkout_failures"]),
+                    "wait_buckets": list(_pool["wait_buckets"]),
+                }
+                for _address, _pool in self._pools.items()
+            }
+
+
+pool_monitor = PoolMonitor()
+
+
+# Upper bounds, in seconds, of the MongoDB command latency histogram
+COMMAND_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+mongodb_command_duration = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency",
+    ["collection", "command"],
+    buckets=COMMAND_LATENCY_BUCKETS,
+)
+mongodb_command_failures = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["collection", "command"],
+)
+mongodb_slow_commands = Counter(
+    "mongodb_slow_commands_total",
+    "MongoDB commands slower than the slow-command threshold",
+    ["collection", "command"],
+)
+
+
+def _command_collection(event: monitoring.CommandStartedEvent) -> str:
+    _target = event.command.get(event.command_name)
+    if isinstance(_target, str):
+        return _target
+    # getMore names its collection separately from the cursor ID
+    _collection = event.command.get("collection")
+    return _collection if isinstance(_collection, str) else ""
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Records MongoDB command latency per collection and command name.
+
+    Args:
+        slow_command_ms (int, required): Commands slower than this are also counted as slow.
+    """
+
+    def __init__(self, slow_command_ms: int):
+        self._slow_seconds = slow_command_ms / 1000
+        # Labels of commands in flight, keyed by request and connection
+        self._started: Dict[Tuple[int, Any], Tuple[str, str]] = {}
+
+    def _finish(self, event: Any) -> Optional[Tuple[str, str]]:
+        _labels = self._started.pop((event.request_id, event.connection_id), None)
+        if _labels is None:
+            return None
+        _seconds = event.duration_micros / 1_000_000
+        mongodb_command_duration.labels(*_labels).observe(_seconds)
+        if _seconds >= self._slow_seconds:
+            mongodb_slow_commands.labels(*_labels).inc()
+        return _labels
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._started[(event.request_id, event.connection_id)] = (_command_collection(event), event.command_name)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        _labels = self._finish(event)
+        if _labels is not None:
+            mongodb_command_failures.labels(*_labels).inc()
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns connection pool counters, keyed by server address."""
+    return pool_monitor.stats()
+
+
+def event_listeners(slow_command_ms: int) -> List[Any]:
+    """Listeners to register on every MongoDB client.
+
+    Args:
+        slow_command_ms (int, required): Threshold above which commands are counted as slow.
+    """
+    return [pool_monitor, CommandMonitor(slow_command_ms)]
+
+
+__all__ = [
+    "CHECKOUT_WAIT_BUCKETS",
+    "PoolMonitor",
+    "pool_monitor",
+    "pool_stats",
+    "COMMAND_LATENCY_BUCKETS",
+    "CommandMonitor",
+    "event_listeners",
+]
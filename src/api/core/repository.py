@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from typing import Any, Dict, List, Mapping, Optional, Protocol, Union
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from .database import get_mongo_database, settings
+from .memory import MemoryDatabase
+
+
+MONGODB_BACKEND = "mongodb"
+MEMORY_BACKEND = "memory"
+
+Database = Union[AsyncIOMotorDatabase, MemoryDatabase]
+
+
+class Repository(Protocol):
+    """Document store operations the services are written against.
+
+    It is the subset of the Motor collection API the services use, so one set of
+    queries runs on either backend: `AsyncIOMotorCollection` for MongoDB, or
+    `MemoryCollection` for the in-memory store.
+    """
+
+    name: str
+
+    def find(self, filter: Any = None, projection: Any = None, **kwargs: Any) -> Any: ...
+
+    async def find_one(self, filter: Any = None, projection: Any = None, *args: Any, **kwargs: Any) -> Optional[Dict[str, Any]]: ...
+
+    async def find_one_and_update(self, filter: Mapping[str, Any], update: Mapping[str, Any], **kwargs: Any) -> Optional[Dict[str, Any]]: ...
+
+    async def find_one_and_delete(self, filter: Mapping[str, Any], **kwargs: Any) -> Optional[Dict[str, Any]]: ...
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs: Any) -> Any: ...
+
+    async def insert_many(self, documents: List[Dict[str, Any]], **kwargs: Any) -> Any: ...
+
+    async def update_one(self, filter: Mapping[str, Any], update: Mapping[str, Any], **kwargs: Any) -> Any: ...
+
+    async def update_many(self, filter: Mapping[str, Any], update: Mapping[str, Any], **kwargs: Any) -> Any: ...
+
+    async def delete_one(self, filter: Mapping[str, Any], **kwargs: Any) -> Any: ...
+
+    async def delete_many(self, filter: Mapping[str, Any], **kwargs: Any) -> Any: ...
+
+    async def bulk_write(self, requests: List[Any], **kwargs: Any) -> Any: ...
+
+    def aggregate(self, pipeline: List[Mapping[str, Any]], **kwargs: Any) -> Any: ...
+
+
+# Created on first use when the in-memory backend is selected
+_memory_database: Optional[MemoryDatabase] = None
+
+
+def get_database() -> Database:
+    """Returns the database of the backend selected by `settings.storage_backend`."""
+    global _memory_database
+    if settings.storage_backend == MEMORY_BACKEND:
+        if _memory_database is None:
+            _memory_database = MemoryDatabase(settings.database_name)
+        return _memory_database
+    return get_mongo_database()
+
+
+async def ping_database(database: Database, connections: int = 1) -> None:
+    """Pings the database over `connections` concurrent requests.
+
+    Each concurrent ping checks out its own pool connection, so this also opens
+    that many connections ahead of the first requests.
+
+    Args:
+        database    (Database, required): Database to ping.
+        connections (int     , optional): Concurrent pings. Defaults to 1.
+    """
+    await asyncio.gather(*(database.command("ping") for _ in range(max(1, connections))))
+
+
+class CollectionRef:
+    """A collection resolved from the configured backend when it is used.
+
+    Services bind these at import time; the backend, and its database, are only
+    looked up on the first operation and again whenever the database changes.
+
+    Args:
+        name (str, required): Collection name.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._database: Optional[Database] = None
+        self._collection: Any = None
+
+    def _resolve(self) -> Repository:
+        _database = get_database()
+        if _database is not self._database:
+            self._collection = _database[self.name]
+            self._database = _database
+        return self._collection
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._resolve(), attr)
+
+    def __repr__(self) -> str:
+        return f"CollectionRef({self.name!r})"
+
+
+def get_collection(name: str) -> Repository:
+    """Returns a lazily resolved collection of the configured backend.
+
+    Args:
+        name (str, required): Collection name.
+    """
+    return CollectionRef(name)
+
+
+__all__ = [
+    "MONGODB_BACKEND",
+    "MEMORY_BACKEND",
+    "Repository",
+    "CollectionRef",
+    "get_database",
+    "ping_database",
+    "get_collection",
+]
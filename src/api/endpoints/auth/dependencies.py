@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from ...utilities import settings, verify_token
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_optional_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Optional[str]:
+    """Authenticate the request from its bearer token, if any, without a database lookup."""
+    if credentials is None:
+        return None
+    claims = verify_token(credentials.credentials, settings.token_secret)
+    if not claims:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return claims.user_id
+
+
+def resolve_author(body_user_id: Optional[str], auth_user_id: Optional[str]) -> Optional[str]:
+    """Pick the acting user: the token subject if authenticated, else the body's user_id."""
+    if auth_user_id is None:
+        return body_user_id
+    if body_user_id and body_user_id != auth_user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="user_id does not match token")
+    return auth_user_id
+
+
+__all__ = [
+    "bearer_scheme",
+    "get_optional_user_id",
+    "resolve_author",
+]
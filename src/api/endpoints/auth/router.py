@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status
+
+from ...utilities import settings
+from .schemas import LoginRequest, TokenResponse
+from .service import authenticate, create_access_token, upgrade_password_hash
+
+
+router = APIRouter()
+
+
+@router.post("/auth/login", response_model=TokenResponse)
+async def login_endpoint(credentials: LoginRequest, background_tasks: BackgroundTasks) -> TokenResponse:
+    """Exchange email and password for a signed session token."""
+    user, needs_rehash = await authenticate(credentials)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
+
+    # Upgrade hashes made with older Argon2 parameters after responding
+    if needs_rehash:
+        background_tasks.add_task(upgrade_password_hash, user, credentials.password)
+
+    return TokenResponse(access_token=create_access_token(user), expires_in=settings.token_ttl_seconds)
+
+
+__all__ = ["router"]
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from pydantic import BaseModel, EmailStr, SecretStr
+
+
+class LoginRequest(BaseModel):
+    email: EmailStr
+    password: SecretStr
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
+__all__ = ["LoginRequest", "TokenResponse"]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from typing import Optional, Tuple
+
+from pydantic import SecretStr
+
+from ...utilities import HashQueueFullError, async_verify_dummy, async_verify_with_rehash, issue_token, settings
+from ..user.model import User
+from ..user.service import get_user_by_email, rehash_password
+from .schemas import LoginRequest
+
+
+async def authenticate(login_data: LoginRequest) -> Tuple[Optional[User], bool]:
+    """Check credentials; returns the user (if valid) and whether its hash is outdated."""
+    user = await get_user_by_email(login_data.email)
+    if not user:
+        # Pay the same Argon2 cost as a known email, so timing does not reveal registered ones
+        await async_verify_dummy(login_data.password)
+        return None, False
+
+    check = await async_verify_with_rehash(
+        user.password,
+        login_data.password,
+        SecretStr(user.password_salt),
+        settings.password_pepper
+    )
+    if not check.is_match:
+        return None, False
+    return user, check.needs_rehash
+
+
+async def upgrade_password_hash(user: User, password: SecretStr) -> None:
+    """Re-hash an outdated password hash; skipped while hashing is saturated."""
+    try:
+        await rehash_password(user, password)
+    except HashQueueFullError:
+        # Retried on the user's next login
+        pass
+
+
+def create_access_token(user: User) -> str:
+    """Issue a signed session token for the user."""
+    return issue_token(str(user.id), settings.token_secret, settings.token_ttl_seconds)
+
+
+__all__ = [
+    "authenticate",
+    "upgrade_password_hash",
+    "create_access_token",
+]
@@ -12,6 +12,8 @@ class Comment(BaseModel):
     title: str
     post_id: ObjectId
     created_at: datetime
+    version: int = 0  # Bumped by every write; 0 for documents never written since versioning
+    updated_at: Optional[datetime] = None
 
     class Config:
         validate_by_name = True
@@ -1,99 +1,237 @@
 # -*- coding: utf-8 -*-
-from typing import List
-
-from fastapi import APIRouter, HTTPException, status
-
-from .schemas import CommentCreate, CommentResponse, CommentUpdate
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+
+from ...utilities import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    DocumentResponse,
+    accepts_ndjson,
+    document_etag,
+    fields_projection,
+    is_conditional,
+    is_not_modified,
+    last_modified,
+    model_version,
+    ndjson_response,
+    not_modified_response,
+    page_etag,
+    page_response,
+    parse_fields,
+    select_fields,
+    split_ids,
+    validator_headers,
+    with_version_fields
+)
+from ..auth.dependencies import get_optional_user_id, resolve_author
+from ..post.schemas import BatchResult
+from .model import Comment
+from .schemas import (
+    CommentBatchCreate,
+    CommentCreate,
+    CommentLookup,
+    CommentPage,
+    CommentResponse,
+    CommentUpdate
+)
 from .service import (
     create_comment,
+    create_comments,
     get_comment_by_id,
+    get_comment_document,
+    get_comment_version,
     get_comment_by_post_id,
-    get_comments_by_user,
+    get_comment_document_by_post_id,
+    get_comment_version_by_post_id,
+    get_comment_documents_by_post_ids,
+    get_comment_documents_by_user,
     update_comment,
     delete_comment,
-    get_all_comments
+    get_all_comment_documents,
+    iter_all_comment_documents
 )
 
 
 router = APIRouter()
 
 
+def to_comment_response(comment: Comment) -> CommentResponse:
+    """Build the API representation of a comment."""
+    return CommentResponse(
+        id=str(comment.id),
+        user_id=str(comment.user_id),
+        title=comment.title,
+        post_id=str(comment.post_id),
+        created_at=comment.created_at
+    )
+
+
+def render_comment(doc: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Map a raw (possibly projected) comment document to the `CommentResponse` shape."""
+    return select_fields({
+        "id": doc["_id"],
+        "user_id": doc.get("user_id"),
+        "title": doc.get("title"),
+        "post_id": doc.get("post_id"),
+        "created_at": doc.get("created_at")
+    }, fields)
+
+
+async def _get_comment(
+    request: Request,
+    response: Response,
+    fields: Optional[str],
+    get_version: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    get_document: Callable[[Optional[Dict[str, int]]], Awaitable[Optional[Dict[str, Any]]]],
+    get_comment: Callable[[], Awaitable[Optional[Comment]]]
+):
+    """Serve one comment with validators, answering conditional requests from the version fields alone."""
+    try:
+        selected = parse_fields(fields, CommentResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if is_conditional(request):
+        version = await get_version()
+        if not version:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+        etag, modified = document_etag(version), last_modified(version)
+        if is_not_modified(request, etag, modified):
+            return not_modified_response(etag, modified)
+
+    if selected:
+        doc = await get_document(with_version_fields(fields_projection(selected)))
+        if not doc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+        headers = validator_headers(document_etag(doc), last_modified(doc))
+        return DocumentResponse(render_comment(doc, selected), headers=headers)
+
+    comment = await get_comment()
+    if not comment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+    version = model_version(comment)
+    response.headers.update(validator_headers(document_etag(version), last_modified(version)))
+    return to_comment_response(comment)
+
+
+FIELDS_QUERY = Query(None, description="Comma-separated subset of response fields to return")
+POST_IDS_QUERY = Query(None, description="Comma-separated post IDs whose comments to fetch in one request")
+
+
 @router.post("/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
-async def create_comment_endpoint(comment: CommentCreate) -> CommentResponse:
+async def create_comment_endpoint(
+    comment: CommentCreate, auth_user_id: Optional[str] = Depends(get_optional_user_id)
+) -> CommentResponse:
     """Create a new comment."""
+    comment.user_id = resolve_author(comment.user_id, auth_user_id)
     try:
-        comment_obj = await create_comment(comment)
-        return CommentResponse(
-            id=str(comment_obj.id),
-            user_id=str(comment_obj.user_id),
-            title=comment_obj.title,
-            post_id=str(comment_obj.post_id),
-            created_at=comment_obj.created_at
-        )
+        comment_obj = await create_comment(comment, author_verified=auth_user_id is not None)
+        return to_comment_response(comment_obj)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.post("/comments:batch", response_model=BatchResult)
+async def create_comments_endpoint(
+    batch: CommentBatchCreate, auth_user_id: Optional[str] = Depends(get_optional_user_id)
+) -> BatchResult:
+    """Create many comments in one request; each item reports its own result."""
+    for comment in batch.items:
+        comment.user_id = resolve_author(comment.user_id, auth_user_id)
+    results = await create_comments(batch.items, author_verified=auth_user_id is not None)
+    created = sum(1 for result in results if result.error is None)
+    return BatchResult(created=created, failed=len(results) - created, results=results)
+
+
 @router.get("/comments/{comment_id}", response_model=CommentResponse)
-async def get_comment_endpoint(comment_id: str) -> CommentResponse:
+async def get_comment_endpoint(
+    comment_id: str, request: Request, response: Response, fields: Optional[str] = FIELDS_QUERY
+):
     """Get comment by ID."""
-    comment = await get_comment_by_id(comment_id)
-    if not comment:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
-    return CommentResponse(
-        id=str(comment.id),
-        user_id=str(comment.user_id),
-        title=comment.title,
-        post_id=str(comment.post_id),
-        created_at=comment.created_at
+    return await _get_comment(
+        request,
+        response,
+        fields,
+        lambda: get_comment_version(comment_id),
+        lambda projection: get_comment_document(comment_id, projection),
+        lambda: get_comment_by_id(comment_id)
     )
 
 
 @router.get("/posts/{post_id}/comment", response_model=CommentResponse)
-async def get_comment_by_post_endpoint(post_id: str) -> CommentResponse:
+async def get_comment_by_post_endpoint(
+    post_id: str, request: Request, response: Response, fields: Optional[str] = FIELDS_QUERY
+):
     """Get comment by post ID."""
-    comment = await get_comment_by_post_id(post_id)
-    if not comment:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
-    return CommentResponse(
-        id=str(comment.id),
-        user_id=str(comment.user_id),
-        title=comment.title,
-        post_id=str(comment.post_id),
-        created_at=comment.created_at
+    return await _get_comment(
+        request,
+        response,
+        fields,
+        lambda: get_comment_version_by_post_id(post_id),
+        lambda projection: get_comment_document_by_post_id(post_id, projection),
+        lambda: get_comment_by_post_id(post_id)
     )
 
 
-@router.get("/comments", response_model=List[CommentResponse])
-async def get_all_comments_endpoint() -> List[CommentResponse]:
-    """Get all comments."""
-    comments = await get_all_comments()
-    return [
-        CommentResponse(
-            id=str(comment.id),
-            user_id=str(comment.user_id),
-            title=comment.title,
-            post_id=str(comment.post_id),
-            created_at=comment.created_at
-        )
-        for comment in comments
-    ]
-
-
-@router.get("/users/{user_id}/comments", response_model=List[CommentResponse])
-async def get_comments_by_user_endpoint(user_id: str) -> List[CommentResponse]:
-    """Get all comments by a user."""
-    comments = await get_comments_by_user(user_id)
-    return [
-        CommentResponse(
-            id=str(comment.id),
-            user_id=str(comment.user_id),
-            title=comment.title,
-            post_id=str(comment.post_id),
-            created_at=comment.created_at
+@router.get(
+    "/comments",
+    response_model=Union[CommentPage, CommentLookup],
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def get_all_comments_endpoint(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY,
+    post_ids: Optional[str] = POST_IDS_QUERY
+):
+    """Get a page of comments, the comments of the posts listed in `post_ids`, or stream every comment with `Accept: application/x-ndjson`."""
+    try:
+        selected = parse_fields(fields, CommentResponse)
+        projection = fields_projection(selected)
+        if post_ids is not None:
+            docs, missing = await get_comment_documents_by_post_ids(split_ids(post_ids), with_version_fields(projection))
+            return page_response(
+                request,
+                {"items": [render_comment(doc, selected) for doc in docs], "missing": missing},
+                page_etag(docs, *missing)
+            )
+        if accepts_ndjson(request):
+            return ndjson_response(
+                iter_all_comment_documents(after, projection), lambda doc: render_comment(doc, selected)
+            )
+        docs, next_cursor = await get_all_comment_documents(limit, after, with_version_fields(projection))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return page_response(
+        request,
+        {"items": [render_comment(doc, selected) for doc in docs], "next_cursor": next_cursor},
+        page_etag(docs, next_cursor)
+    )
+
+
+@router.get("/users/{user_id}/comments", response_model=CommentPage)
+async def get_comments_by_user_endpoint(
+    user_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY
+):
+    """Get a page of comments by a user."""
+    try:
+        selected = parse_fields(fields, CommentResponse)
+        docs, next_cursor = await get_comment_documents_by_user(
+            user_id, limit, after, with_version_fields(fields_projection(selected))
         )
-        for comment in comments
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return page_response(
+        request,
+        {"items": [render_comment(doc, selected) for doc in docs], "next_cursor": next_cursor},
+        page_etag(docs, next_cursor)
+    )
 
 
 @router.put("/comments/{comment_id}", response_model=CommentResponse)
@@ -102,13 +240,7 @@ async def update_comment_endpoint(comment_id: str, comment_update: CommentUpdate
     comment = await update_comment(comment_id, comment_update)
     if not comment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
-    return CommentResponse(
-        id=str(comment.id),
-        user_id=str(comment.user_id),
-        title=comment.title,
-        post_id=str(comment.post_id),
-        created_at=comment.created_at
-    )
+    return to_comment_response(comment)
 
 
 @router.delete("/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -119,4 +251,4 @@ async def delete_comment_endpoint(comment_id: str):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
 
 
-__all__ = ["router"]
\ No newline at end of file
+__all__ = ["router"]
@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from bson import ObjectId
 from pydantic import BaseModel, Field
 
+from ..post.schemas import MAX_BATCH_ITEMS
+
 
 class CommentCreate(BaseModel):
-    user_id: str  # Will convert to ObjectId
+    user_id: Optional[str] = None  # Will convert to ObjectId; taken from the bearer token if omitted
     title: str = Field(..., min_length=1, max_length=500)
     post_id: str  # Will convert to ObjectId
 
@@ -20,8 +22,22 @@ class CommentResponse(BaseModel):
     created_at: datetime
 
 
+class CommentPage(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
+
+
+class CommentLookup(BaseModel):
+    items: List[CommentResponse]
+    missing: List[str]  # Post IDs without a comment
+
+
+class CommentBatchCreate(BaseModel):
+    items: List[CommentCreate] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
 class CommentUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=500)
 
 
-__all__ = ["CommentCreate", "CommentResponse", "CommentUpdate"]
\ No newline at end of file
+__all__ = ["CommentCreate", "CommentResponse", "CommentPage", "CommentLookup", "CommentBatchCreate", "CommentUpdate"]
\ No newline at end of file
@@ -1,35 +1,95 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorCollection
-
-from ...utilities import db
-from ..user.service import get_user_by_id
-from ..post.service import get_post_by_id, update_post
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from ...core import Repository, get_collection, register_indexes, register_query_shape
+from ...utilities import (
+    DEFAULT_PAGE_SIZE,
+    BatchLoader,
+    VERSION_PROJECTION,
+    event_broker,
+    find_by_ids,
+    keyset_filter,
+    parse_object_id,
+    settings,
+    split_page,
+    topic,
+    versioned_update
+)
+from ..user.service import existing_user_ids, user_exists
+from ..post.schemas import BatchItemResult
+from ..post.service import DUPLICATE_KEY_ERROR, get_post_document, insert_batch, post_cache, post_loader, posts_collection, update_post
 from .model import Comment
 from .schemas import CommentCreate, CommentResponse, CommentUpdate
 
 
 # Get the comments collection
-comments_collection: AsyncIOMotorCollection = db["comments"]
+comments_collection: Repository = get_collection("comments")
+
+register_indexes("comments", [
+    IndexModel([("post_id", ASCENDING)], unique=True, name="post_id_unique"),
+    IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_id"),
+])
+register_query_shape("comments", {"post_id": ObjectId()})
+register_query_shape("comments", {"user_id": ObjectId()}, [("_id", ASCENDING)])
+
+
+async def _load_comments_by_post(post_ids: List[ObjectId]) -> Dict[ObjectId, Dict[str, Any]]:
+    """Fetch the comments of many posts with one `$in` query, keyed by post ID."""
+    return {doc["post_id"]: doc async for doc in comments_collection.find({"post_id": {"$in": post_ids}})}
+
+
+# Coalesces concurrent lookups by post ID into shared, batched queries
+comment_loader: BatchLoader[ObjectId, Dict[str, Any]] = BatchLoader("comments_by_post", _load_comments_by_post)
+
+# Real-time events published on the topics of a comment's post and author
+COMMENT_CREATED = "comment.created"
+COMMENT_UPDATED = "comment.updated"
+COMMENT_DELETED = "comment.deleted"
+
+
+def _event(comment_doc: Dict[str, Any]) -> Tuple[Tuple[str, str], Dict[str, Any]]:
+    """Topics and payload of a comment event: the comment's post and its author."""
+    return (
+        (topic("post", comment_doc["post_id"]), topic("user", comment_doc["user_id"])),
+        {
+            "id": comment_doc["_id"],
+            "user_id": comment_doc["user_id"],
+            "title": comment_doc["title"],
+            "post_id": comment_doc["post_id"],
+            "created_at": comment_doc["created_at"]
+        }
+    )
+
+
+async def _publish(event_type: str, comment_doc: Dict[str, Any]) -> None:
+    """Publish a comment event to the subscribers of its post and of its author."""
+    await event_broker.publish(event_type, *_event(comment_doc))
+
+
+async def create_comment(comment_data: CommentCreate, author_verified: bool = False) -> Comment:
+    """Create a new comment.
 
+    `author_verified` skips the user lookup when `user_id` comes from a signed token.
+    """
+    if not comment_data.user_id:
+        raise ValueError("user_id is required")
 
-async def create_comment(comment_data: CommentCreate) -> Comment:
-    """Create a new comment."""
     # Check if user exists
-    user = await get_user_by_id(comment_data.user_id)
-    if not user:
+    if not author_verified and not await user_exists(comment_data.user_id):
         raise ValueError("User not found")
 
     # Check if post exists
-    post = await get_post_by_id(comment_data.post_id)
-    if not post:
+    post_doc = await get_post_document(comment_data.post_id, {"comment_id": 1})
+    if not post_doc:
         raise ValueError("Post not found")
 
     # Check if post already has a comment (one-to-one)
-    if post.comment_id is not None:
+    if post_doc.get("comment_id") is not None:
         raise ValueError("Post already has a comment")
 
     # Convert ids to ObjectId
@@ -40,31 +100,135 @@ async def create_comment(comment_data: CommentCreate) -> Comment:
         raise ValueError("Invalid user_id or post_id")
 
     # Create comment document
+    now = datetime.utcnow()
     comment_doc = {
         "user_id": user_id_obj,
         "title": comment_data.title,
         "post_id": post_id_obj,
-        "created_at": datetime.utcnow()
+        "created_at": now,
+        "version": 1,
+        "updated_at": now
     }
 
-    # Insert into database
-    result = await comments_collection.insert_one(comment_doc)
+    # Insert into database; the unique post_id index catches concurrent comments
+    try:
+        result = await comments_collection.insert_one(comment_doc)
+    except DuplicateKeyError:
+        raise ValueError("Post already has a comment")
     comment_doc["_id"] = result.inserted_id
     comment_id = result.inserted_id
+    comment_loader.forget(post_id_obj)
 
     # Update post with comment_id
     from ..post.schemas import PostUpdate
     await update_post(comment_data.post_id, PostUpdate(title=None, comment_id=str(comment_id)))
+    await _publish(COMMENT_CREATED, comment_doc)
 
     # Return Comment model
     return Comment(**comment_doc)
 
 
+async def create_comments(items: List[CommentCreate], author_verified: bool = False) -> List[BatchItemResult]:
+    """Create many comments with one `$in` check per referenced collection.
+
+    Comments are inserted with one unordered `insert_many` and linked to their posts with
+    one `bulk_write`; invalid items, and comments that could not be linked (which are
+    deleted again), are reported individually.
+    """
+    errors: Dict[int, str] = {}
+    pending: List[Tuple[int, Dict[str, Any]]] = []
+
+    # Validate ids and build documents
+    for index, comment_data in enumerate(items):
+        if not comment_data.user_id:
+            errors[index] = "user_id is required"
+            continue
+        try:
+            user_id_obj = ObjectId(comment_data.user_id)
+            post_id_obj = ObjectId(comment_data.post_id)
+        except:
+            errors[index] = "Invalid user_id or post_id"
+            continue
+        now = datetime.utcnow()
+        pending.append((index, {
+            "user_id": user_id_obj,
+            "title": comment_data.title,
+            "post_id": post_id_obj,
+            "created_at": now,
+            "version": 1,
+            "updated_at": now
+        }))
+
+    # Check that all referenced users exist
+    if not author_verified:
+        known_users = await existing_user_ids(doc["user_id"] for _, doc in pending)
+        for index, doc in pending:
+            if doc["user_id"] not in known_users:
+                errors[index] = "User not found"
+
+    # Check that all referenced posts exist and have no comment yet (one-to-one)
+    post_ids = list({doc["post_id"] for index, doc in pending if index not in errors})
+    posts = {
+        post_doc["_id"]: post_doc
+        async for post_doc in posts_collection.find({"_id": {"$in": post_ids}}, {"comment_id": 1})
+    } if post_ids else {}
+    claimed = set()
+    for index, doc in pending:
+        if index in errors:
+            continue
+        post_doc = posts.get(doc["post_id"])
+        if not post_doc:
+            errors[index] = "Post not found"
+        elif post_doc.get("comment_id") is not None or doc["post_id"] in claimed:
+            errors[index] = "Post already has a comment"
+        else:
+            claimed.add(doc["post_id"])
+    pending = [(index, doc) for index, doc in pending if index not in errors]
+
+    # Insert into database; the unique post_id index catches concurrent comments
+    insert_errors = await insert_batch(comments_collection, [doc for _, doc in pending])
+    for position, error in insert_errors.items():
+        if error.code == DUPLICATE_KEY_ERROR and "post_id" in error.key_pattern:
+            errors[pending[position][0]] = "Post already has a comment"
+        else:
+            errors[pending[position][0]] = error.message
+    inserted = [(index, doc) for index, doc in pending if index not in errors]
+
+    # Update posts with their comment_id
+    if inserted:
+        try:
+            await posts_collection.bulk_write([
+                UpdateOne({"_id": doc["post_id"]}, versioned_update({"$set": {"comment_id": doc["_id"]}}))
+                for _, doc in inserted
+            ], ordered=False)
+        except BulkWriteError as e:
+            # A comment whose post could not be linked is removed rather than left orphaned
+            for error in e.details["writeErrors"]:
+                errors[inserted[error["index"]][0]] = error.get("errmsg", "Failed to link the comment to its post")
+            unlinked = [doc for index, doc in inserted if index in errors]
+            await comments_collection.delete_many({"_id": {"$in": [doc["_id"] for doc in unlinked]}})
+            for doc in unlinked:
+                comment_loader.forget(doc["post_id"])
+            inserted = [(index, doc) for index, doc in inserted if index not in errors]
+        for _, doc in inserted:
+            post_cache.invalidate(doc["post_id"])
+            post_loader.forget(doc["post_id"])
+            comment_loader.forget(doc["post_id"])
+        # One relay write for the whole batch, like the inserts above
+        await event_broker.publish_many(COMMENT_CREATED, [_event(doc) for _, doc in inserted])
+
+    inserted_ids = {index: doc["_id"] for index, doc in inserted}
+    return [
+        BatchItemResult(index=index, error=errors[index]) if index in errors
+        else BatchItemResult(index=index, id=str(inserted_ids[index]))
+        for index in range(len(items))
+    ]
+
+
 async def get_comment_by_id(comment_id: str) -> Optional[Comment]:
     """Get comment by ID."""
-    try:
-        obj_id = ObjectId(comment_id)
-    except:
+    obj_id = parse_object_id(comment_id)
+    if obj_id is None:
         return None
 
     comment_doc = await comments_collection.find_one({"_id": obj_id})
@@ -73,28 +237,88 @@ async def get_comment_by_id(comment_id: str) -> Optional[Comment]:
     return None
 
 
+async def get_comment_document(
+    comment_id: str, projection: Optional[Dict[str, int]] = None
+) -> Optional[Dict[str, Any]]:
+    """Get a raw comment document by ID, optionally projected."""
+    obj_id = parse_object_id(comment_id)
+    if obj_id is None:
+        return None
+
+    return await comments_collection.find_one({"_id": obj_id}, projection)
+
+
+async def get_comment_version(comment_id: str) -> Optional[Dict[str, Any]]:
+    """Get only the fields a comment's ETag and Last-Modified derive from, for conditional requests."""
+    obj_id = parse_object_id(comment_id)
+    if obj_id is None:
+        return None
+
+    return await comments_collection.find_one({"_id": obj_id}, VERSION_PROJECTION)
+
+
 async def get_comment_by_post_id(post_id: str) -> Optional[Comment]:
     """Get comment by post ID (one-to-one)."""
-    try:
-        post_id_obj = ObjectId(post_id)
-    except:
+    post_id_obj = parse_object_id(post_id)
+    if post_id_obj is None:
         return None
 
-    comment_doc = await comments_collection.find_one({"post_id": post_id_obj})
+    comment_doc = await comment_loader.load(post_id_obj)
     if comment_doc:
         return Comment(**comment_doc)
     return None
 
 
-async def get_comments_by_user(user_id: str) -> List[Comment]:
-    """Get all comments by a user."""
+async def get_comment_document_by_post_id(
+    post_id: str, projection: Optional[Dict[str, int]] = None
+) -> Optional[Dict[str, Any]]:
+    """Get a raw comment document by post ID, optionally projected."""
+    post_id_obj = parse_object_id(post_id)
+    if post_id_obj is None:
+        return None
+
+    return await comments_collection.find_one({"post_id": post_id_obj}, projection)
+
+
+async def get_comment_version_by_post_id(post_id: str) -> Optional[Dict[str, Any]]:
+    """Get only the version fields of a post's comment, for conditional requests."""
+    post_id_obj = parse_object_id(post_id)
+    if post_id_obj is None:
+        return None
+
+    return await comments_collection.find_one({"post_id": post_id_obj}, VERSION_PROJECTION)
+
+
+async def get_comment_documents_by_post_ids(
+    post_ids: List[str], projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Get raw comment documents for many post IDs in input order, plus the post IDs without a comment."""
+    return await find_by_ids(comments_collection, post_ids, projection, key="post_id")
+
+
+async def get_comment_documents_by_user(
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Get a page of raw comment documents by a user and the cursor of the next page."""
     try:
         user_id_obj = ObjectId(user_id)
     except:
-        return []
+        return [], None
+
+    query = keyset_filter({"user_id": user_id_obj}, after)
+    comments_docs = await comments_collection.find(query, projection).sort("_id", 1).to_list(length=limit + 1)
+    return split_page(comments_docs, limit)
 
-    comments_docs = await comments_collection.find({"user_id": user_id_obj}).to_list(length=None)
-    return [Comment(**doc) for doc in comments_docs]
+
+async def get_comments_by_user(
+    user_id: str, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+) -> Tuple[List[Comment], Optional[str]]:
+    """Get a page of comments by a user and the cursor of the next page."""
+    page_docs, next_cursor = await get_comment_documents_by_user(user_id, limit, after)
+    return [Comment(**doc) for doc in page_docs], next_cursor
 
 
 async def update_comment(comment_id: str, update_data: CommentUpdate) -> Optional[Comment]:
@@ -108,13 +332,18 @@ async def update_comment(comment_id: str, update_data: CommentUpdate) -> Optiona
     if update_data.title is not None:
         update_dict["title"] = update_data.title
 
-    if update_dict:
-        result = await comments_collection.update_one(
-            {"_id": obj_id},
-            {"$set": update_dict}
-        )
-        if result.modified_count > 0:
-            return await get_comment_by_id(comment_id)
+    if not update_dict:
+        return await get_comment_by_id(comment_id)
+
+    comment_doc = await comments_collection.find_one_and_update(
+        {"_id": obj_id},
+        versioned_update({"$set": update_dict}),
+        return_document=ReturnDocument.AFTER
+    )
+    if comment_doc:
+        comment_loader.forget(comment_doc["post_id"])
+        await _publish(COMMENT_UPDATED, comment_doc)
+        return Comment(**comment_doc)
     return None
 
 
@@ -125,33 +354,71 @@ async def delete_comment(comment_id: str) -> bool:
     except:
         return False
 
-    # Get comment to find post_id
-    comment = await get_comment_by_id(comment_id)
-    if not comment:
+    # Delete comment, getting its post_id back in the same round trip
+    comment_doc = await comments_collection.find_one_and_delete({"_id": obj_id})
+    if not comment_doc:
         return False
 
-    # Delete comment
-    result = await comments_collection.delete_one({"_id": obj_id})
-    if result.deleted_count > 0:
-        # Update post to remove comment_id
-        from ..post.schemas import PostUpdate
-        await update_post(str(comment.post_id), PostUpdate(title=None, comment_id=None))
-        return True
-    return False
+    # Update post to remove comment_id, unless it already points elsewhere
+    await posts_collection.update_one(
+        {"_id": comment_doc["post_id"], "comment_id": obj_id},
+        versioned_update({"$set": {"comment_id": None}})
+    )
+    post_cache.invalidate(comment_doc["post_id"])
+    post_loader.forget(comment_doc["post_id"])
+    comment_loader.forget(comment_doc["post_id"])
+    await _publish(COMMENT_DELETED, comment_doc)
+    return True
+
+
+async def get_all_comment_documents(
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Get a page of raw comment documents and the cursor of the next page."""
+    query = keyset_filter({}, after)
+    comments_docs = await comments_collection.find(query, projection).sort("_id", 1).to_list(length=limit + 1)
+    return split_page(comments_docs, limit)
+
+
+async def get_all_comments(
+    limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+) -> Tuple[List[Comment], Optional[str]]:
+    """Get a page of comments and the cursor of the next page."""
+    page_docs, next_cursor = await get_all_comment_documents(limit, after)
+    return [Comment(**doc) for doc in page_docs], next_cursor
+
 
+def iter_all_comment_documents(
+    after: Optional[str] = None, projection: Optional[Dict[str, int]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Iterate over all raw comment documents in `_id` order, fetching them in bounded batches.
 
-async def get_all_comments() -> List[Comment]:
-    """Get all comments."""
-    comments_docs = await comments_collection.find().to_list(length=None)
-    return [Comment(**doc) for doc in comments_docs]
+    The cursor is validated eagerly so a bad `after` fails before streaming starts.
+    """
+    query = keyset_filter({}, after)
+    return comments_collection.find(query, projection).sort("_id", 1).batch_size(settings.stream_batch_size)
 
 
 __all__ = [
+    "COMMENT_CREATED",
+    "COMMENT_UPDATED",
+    "COMMENT_DELETED",
     "create_comment",
+    "create_comments",
     "get_comment_by_id",
+    "get_comment_document",
+    "get_comment_version",
     "get_comment_by_post_id",
+    "get_comment_document_by_post_id",
+    "get_comment_version_by_post_id",
+    "get_comment_documents_by_post_ids",
+    "get_comment_documents_by_user",
     "get_comments_by_user",
     "update_comment",
     "delete_comment",
+    "get_all_comment_documents",
     "get_all_comments",
+    "iter_all_comment_documents",
 ]
\ No newline at end of file
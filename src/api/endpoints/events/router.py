@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, HTTPException, WebSocket, status
+from fastapi.responses import StreamingResponse
+
+from ...utilities import Subscription, event_broker, settings
+from .service import post_topics, user_topics
+
+
+router = APIRouter()
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Sent to a subscriber dropped for falling behind; it should re-read and resubscribe
+DROPPED_EVENT = 'event: dropped\ndata: {"reason": "slow consumer"}\n\n'
+
+
+async def _sse_events(topics: List[str]) -> AsyncIterator[str]:
+    """Server-Sent Events of `topics`, with keep-alive comments while idle."""
+    # Subscribed when the body starts, so the finally clause always unsubscribes
+    subscription = event_broker.subscribe(topics)
+    try:
+        yield ": subscribed\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.events_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                if subscription.dropped:
+                    yield DROPPED_EVENT
+                return
+            yield f"event: {event.type}\ndata: {event.message}\n\n"
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+def sse_response(topics: Optional[List[str]], not_found: str) -> StreamingResponse:
+    """Stream the events of `topics` as Server-Sent Events; 404 if the resource does not exist."""
+    if topics is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    return StreamingResponse(
+        _sse_events(topics),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription) -> None:
+    while True:
+        event = await subscription.get()
+        if event is None:
+            if subscription.dropped:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="slow consumer")
+            else:
+                await websocket.close(code=status.WS_1001_GOING_AWAY)
+            return
+        await websocket.send_text(event.message)
+
+
+async def stream_to_socket(websocket: WebSocket, topics: Optional[List[str]]) -> None:
+    """Send the events of `topics` as WebSocket text messages until either side closes.
+
+    A subscriber dropped for falling behind is closed with code 1013 (try again later).
+    """
+    if topics is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Not found")
+        return
+    await websocket.accept()
+    subscription = event_broker.subscribe(topics)
+    # Events are sent from a task of their own; this one reads until the client disconnects,
+    # which it also does after the server closes the socket
+    sender = asyncio.create_task(_send_events(websocket, subscription))
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        event_broker.unsubscribe(subscription)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
+
+SSE_RESPONSES = {200: {"content": {SSE_MEDIA_TYPE: {}}}}
+
+
+@router.get("/posts/{post_id}/events", response_class=StreamingResponse, responses=SSE_RESPONSES)
+async def post_events_endpoint(post_id: str):
+    """Stream created, updated and deleted comments of a post as Server-Sent Events.
+
+    The same path accepts WebSocket connections.
+    """
+    return sse_response(await post_topics(post_id), "Post not found")
+
+
+@router.websocket("/posts/{post_id}/events")
+async def post_events_socket(websocket: WebSocket, post_id: str):
+    """Send created, updated and deleted comments of a post over a WebSocket."""
+    await stream_to_socket(websocket, await post_topics(post_id))
+
+
+@router.get("/users/{user_id}/events", response_class=StreamingResponse, responses=SSE_RESPONSES)
+async def user_events_endpoint(user_id: str):
+    """Stream created, updated and deleted comments written by a user as Server-Sent Events.
+
+    The same path accepts WebSocket connections.
+    """
+    return sse_response(await user_topics(user_id), "User not found")
+
+
+@router.websocket("/users/{user_id}/events")
+async def user_events_socket(websocket: WebSocket, user_id: str):
+    """Send created, updated and deleted comments written by a user over a WebSocket."""
+    await stream_to_socket(websocket, await user_topics(user_id))
+
+
+__all__ = ["router"]
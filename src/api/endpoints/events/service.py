@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from typing import List, Optional
+
+from ...utilities import ID_ONLY_PROJECTION, parse_object_id, topic
+from ..post.service import get_post_document
+from ..user.service import user_exists
+
+
+async def post_topics(post_id: str) -> Optional[List[str]]:
+    """Topics to subscribe to for a post's comment events, or None if the post does not exist."""
+    post_doc = await get_post_document(post_id, ID_ONLY_PROJECTION)
+    if not post_doc:
+        return None
+    return [topic("post", post_doc["_id"])]
+
+
+async def user_topics(user_id: str) -> Optional[List[str]]:
+    """Topics to subscribe to for the events of a user's comments, or None if the user does not exist."""
+    if not await user_exists(user_id):
+        return None
+    return [topic("user", parse_object_id(user_id))]
+
+
+__all__ = ["post_topics", "user_topics"]
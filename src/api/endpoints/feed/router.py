@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from ...utilities import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DocumentResponse
+from ..post.router import render_post
+from .schemas import FeedPage
+from .service import SORT_CREATED_AT, get_feed_documents
+
+
+router = APIRouter()
+
+
+def _render_author(authors: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not authors:
+        return None
+    return {"id": authors[0]["_id"], "username": authors[0].get("username")}
+
+
+def render_feed_item(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an aggregated feed document to the `FeedItem` shape."""
+    item = render_post(doc)
+    item.pop("comment_id", None)
+    item["author"] = _render_author(doc.get("author"))
+    comment = doc.get("comment")
+    item["comment"] = {
+        "id": comment["_id"],
+        "user_id": comment.get("user_id"),
+        "title": comment.get("title"),
+        "created_at": comment.get("created_at"),
+        "author": _render_author(doc.get("comment_author"))
+    } if comment else None
+    return item
+
+
+SORT_QUERY = Query(SORT_CREATED_AT, pattern="^(created_at|score)$", description="Order posts by `created_at` or `score`, highest first")
+
+
+async def _feed_page(user_id: Optional[str], sort: str, limit: int, after: Optional[str]) -> DocumentResponse:
+    try:
+        docs, next_cursor = await get_feed_documents(user_id, sort, limit, after)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return DocumentResponse({"items": [render_feed_item(doc) for doc in docs], "next_cursor": next_cursor})
+
+
+@router.get("/feed", response_model=FeedPage)
+async def get_feed_endpoint(
+    sort: str = SORT_QUERY,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """Get a page of posts with their comment and authors embedded."""
+    return await _feed_page(None, sort, limit, after)
+
+
+@router.get("/users/{user_id}/feed", response_model=FeedPage)
+async def get_user_feed_endpoint(
+    user_id: str,
+    sort: str = SORT_QUERY,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """Get a page of a user's posts with their comment and authors embedded."""
+    return await _feed_page(user_id, sort, limit, after)
+
+
+__all__ = ["router"]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class FeedAuthor(BaseModel):
+    id: str
+    username: str
+
+
+class FeedComment(BaseModel):
+    id: str
+    user_id: str
+    title: str
+    created_at: datetime
+    author: Optional[FeedAuthor] = None
+
+
+class FeedItem(BaseModel):
+    id: str
+    user_id: str
+    title: str
+    upvotes: int
+    downvotes: int
+    created_at: datetime
+    author: Optional[FeedAuthor] = None
+    comment: Optional[FeedComment] = None
+
+
+class FeedPage(BaseModel):
+    items: List[FeedItem]
+    next_cursor: Optional[str] = None
+
+
+__all__ = ["FeedAuthor", "FeedComment", "FeedItem", "FeedPage"]
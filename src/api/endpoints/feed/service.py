@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from ...core import register_indexes, register_query_shape
+from ...utilities import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from ..comment.service import comments_collection
+from ..post.service import posts_collection
+from ..user.service import users_collection
+
+
+# Orders a feed can be sorted by, newest or highest first
+SORT_CREATED_AT = "created_at"
+SORT_SCORE = "score"
+SORT_ORDERS = (SORT_CREATED_AT, SORT_SCORE)
+
+register_indexes("posts", [
+    IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+    IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_id_created_at_id"),
+    IndexModel([(SORT_SCORE, DESCENDING), ("_id", DESCENDING)], name="score_id"),
+    IndexModel([("user_id", ASCENDING), (SORT_SCORE, DESCENDING), ("_id", DESCENDING)], name="user_id_score_id"),
+])
+for _sort in SORT_ORDERS:
+    register_query_shape("posts", {}, [(_sort, DESCENDING), ("_id", DESCENDING)])
+    register_query_shape("posts", {"user_id": ObjectId()}, [(_sort, DESCENDING), ("_id", DESCENDING)])
+
+# Type of the sort key a cursor may carry for each order
+SORT_KEY_TYPES = {SORT_CREATED_AT: datetime, SORT_SCORE: int}
+
+
+def _feed_keyset(sort: str, after: Optional[str]) -> Dict[str, Any]:
+    """Filter matching posts after the cursor in `(sort key, _id)` descending order."""
+    if not after:
+        return {}
+    values = decode_cursor(after)
+    # The sort key is used as a query value, so anything but the expected scalar
+    # (e.g. a `{"$ne": null}` document) is rejected rather than read as an operator
+    if len(values) != 2 or not isinstance(values[1], ObjectId):
+        raise ValueError("Invalid cursor")
+    value, last_id = values
+    if sort == SORT_SCORE and value is None:
+        # Posts without a stored score (not yet backfilled) sort last, ordered by _id
+        return {sort: None, "_id": {"$lt": last_id}}
+    if not isinstance(value, SORT_KEY_TYPES[sort]) or isinstance(value, bool):
+        raise ValueError("Invalid cursor")
+    keyset: List[Dict[str, Any]] = [
+        {sort: {"$lt": value}},
+        {sort: value, "_id": {"$lt": last_id}},
+    ]
+    if sort == SORT_SCORE:
+        # Range operators never match a missing field, though the index sorts it lowest
+        keyset.append({sort: None})
+    return {"$or": keyset}
+
+
+def _feed_pipeline(match: Dict[str, Any], sort: str, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """Build the aggregation returning a page of posts with their comment and author usernames.
+
+    Both orders match and sort on stored fields, so a page is read from the
+    `(sort key, _id)` indexes instead of ranking every matching post.
+    """
+    return [
+        {"$match": {**match, **_feed_keyset(sort, after)}},
+        {"$sort": {sort: -1, "_id": -1}},
+        {"$limit": limit + 1},
+        # One-to-one comment, served by the unique post_id index
+        {"$lookup": {
+            "from": comments_collection.name,
+            "localField": "_id",
+            "foreignField": "post_id",
+            "as": "comment"
+        }},
+        {"$unwind": {"path": "$comment", "preserveNullAndEmptyArrays": True}},
+        # Post and comment authors, served by the _id index
+        {"$lookup": {
+            "from": users_collection.name,
+            "localField": "user_id",
+            "foreignField": "_id",
+            "as": "author"
+        }},
+        {"$lookup": {
+            "from": users_collection.name,
+            "localField": "comment.user_id",
+            "foreignField": "_id",
+            "as": "comment_author"
+        }},
+        {"$project": {
+            "user_id": 1,
+            "title": 1,
+            "upvotes": 1,
+            "downvotes": 1,
+            "created_at": 1,
+            SORT_SCORE: 1,
+            "comment._id": 1,
+            "comment.user_id": 1,
+            "comment.title": 1,
+            "comment.created_at": 1,
+            "author._id": 1,
+            "author.username": 1,
+            "comment_author._id": 1,
+            "comment_author.username": 1
+        }},
+    ]
+
+
+async def get_feed_documents(
+    user_id: Optional[str] = None,
+    sort: str = SORT_CREATED_AT,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Get a page of feed documents and the cursor of the next page with one aggregation.
+
+    Each document is a post with its `comment` (if any) and the `author` / `comment_author` of each embedded.
+    """
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort: {sort}")
+    match: Dict[str, Any] = {}
+    if user_id is not None:
+        try:
+            match["user_id"] = ObjectId(user_id)
+        except:
+            return [], None
+
+    docs = await posts_collection.aggregate(_feed_pipeline(match, sort, after, limit)).to_list(length=limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    page = docs[:limit]
+    return page, encode_cursor([page[-1].get(sort), page[-1]["_id"]])
+
+
+__all__ = [
+    "SORT_CREATED_AT",
+    "SORT_SCORE",
+    "SORT_ORDERS",
+    "get_feed_documents",
+]
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+
+from ...core import Repository
+from ...utilities import settings, versioned_update
+from .model import Post
+from .service import post_cache, post_loader, posts_collection
+
+
+logger = logging.getLogger(__name__)
+
+Delta = Dict[str, int]
+
+
+def _merge(target: Dict[ObjectId, Delta], post_id: ObjectId, delta: Delta) -> None:
+    counters = target.setdefault(post_id, {})
+    for field, amount in delta.items():
+        counters[field] = counters.get(field, 0) + amount
+
+
+class CounterBuffer:
+    """Coalesces post counter increments in memory and writes them behind in bulk.
+
+    Deltas are summed per post and flushed as one unordered `bulk_write` of `$inc`
+    operations every `flush_interval_ms` or once `max_pending` deltas are queued.
+
+    A flush never applies an increment twice: only the operations a `BulkWriteError`
+    lists as failed, or a whole batch that never reached a server, are retried. When
+    the outcome is unknown (e.g. a network error mid-write) the increments are dropped
+    and logged, since retrying them could count the same votes again.
+    """
+
+    def __init__(
+        self,
+        collection: Repository,
+        flush_interval_ms: int,
+        max_pending: int,
+    ):
+        self._collection = collection
+        self._flush_interval = flush_interval_ms / 1000
+        self._max_pending = max_pending
+        self._pending: Dict[ObjectId, Delta] = {}
+        self._inflight: Dict[ObjectId, Delta] = {}
+        self._pending_count = 0
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_tasks = set()
+
+    def add(self, post_id: ObjectId, delta: Delta) -> None:
+        """Queue counter increments for a post."""
+        _merge(self._pending, post_id, delta)
+        self._pending_count += 1
+        if self._pending_count >= self._max_pending:
+            task = asyncio.create_task(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    def pending(self, post_id: ObjectId) -> Delta:
+        """Increments for a post that are not yet persisted."""
+        delta: Delta = {}
+        for source in (self._inflight, self._pending):
+            for field, amount in source.get(post_id, {}).items():
+                delta[field] = delta.get(field, 0) + amount
+        return delta
+
+    def overlay(self, post: Post) -> Post:
+        """Return the post with its unpersisted increments applied."""
+        delta = self.pending(post.id)
+        if not delta:
+            return post
+        return post.model_copy(update={
+            field: getattr(post, field) + amount for field, amount in delta.items()
+        })
+
+    async def flush(self) -> int:
+        """Write all queued increments; returns the number of posts updated."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            self._inflight, self._pending = self._pending, {}
+            self._pending_count = 0
+            batch = list(self._inflight.items())
+            operations = [
+                UpdateOne({"_id": post_id}, versioned_update({"$inc": delta}))
+                for post_id, delta in batch
+            ]
+            try:
+                await self._collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as error:
+                # The other operations of an unordered bulk write were applied
+                failed = {write_error["index"] for write_error in error.details.get("writeErrors", [])}
+                self._requeue(batch[index] for index in failed)
+                logger.warning("Requeued counter increments of %d posts after write errors", len(failed))
+                return len(operations) - len(failed)
+            except ServerSelectionTimeoutError:
+                # No server was reached, so nothing was written; retry on the next flush
+                self._requeue(batch)
+                raise
+            except Exception:
+                logger.exception("Dropped counter increments of %d posts after a write of unknown outcome", len(batch))
+                return 0
+            finally:
+                # Cached posts predate the flushed increments
+                for post_id in self._inflight:
+                    post_cache.invalidate(post_id)
+                    post_loader.forget(post_id)
+                self._inflight = {}
+            return len(operations)
+
+    def _requeue(self, deltas: Iterable[Tuple[ObjectId, Delta]]) -> None:
+        for post_id, delta in deltas:
+            _merge(self._pending, post_id, delta)
+            self._pending_count += 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush post counters")
+
+    async def start(self) -> None:
+        """Start the periodic flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush task and write whatever is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+counter_buffer = CounterBuffer(
+    posts_collection,
+    settings.vote_buffer_flush_interval_ms,
+    settings.vote_buffer_max_pending,
+)
+
+
+__all__ = ["CounterBuffer", "counter_buffer"]
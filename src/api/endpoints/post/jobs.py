@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict
+
+from ...core import delete_in_batches, job_queue
+from ..comment.service import comment_loader, comments_collection
+from ..vote.service import votes_collection
+from .service import DELETE_POST_CONTENT_JOB
+
+
+@job_queue.register(DELETE_POST_CONTENT_JOB)
+async def delete_post_content(payload: Dict[str, Any]) -> None:
+    """Delete the comment and votes left behind by a deleted post."""
+    post_id = payload["post_id"]
+    await comments_collection.delete_one({"post_id": post_id})
+    comment_loader.forget(post_id)
+    await delete_in_batches(votes_collection, {"post_id": post_id})
+
+
+__all__ = ["delete_post_content"]
@@ -12,8 +12,11 @@ class Post(BaseModel):
     title: str
     upvotes: int = 0
     downvotes: int = 0
+    score: int = 0  # upvotes - downvotes, stored so the score-ordered feed pages on an index
     created_at: datetime
     comment_id: Optional[ObjectId] = None
+    version: int = 0  # Bumped by every write; 0 for documents never written since versioning
+    updated_at: Optional[datetime] = None
 
     class Config:
         validate_by_name = True
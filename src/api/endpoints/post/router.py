@@ -1,84 +1,235 @@
 # -*- coding: utf-8 -*-
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+
+from ...utilities import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    DocumentResponse,
+    accepts_ndjson,
+    document_etag,
+    fields_projection,
+    is_conditional,
+    is_not_modified,
+    last_modified,
+    model_version,
+    ndjson_response,
+    not_modified_response,
+    page_etag,
+    page_response,
+    parse_fields,
+    select_fields,
+    settings,
+    split_ids,
+    validator_headers,
+    with_version_fields
+)
+from ..auth.dependencies import get_optional_user_id, resolve_author
+from .counters import counter_buffer
+from .model import Post
+from .schemas import BatchResult, PostBatchCreate, PostCreate, PostLookup, PostPage, PostResponse, PostUpdate
+from .service import (
+    create_post,
+    create_posts,
+    get_post_by_id,
+    get_post_document,
+    get_post_version,
+    get_post_documents_by_ids,
+    get_post_documents_by_user,
+    update_post,
+    delete_post,
+    get_all_post_documents,
+    iter_all_post_documents
+)
 
-from fastapi import APIRouter, HTTPException, status
 
-from .schemas import PostCreate, PostResponse, PostUpdate
-from .service import create_post, get_post_by_id, get_posts_by_user, update_post, delete_post, get_all_posts
+router = APIRouter()
 
 
-router = APIRouter()
+def to_post_response(post: Post) -> PostResponse:
+    """Build the API representation of a post."""
+    if settings.vote_buffer_enabled and settings.vote_buffer_overlay:
+        # Include votes still waiting in the write-behind buffer
+        post = counter_buffer.overlay(post)
+    return PostResponse(
+        id=str(post.id),
+        user_id=str(post.user_id),
+        title=post.title,
+        upvotes=post.upvotes,
+        downvotes=post.downvotes,
+        created_at=post.created_at,
+        comment_id=str(post.comment_id) if post.comment_id else None
+    )
+
+
+def render_post(doc: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Map a raw (possibly projected) post document to the `PostResponse` shape."""
+    upvotes = doc.get("upvotes", 0)
+    downvotes = doc.get("downvotes", 0)
+    if settings.vote_buffer_enabled and settings.vote_buffer_overlay:
+        # Include votes still waiting in the write-behind buffer
+        delta = counter_buffer.pending(doc["_id"])
+        upvotes += delta.get("upvotes", 0)
+        downvotes += delta.get("downvotes", 0)
+    return select_fields({
+        "id": doc["_id"],
+        "user_id": doc.get("user_id"),
+        "title": doc.get("title"),
+        "upvotes": upvotes,
+        "downvotes": downvotes,
+        "created_at": doc.get("created_at"),
+        "comment_id": doc.get("comment_id")
+    }, fields)
+
+
+def _pending_votes(post_id: Any) -> Dict[str, int]:
+    if settings.vote_buffer_enabled and settings.vote_buffer_overlay:
+        return counter_buffer.pending(post_id)
+    return {}
+
+
+def post_validators(doc: Mapping[str, Any]) -> Tuple[str, Optional[datetime]]:
+    """ETag and Last-Modified of a post document.
+
+    Votes still waiting in the write-behind buffer are part of the representation,
+    so they are folded into the ETag; Last-Modified is then unknown and omitted.
+    """
+    delta = _pending_votes(doc["_id"])
+    if delta:
+        return document_etag(doc, f"+{delta.get('upvotes', 0)}/{delta.get('downvotes', 0)}"), None
+    return document_etag(doc), last_modified(doc)
+
+
+def post_page_etag(docs: List[Dict[str, Any]], *extra: Any) -> str:
+    """Weak ETag of a page of post documents, including buffered votes."""
+    pending = []
+    for doc in docs:
+        delta = _pending_votes(doc["_id"])
+        if delta:
+            pending.append((doc["_id"], delta))
+    return page_etag(docs, *extra, *pending)
+
+
+FIELDS_QUERY = Query(None, description="Comma-separated subset of response fields to return")
+IDS_QUERY = Query(None, description="Comma-separated post IDs to fetch in one request")
 
 
 @router.post("/posts", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
-async def create_post_endpoint(post: PostCreate) -> PostResponse:
+async def create_post_endpoint(
+    post: PostCreate, auth_user_id: Optional[str] = Depends(get_optional_user_id)
+) -> PostResponse:
     """Create a new post."""
+    post.user_id = resolve_author(post.user_id, auth_user_id)
     try:
-        post_obj = await create_post(post)
-        return PostResponse(
-            id=str(post_obj.id),
-            user_id=str(post_obj.user_id),
-            title=post_obj.title,
-            upvotes=post_obj.upvotes,
-            downvotes=post_obj.downvotes,
-            created_at=post_obj.created_at,
-            comment_id=str(post_obj.comment_id) if post_obj.comment_id else None
-        )
+        post_obj = await create_post(post, author_verified=auth_user_id is not None)
+        return to_post_response(post_obj)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.post("/posts:batch", response_model=BatchResult)
+async def create_posts_endpoint(
+    batch: PostBatchCreate, auth_user_id: Optional[str] = Depends(get_optional_user_id)
+) -> BatchResult:
+    """Create many posts in one request; each item reports its own result."""
+    for post in batch.items:
+        post.user_id = resolve_author(post.user_id, auth_user_id)
+    results = await create_posts(batch.items, author_verified=auth_user_id is not None)
+    created = sum(1 for result in results if result.error is None)
+    return BatchResult(created=created, failed=len(results) - created, results=results)
+
+
 @router.get("/posts/{post_id}", response_model=PostResponse)
-async def get_post_endpoint(post_id: str) -> PostResponse:
-    """Get post by ID."""
+async def get_post_endpoint(
+    post_id: str, request: Request, response: Response, fields: Optional[str] = FIELDS_QUERY
+):
+    """Get post by ID; answers `If-None-Match` / `If-Modified-Since` with 304 from the version fields alone."""
+    try:
+        selected = parse_fields(fields, PostResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if is_conditional(request):
+        version = await get_post_version(post_id)
+        if not version:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+        etag, modified = post_validators(version)
+        if is_not_modified(request, etag, modified):
+            return not_modified_response(etag, modified)
+
+    if selected:
+        doc = await get_post_document(post_id, with_version_fields(fields_projection(selected)))
+        if not doc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+        return DocumentResponse(render_post(doc, selected), headers=validator_headers(*post_validators(doc)))
+
     post = await get_post_by_id(post_id)
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    return PostResponse(
-        id=str(post.id),
-        user_id=str(post.user_id),
-        title=post.title,
-        upvotes=post.upvotes,
-        downvotes=post.downvotes,
-        created_at=post.created_at,
-        comment_id=str(post.comment_id) if post.comment_id else None
+    response.headers.update(validator_headers(*post_validators(model_version(post))))
+    return to_post_response(post)
+
+
+@router.get(
+    "/posts",
+    response_model=Union[PostPage, PostLookup],
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def get_all_posts_endpoint(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY,
+    ids: Optional[str] = IDS_QUERY
+):
+    """Get a page of posts, the posts listed in `ids`, or stream every post with `Accept: application/x-ndjson`."""
+    try:
+        selected = parse_fields(fields, PostResponse)
+        projection = fields_projection(selected)
+        if ids is not None:
+            docs, missing = await get_post_documents_by_ids(split_ids(ids), with_version_fields(projection))
+            return page_response(
+                request,
+                {"items": [render_post(doc, selected) for doc in docs], "missing": missing},
+                post_page_etag(docs, *missing)
+            )
+        if accepts_ndjson(request):
+            return ndjson_response(
+                iter_all_post_documents(after, projection), lambda doc: render_post(doc, selected)
+            )
+        docs, next_cursor = await get_all_post_documents(limit, after, with_version_fields(projection))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return page_response(
+        request,
+        {"items": [render_post(doc, selected) for doc in docs], "next_cursor": next_cursor},
+        post_page_etag(docs, next_cursor)
     )
 
 
-@router.get("/posts", response_model=List[PostResponse])
-async def get_all_posts_endpoint() -> List[PostResponse]:
-    """Get all posts."""
-    posts = await get_all_posts()
-    return [
-        PostResponse(
-            id=str(post.id),
-            user_id=str(post.user_id),
-            title=post.title,
-            upvotes=post.upvotes,
-            downvotes=post.downvotes,
-            created_at=post.created_at,
-            comment_id=str(post.comment_id) if post.comment_id else None
-        )
-        for post in posts
-    ]
-
-
-@router.get("/users/{user_id}/posts", response_model=List[PostResponse])
-async def get_posts_by_user_endpoint(user_id: str) -> List[PostResponse]:
-    """Get all posts by a user."""
-    posts = await get_posts_by_user(user_id)
-    return [
-        PostResponse(
-            id=str(post.id),
-            user_id=str(post.user_id),
-            title=post.title,
-            upvotes=post.upvotes,
-            downvotes=post.downvotes,
-            created_at=post.created_at,
-            comment_id=str(post.comment_id) if post.comment_id else None
+@router.get("/users/{user_id}/posts", response_model=PostPage)
+async def get_posts_by_user_endpoint(
+    user_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY
+):
+    """Get a page of posts by a user."""
+    try:
+        selected = parse_fields(fields, PostResponse)
+        docs, next_cursor = await get_post_documents_by_user(
+            user_id, limit, after, with_version_fields(fields_projection(selected))
         )
-        for post in posts
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return page_response(
+        request,
+        {"items": [render_post(doc, selected) for doc in docs], "next_cursor": next_cursor},
+        post_page_etag(docs, next_cursor)
+    )
 
 
 @router.put("/posts/{post_id}", response_model=PostResponse)
@@ -88,15 +239,7 @@ async def update_post_endpoint(post_id: str, post_update: PostUpdate) -> PostRes
         post = await update_post(post_id, post_update)
         if not post:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-        return PostResponse(
-            id=str(post.id),
-            user_id=str(post.user_id),
-            title=post.title,
-            upvotes=post.upvotes,
-            downvotes=post.downvotes,
-            created_at=post.created_at,
-            comment_id=str(post.comment_id) if post.comment_id else None
-        )
+        return to_post_response(post)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
@@ -109,4 +252,4 @@ async def delete_post_endpoint(post_id: str):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
 
-__all__ = ["router"]
\ No newline at end of file
+__all__ = ["router"]
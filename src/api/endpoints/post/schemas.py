@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from bson import ObjectId
 from pydantic import BaseModel, Field
 
 
 class PostCreate(BaseModel):
-    user_id: str  # Will convert to ObjectId
+    user_id: Optional[str] = None  # Will convert to ObjectId; taken from the bearer token if omitted
     title: str = Field(..., min_length=1, max_length=200)
     comment_id: Optional[str] = None
 
@@ -22,6 +22,36 @@ class PostResponse(BaseModel):
     comment_id: Optional[str] = None
 
 
+class PostPage(BaseModel):
+    items: List[PostResponse]
+    next_cursor: Optional[str] = None
+
+
+class PostLookup(BaseModel):
+    items: List[PostResponse]
+    missing: List[str]
+
+
+# Largest number of items accepted by one batch request
+MAX_BATCH_ITEMS = 10000
+
+
+class PostBatchCreate(BaseModel):
+    items: List[PostCreate] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BatchItemResult]
+
+
 class PostUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=200)
     upvotes: Optional[int] = None
@@ -29,4 +59,14 @@ class PostUpdate(BaseModel):
     comment_id: Optional[str] = None
 
 
-__all__ = ["PostCreate", "PostResponse", "PostUpdate"]
\ No newline at end of file
+__all__ = [
+    "PostCreate",
+    "PostResponse",
+    "PostPage",
+    "PostLookup",
+    "MAX_BATCH_ITEMS",
+    "PostBatchCreate",
+    "BatchItemResult",
+    "BatchResult",
+    "PostUpdate",
+]
\ No newline at end of file
@@ -1,25 +1,68 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
 
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError
 
-from ...utilities import db
-from ..user.service import get_user_by_id
+from ...core import Repository, get_collection, job_queue, register_indexes, register_query_shape
+from ...utilities import (
+    DEFAULT_PAGE_SIZE,
+    BatchLoader,
+    TTLCache,
+    VERSION_PROJECTION,
+    find_by_ids,
+    keyset_filter,
+    model_version,
+    parse_object_id,
+    project_document,
+    settings,
+    split_page,
+    versioned_update
+)
+from ..user.service import existing_user_ids, user_exists
 from .model import Post
-from .schemas import PostCreate, PostResponse, PostUpdate
+from .schemas import BatchItemResult, PostCreate, PostResponse, PostUpdate
 
 
 # Get the posts collection
-posts_collection: AsyncIOMotorCollection = db["posts"]
+posts_collection: Repository = get_collection("posts")
 
+register_indexes("posts", [
+    IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_id"),
+])
+register_query_shape("posts", {"user_id": ObjectId()}, [("_id", ASCENDING)])
+
+# Background job removing a deleted post's comment and votes
+DELETE_POST_CONTENT_JOB = "post.delete_content"
+
+# Attempts at setting a post's counters while concurrent votes change them
+COUNTER_UPDATE_ATTEMPTS = 5
+
+# Read-through cache for lookups by ID
+post_cache: TTLCache[Post] = TTLCache("posts", settings.cache_max_entries, settings.cache_ttl_seconds)
+
+
+async def _load_posts(post_ids: List[ObjectId]) -> Dict[ObjectId, Dict[str, Any]]:
+    """Fetch many post documents with one `$in` query, keyed by ID."""
+    return {doc["_id"]: doc async for doc in posts_collection.find({"_id": {"$in": post_ids}})}
+
+
+# Coalesces concurrent cache misses into shared, batched queries
+post_loader: BatchLoader[ObjectId, Dict[str, Any]] = BatchLoader("posts", _load_posts)
+
+
+async def create_post(post_data: PostCreate, author_verified: bool = False) -> Post:
+    """Create a new post.
+
+    `author_verified` skips the user lookup when `user_id` comes from a signed token.
+    """
+    if not post_data.user_id:
+        raise ValueError("user_id is required")
 
-async def create_post(post_data: PostCreate) -> Post:
-    """Create a new post."""
     # Check if user exists
-    user = await get_user_by_id(post_data.user_id)
-    if not user:
+    if not author_verified and not await user_exists(post_data.user_id):
         raise ValueError("User not found")
 
     # Convert user_id to ObjectId
@@ -37,13 +80,17 @@ async def create_post(post_data: PostCreate) -> Post:
             raise ValueError("Invalid comment_id")
 
     # Create post document
+    now = datetime.utcnow()
     post_doc = {
         "user_id": user_id_obj,
         "title": post_data.title,
         "upvotes": 0,
         "downvotes": 0,
-        "created_at": datetime.utcnow(),
-        "comment_id": comment_id_obj
+        "score": 0,
+        "created_at": now,
+        "comment_id": comment_id_obj,
+        "version": 1,
+        "updated_at": now
     }
 
     # Insert into database
@@ -54,28 +101,199 @@ async def create_post(post_data: PostCreate) -> Post:
     return Post(**post_doc)
 
 
+# Server error code of a unique index violation
+DUPLICATE_KEY_ERROR = 11000
+
+
+class InsertError(NamedTuple):
+    """Why one document of a batch insert was rejected."""
+
+    code: Optional[int]
+    message: str
+    key_pattern: Dict[str, Any]  # Fields of the violated unique index, for duplicate keys
+
+
+async def insert_batch(
+    collection: Repository, docs: List[Dict[str, Any]]
+) -> Dict[int, InsertError]:
+    """Insert documents with one unordered `insert_many`; returns errors by document index."""
+    if not docs:
+        return {}
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return {
+            error["index"]: InsertError(error.get("code"), error.get("errmsg", "Insert failed"), error.get("keyPattern") or {})
+            for error in e.details["writeErrors"]
+        }
+    return {}
+
+
+async def create_posts(items: List[PostCreate], author_verified: bool = False) -> List[BatchItemResult]:
+    """Create many posts with one user `$in` check and one `insert_many`.
+
+    Invalid items are reported individually and do not prevent the others from being created.
+    """
+    errors: Dict[int, str] = {}
+    pending: List[Tuple[int, Dict[str, Any]]] = []
+
+    # Validate ids and build documents
+    for index, post_data in enumerate(items):
+        try:
+            if not post_data.user_id:
+                raise ValueError("user_id is required")
+            try:
+                user_id_obj = ObjectId(post_data.user_id)
+            except:
+                raise ValueError("Invalid user_id")
+            comment_id_obj = None
+            if post_data.comment_id:
+                try:
+                    comment_id_obj = ObjectId(post_data.comment_id)
+                except:
+                    raise ValueError("Invalid comment_id")
+        except ValueError as e:
+            errors[index] = str(e)
+            continue
+        now = datetime.utcnow()
+        pending.append((index, {
+            "user_id": user_id_obj,
+            "title": post_data.title,
+            "upvotes": 0,
+            "downvotes": 0,
+            "score": 0,
+            "created_at": now,
+            "comment_id": comment_id_obj,
+            "version": 1,
+            "updated_at": now
+        }))
+
+    # Check that all referenced users exist
+    if not author_verified:
+        known_users = await existing_user_ids(doc["user_id"] for _, doc in pending)
+        for index, doc in pending:
+            if doc["user_id"] not in known_users:
+                errors[index] = "User not found"
+        pending = [(index, doc) for index, doc in pending if index not in errors]
+
+    # Insert into database
+    insert_errors = await insert_batch(posts_collection, [doc for _, doc in pending])
+    for position, error in insert_errors.items():
+        errors[pending[position][0]] = error.message
+
+    inserted_ids = {index: doc["_id"] for index, doc in pending if index not in errors}
+    return [
+        BatchItemResult(index=index, error=errors[index]) if index in errors
+        else BatchItemResult(index=index, id=str(inserted_ids[index]))
+        for index in range(len(items))
+    ]
+
+
 async def get_post_by_id(post_id: str) -> Optional[Post]:
     """Get post by ID."""
-    try:
-        obj_id = ObjectId(post_id)
-    except:
+    obj_id = parse_object_id(post_id)
+    if obj_id is None:
         return None
 
-    post_doc = await posts_collection.find_one({"_id": obj_id})
+    post = post_cache.get(obj_id)
+    if post:
+        return post
+
+    # Taken before loading, so a write that lands meanwhile keeps its fresher entry
+    generation = post_cache.generation(obj_id)
+    post_doc = await post_loader.load(obj_id)
     if post_doc:
-        return Post(**post_doc)
+        post = Post(**post_doc)
+        post_cache.set(obj_id, post, generation)
+        return post
     return None
 
 
-async def get_posts_by_user(user_id: str) -> List[Post]:
-    """Get all posts by a user."""
+async def get_post_document(
+    post_id: str, projection: Optional[Dict[str, int]] = None
+) -> Optional[Dict[str, Any]]:
+    """Get a raw post document by ID, optionally projected."""
+    obj_id = parse_object_id(post_id)
+    if obj_id is None:
+        return None
+
+    post = post_cache.get(obj_id)
+    if post:
+        return project_document(post.model_dump(by_alias=True), projection)
+    return await posts_collection.find_one({"_id": obj_id}, projection)
+
+
+async def get_post_version(post_id: str) -> Optional[Dict[str, Any]]:
+    """Get only the fields a post's ETag and Last-Modified derive from, for conditional requests."""
+    obj_id = parse_object_id(post_id)
+    if obj_id is None:
+        return None
+
+    post = post_cache.get(obj_id)
+    if post:
+        return model_version(post)
+    return await posts_collection.find_one({"_id": obj_id}, VERSION_PROJECTION)
+
+
+async def get_post_documents_by_ids(
+    post_ids: List[str], projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Get raw post documents for many IDs in input order, plus the IDs that were not found."""
+    return await find_by_ids(posts_collection, post_ids, projection)
+
+
+async def get_post_documents_by_user(
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Get a page of raw post documents by a user and the cursor of the next page."""
     try:
         user_id_obj = ObjectId(user_id)
     except:
-        return []
+        return [], None
+
+    query = keyset_filter({"user_id": user_id_obj}, after)
+    posts_docs = await posts_collection.find(query, projection).sort("_id", 1).to_list(length=limit + 1)
+    return split_page(posts_docs, limit)
 
-    posts_docs = await posts_collection.find({"user_id": user_id_obj}).to_list(length=None)
-    return [Post(**doc) for doc in posts_docs]
+
+async def get_posts_by_user(
+    user_id: str, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+) -> Tuple[List[Post], Optional[str]]:
+    """Get a page of posts by a user and the cursor of the next page."""
+    page_docs, next_cursor = await get_post_documents_by_user(user_id, limit, after)
+    return [Post(**doc) for doc in page_docs], next_cursor
+
+
+async def _set_post_fields(obj_id: ObjectId, update_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Set fields of a post, keeping its stored score equal to upvotes - downvotes.
+
+    Setting a counter is a compare-and-set against the current counters, retried
+    when a concurrent vote changes them in between.
+    """
+    if "upvotes" not in update_dict and "downvotes" not in update_dict:
+        return await posts_collection.find_one_and_update(
+            {"_id": obj_id},
+            versioned_update({"$set": update_dict}),
+            return_document=ReturnDocument.AFTER
+        )
+    for attempt in range(COUNTER_UPDATE_ATTEMPTS):
+        current = await posts_collection.find_one({"_id": obj_id}, {"upvotes": 1, "downvotes": 1})
+        if not current:
+            return None
+        counters = {"upvotes": current.get("upvotes", 0), "downvotes": current.get("downvotes", 0)}
+        upvotes = update_dict.get("upvotes", counters["upvotes"])
+        downvotes = update_dict.get("downvotes", counters["downvotes"])
+        post_doc = await posts_collection.find_one_and_update(
+            {"_id": obj_id, **counters},
+            versioned_update({"$set": {**update_dict, "score": upvotes - downvotes}}),
+            return_document=ReturnDocument.AFTER
+        )
+        if post_doc:
+            return post_doc
+    raise ValueError("Post counters changed concurrently, please retry")
 
 
 async def update_post(post_id: str, update_data: PostUpdate) -> Optional[Post]:
@@ -101,14 +319,18 @@ async def update_post(post_id: str, update_data: PostUpdate) -> Optional[Post]:
         else:
             update_dict["comment_id"] = None
 
-    if update_dict:
-        result = await posts_collection.update_one(
-            {"_id": obj_id},
-            {"$set": update_dict}
-        )
-        if result.modified_count > 0:
-            return await get_post_by_id(post_id)
-    return None
+    if not update_dict:
+        return await get_post_by_id(post_id)
+
+    post_doc = await _set_post_fields(obj_id, update_dict)
+    if not post_doc:
+        post_cache.invalidate(obj_id)
+        post_loader.forget(obj_id)
+        return None
+    post = Post(**post_doc)
+    post_cache.set(obj_id, post)
+    post_loader.forget(obj_id)
+    return post
 
 
 async def delete_post(post_id: str) -> bool:
@@ -119,20 +341,59 @@ async def delete_post(post_id: str) -> bool:
         return False
 
     result = await posts_collection.delete_one({"_id": obj_id})
-    return result.deleted_count > 0
+    post_cache.invalidate(obj_id)
+    post_loader.forget(obj_id)
+    if not result.deleted_count:
+        return False
+
+    # Remove the post's comment and votes in the background
+    await job_queue.enqueue(DELETE_POST_CONTENT_JOB, {"post_id": obj_id})
+    return True
+
+
+async def get_all_post_documents(
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Get a page of raw post documents and the cursor of the next page."""
+    query = keyset_filter({}, after)
+    posts_docs = await posts_collection.find(query, projection).sort("_id", 1).to_list(length=limit + 1)
+    return split_page(posts_docs, limit)
+
+
+async def get_all_posts(
+    limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None
+) -> Tuple[List[Post], Optional[str]]:
+    """Get a page of posts and the cursor of the next page."""
+    page_docs, next_cursor = await get_all_post_documents(limit, after)
+    return [Post(**doc) for doc in page_docs], next_cursor
+
 
+def iter_all_post_documents(
+    after: Optional[str] = None, projection: Optional[Dict[str, int]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Iterate over all raw post documents in `_id` order, fetching them in bounded batches.
 
-async def get_all_posts() -> List[Post]:
-    """Get all posts."""
-    posts_docs = await posts_collection.find().to_list(length=None)
-    return [Post(**doc) for doc in posts_docs]
+    The cursor is validated eagerly so a bad `after` fails before streaming starts.
+    """
+    query = keyset_filter({}, after)
+    return posts_collection.find(query, projection).sort("_id", 1).batch_size(settings.stream_batch_size)
 
 
 __all__ = [
+    "DELETE_POST_CONTENT_JOB",
     "create_post",
+    "create_posts",
     "get_post_by_id",
+    "get_post_document",
+    "get_post_version",
+    "get_post_documents_by_ids",
+    "get_post_documents_by_user",
     "get_posts_by_user",
     "update_post",
     "delete_post",
+    "get_all_post_documents",
     "get_all_posts",
+    "iter_all_post_documents",
 ]
\ No newline at end of file
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict
+
+from ...core import delete_in_batches, job_queue, throttle
+from ...utilities import ID_ONLY_PROJECTION, settings, versioned_update
+from ..comment.service import comment_loader, comments_collection
+from ..post.service import post_cache, post_loader, posts_collection
+from ..vote.service import votes_collection
+from .service import DELETE_USER_CONTENT_JOB
+
+
+@job_queue.register(DELETE_USER_CONTENT_JOB)
+async def delete_user_content(payload: Dict[str, Any]) -> None:
+    """Delete the posts, comments and votes left behind by a deleted user.
+
+    Work is done in `job_batch_size` chunks with a pause between them; every step is
+    idempotent, so a retried job picks up where the previous attempt stopped.
+    """
+    user_id = payload["user_id"]
+
+    # Posts by the user, with the comment and votes on each
+    while True:
+        cursor = posts_collection.find({"user_id": user_id}, ID_ONLY_PROJECTION).limit(settings.job_batch_size)
+        post_ids = [doc["_id"] async for doc in cursor]
+        if not post_ids:
+            break
+        await comments_collection.delete_many({"post_id": {"$in": post_ids}})
+        await votes_collection.delete_many({"post_id": {"$in": post_ids}})
+        await posts_collection.delete_many({"_id": {"$in": post_ids}})
+        for post_id in post_ids:
+            post_cache.invalidate(post_id)
+            post_loader.forget(post_id)
+            comment_loader.forget(post_id)
+        await throttle()
+
+    # Comments by the user on other users' posts, unlinked from those posts
+    while True:
+        cursor = comments_collection.find({"user_id": user_id}, {"post_id": 1}).limit(settings.job_batch_size)
+        comment_docs = [doc async for doc in cursor]
+        if not comment_docs:
+            break
+        post_ids = [doc["post_id"] for doc in comment_docs]
+        await posts_collection.update_many(
+            {"_id": {"$in": post_ids}, "comment_id": {"$in": [doc["_id"] for doc in comment_docs]}},
+            versioned_update({"$set": {"comment_id": None}})
+        )
+        await comments_collection.delete_many({"_id": {"$in": [doc["_id"] for doc in comment_docs]}})
+        for post_id in post_ids:
+            post_cache.invalidate(post_id)
+            post_loader.forget(post_id)
+            comment_loader.forget(post_id)
+        await throttle()
+
+    # Votes cast by the user; the counters on other posts keep them
+    await delete_in_batches(votes_collection, {"user_id": user_id})
+
+
+__all__ = ["delete_user_content"]
@@ -13,6 +13,8 @@ class User(BaseModel):
     password: str  # hashed password
     password_salt: str
     created_at: datetime
+    version: int = 0  # Bumped by every write; 0 for documents never written since versioning
+    updated_at: Optional[datetime] = None
 
     class Config:
         validate_by_name = True
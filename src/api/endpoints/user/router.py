@@ -1,13 +1,53 @@
 # -*- coding: utf-8 -*-
-from fastapi import APIRouter, HTTPException, status
+from typing import Any, Dict, List, Optional
 
-from .schemas import UserCreate, UserResponse, UserUpdate
-from .service import create_user, get_user_by_id, update_user, delete_user
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+
+from ...utilities import (
+    DocumentResponse,
+    document_etag,
+    fields_projection,
+    is_conditional,
+    is_not_modified,
+    last_modified,
+    model_version,
+    not_modified_response,
+    page_etag,
+    page_response,
+    parse_fields,
+    select_fields,
+    split_ids,
+    validator_headers,
+    with_version_fields
+)
+from .schemas import UserCreate, UserLookup, UserResponse, UserUpdate
+from .service import (
+    create_user,
+    get_user_by_id,
+    get_user_document,
+    get_user_version,
+    get_user_documents_by_ids,
+    update_user,
+    delete_user
+)
 
 
 router = APIRouter()
 
 
+def render_user(doc: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Map a raw (possibly projected) user document to the `UserResponse` shape."""
+    return select_fields({
+        "id": doc["_id"],
+        "username": doc.get("username"),
+        "email": doc.get("email"),
+        "created_at": doc.get("created_at")
+    }, fields)
+
+
+FIELDS_QUERY = Query(None, description="Comma-separated subset of response fields to return")
+
+
 @router.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user_endpoint(user: UserCreate) -> UserResponse:
     """Create a new user."""
@@ -23,12 +63,55 @@ async def create_user_endpoint(user: UserCreate) -> UserResponse:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.get("/users", response_model=UserLookup)
+async def get_users_endpoint(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated user IDs to fetch in one request"),
+    fields: Optional[str] = FIELDS_QUERY
+):
+    """Get the users listed in `ids`, in the order given."""
+    try:
+        selected = parse_fields(fields, UserResponse)
+        docs, missing = await get_user_documents_by_ids(split_ids(ids), with_version_fields(fields_projection(selected)))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return page_response(
+        request,
+        {"items": [render_user(doc, selected) for doc in docs], "missing": missing},
+        page_etag(docs, *missing)
+    )
+
+
 @router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user_endpoint(user_id: str) -> UserResponse:
-    """Get user by ID."""
+async def get_user_endpoint(
+    user_id: str, request: Request, response: Response, fields: Optional[str] = FIELDS_QUERY
+):
+    """Get user by ID; answers `If-None-Match` / `If-Modified-Since` with 304 from the version fields alone."""
+    try:
+        selected = parse_fields(fields, UserResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if is_conditional(request):
+        version = await get_user_version(user_id)
+        if not version:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        etag, modified = document_etag(version), last_modified(version)
+        if is_not_modified(request, etag, modified):
+            return not_modified_response(etag, modified)
+
+    if selected:
+        doc = await get_user_document(user_id, with_version_fields(fields_projection(selected)))
+        if not doc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        headers = validator_headers(document_etag(doc), last_modified(doc))
+        return DocumentResponse(render_user(doc, selected), headers=headers)
+
     user = await get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    version = model_version(user)
+    response.headers.update(validator_headers(document_etag(version), last_modified(version)))
     return UserResponse(
         id=str(user.id),
         username=user.username,
@@ -40,7 +123,10 @@ async def get_user_endpoint(user_id: str) -> UserResponse:
 @router.put("/users/{user_id}", response_model=UserResponse)
 async def update_user_endpoint(user_id: str, user_update: UserUpdate) -> UserResponse:
     """Update user information."""
-    user = await update_user(user_id, user_update)
+    try:
+        user = await update_user(user_id, user_update)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return UserResponse(
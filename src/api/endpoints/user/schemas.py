@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from bson import ObjectId
 from pydantic import BaseModel, EmailStr, Field, SecretStr
@@ -19,10 +19,15 @@ class UserResponse(BaseModel):
     created_at: datetime
 
 
+class UserLookup(BaseModel):
+    items: List[UserResponse]
+    missing: List[str]
+
+
 class UserUpdate(BaseModel):
     username: Optional[str] = Field(None, min_length=1, max_length=50)
     email: Optional[EmailStr] = None
     password: Optional[SecretStr] = Field(None, min_length=8)
 
 
-__all__ = ["UserCreate", "UserResponse", "UserUpdate"]
\ No newline at end of file
+__all__ = ["UserCreate", "UserResponse", "UserLookup", "UserUpdate"]
\ No newline at end of file
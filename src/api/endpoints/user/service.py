@@ -1,20 +1,59 @@
 # -*- coding: utf-8 -*-
 import secrets
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from pydantic import SecretStr
 
-from ...utilities import async_hash, db, settings
+from ...core import Repository, get_collection, job_queue, register_indexes, register_query_shape
+from ...utilities import (
+    ID_ONLY_PROJECTION,
+    BatchLoader,
+    TTLCache,
+    VERSION_PROJECTION,
+    async_hash,
+    find_by_ids,
+    model_version,
+    parse_object_id,
+    project_document,
+    settings,
+    versioned_update
+)
 from .model import User
 from .schemas import UserCreate, UserResponse, UserUpdate
 
 
 # Get the users collection
-users_collection: AsyncIOMotorCollection = db["users"]
+users_collection: Repository = get_collection("users")
+
+register_indexes("users", [
+    IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+])
+register_query_shape("users", {"email": ""})
+register_query_shape("users", {"$or": [{"username": ""}, {"email": ""}]})
+
+# Read-through cache for lookups by ID
+user_cache: TTLCache[User] = TTLCache("users", settings.cache_max_entries, settings.cache_ttl_seconds)
+
+# Background job removing a deleted user's posts, comments and votes
+DELETE_USER_CONTENT_JOB = "user.delete_content"
+
+# Projection that keeps password material out of API reads
+PUBLIC_PROJECTION: Dict[str, int] = {"password": 0, "password_salt": 0}
+
+
+async def _load_users(user_ids: List[ObjectId]) -> Dict[ObjectId, Dict[str, Any]]:
+    """Fetch many user documents with one `$in` query, keyed by ID."""
+    return {doc["_id"]: doc async for doc in users_collection.find({"_id": {"$in": user_ids}})}
+
+
+# Coalesces concurrent cache misses into shared, batched queries
+user_loader: BatchLoader[ObjectId, Dict[str, Any]] = BatchLoader("users", _load_users)
 
 
 async def create_user(user_data: UserCreate) -> User:
@@ -25,7 +64,7 @@ async def create_user(user_data: UserCreate) -> User:
             {"username": user_data.username},
             {"email": user_data.email}
         ]
-    })
+    }, ID_ONLY_PROJECTION)
     if existing_user:
         raise ValueError("Username or email already exists")
 
@@ -40,16 +79,22 @@ async def create_user(user_data: UserCreate) -> User:
     )
 
     # Create user document
+    now = datetime.utcnow()
     user_doc = {
         "username": user_data.username,
         "email": user_data.email,
         "password": hashed_password,
         "password_salt": password_salt,
-        "created_at": datetime.utcnow()
+        "created_at": now,
+        "version": 1,
+        "updated_at": now
     }
 
-    # Insert into database
-    result = await users_collection.insert_one(user_doc)
+    # Insert into database; the unique indexes catch concurrent duplicates
+    try:
+        result = await users_collection.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise ValueError("Username or email already exists")
     user_doc["_id"] = result.inserted_id
 
     # Return User model
@@ -58,17 +103,80 @@ async def create_user(user_data: UserCreate) -> User:
 
 async def get_user_by_id(user_id: str) -> Optional[User]:
     """Get user by ID."""
-    try:
-        obj_id = ObjectId(user_id)
-    except:
+    obj_id = parse_object_id(user_id)
+    if obj_id is None:
         return None
 
-    user_doc = await users_collection.find_one({"_id": obj_id})
+    user = user_cache.get(obj_id)
+    if user:
+        return user
+
+    # Taken before loading, so a write that lands meanwhile keeps its fresher entry
+    generation = user_cache.generation(obj_id)
+    user_doc = await user_loader.load(obj_id)
     if user_doc:
-        return User(**user_doc)
+        user = User(**user_doc)
+        user_cache.set(obj_id, user, generation)
+        return user
     return None
 
 
+async def get_user_document(
+    user_id: str, projection: Optional[Dict[str, int]] = None
+) -> Optional[Dict[str, Any]]:
+    """Get a raw user document by ID, without password material unless projected."""
+    obj_id = parse_object_id(user_id)
+    if obj_id is None:
+        return None
+
+    projection = projection or PUBLIC_PROJECTION
+    user = user_cache.get(obj_id)
+    if user:
+        # Cached users hold every field, password material included
+        return project_document(user.model_dump(by_alias=True), projection)
+    return await users_collection.find_one({"_id": obj_id}, projection)
+
+
+async def get_user_version(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get only the fields a user's ETag and Last-Modified derive from, for conditional requests."""
+    obj_id = parse_object_id(user_id)
+    if obj_id is None:
+        return None
+
+    user = user_cache.get(obj_id)
+    if user:
+        return model_version(user)
+    return await users_collection.find_one({"_id": obj_id}, VERSION_PROJECTION)
+
+
+async def get_user_documents_by_ids(
+    user_ids: List[str], projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Get raw user documents for many IDs in input order, plus the IDs that were not found."""
+    return await find_by_ids(users_collection, user_ids, projection or PUBLIC_PROJECTION)
+
+
+async def user_exists(user_id: str) -> bool:
+    """Check that a user exists, fetching only its `_id`."""
+    try:
+        obj_id = ObjectId(user_id)
+    except:
+        return False
+
+    if user_cache.get(obj_id):
+        return True
+    return await users_collection.find_one({"_id": obj_id}, ID_ONLY_PROJECTION) is not None
+
+
+async def existing_user_ids(user_ids: Iterable[ObjectId]) -> Set[ObjectId]:
+    """Return which of the given user IDs exist, using one `$in` query."""
+    wanted = set(user_ids)
+    if not wanted:
+        return set()
+    cursor = users_collection.find({"_id": {"$in": list(wanted)}}, ID_ONLY_PROJECTION)
+    return {doc["_id"] async for doc in cursor}
+
+
 async def get_user_by_email(email: str) -> Optional[User]:
     """Get user by email."""
     user_doc = await users_collection.find_one({"email": email})
@@ -100,14 +208,42 @@ async def update_user(user_id: str, update_data: UserUpdate) -> Optional[User]:
         update_dict["password"] = hashed_password
         update_dict["password_salt"] = password_salt
 
-    if update_dict:
-        result = await users_collection.update_one(
+    if not update_dict:
+        return await get_user_by_id(user_id)
+
+    try:
+        user_doc = await users_collection.find_one_and_update(
             {"_id": obj_id},
-            {"$set": update_dict}
+            versioned_update({"$set": update_dict}),
+            return_document=ReturnDocument.AFTER
         )
-        if result.modified_count > 0:
-            return await get_user_by_id(user_id)
-    return None
+    except DuplicateKeyError:
+        raise ValueError("Username or email already exists")
+    if not user_doc:
+        user_cache.invalidate(obj_id)
+        user_loader.forget(obj_id)
+        return None
+    user = User(**user_doc)
+    user_cache.set(obj_id, user)
+    user_loader.forget(obj_id)
+    return user
+
+
+async def rehash_password(user: User, password: SecretStr) -> bool:
+    """Re-hash a verified password with the current Argon2 parameters.
+
+    Meant to run in the background after a successful login whose hash is outdated;
+    the stored hash is only replaced if it has not changed in the meantime.
+    """
+    password_salt = secrets.token_hex(16)
+    hashed_password = await async_hash(password, SecretStr(password_salt), settings.password_pepper)
+    result = await users_collection.update_one(
+        {"_id": user.id, "password": user.password},
+        versioned_update({"$set": {"password": hashed_password, "password_salt": password_salt}})
+    )
+    user_cache.invalidate(user.id)
+    user_loader.forget(user.id)
+    return result.modified_count > 0
 
 
 async def delete_user(user_id: str) -> bool:
@@ -118,13 +254,27 @@ async def delete_user(user_id: str) -> bool:
         return False
 
     result = await users_collection.delete_one({"_id": obj_id})
-    return result.deleted_count > 0
+    user_cache.invalidate(obj_id)
+    user_loader.forget(obj_id)
+    if not result.deleted_count:
+        return False
+
+    # Remove the user's content in the background
+    await job_queue.enqueue(DELETE_USER_CONTENT_JOB, {"user_id": obj_id})
+    return True
 
 
 __all__ = [
+    "DELETE_USER_CONTENT_JOB",
     "create_user",
     "get_user_by_id",
+    "get_user_document",
+    "get_user_version",
+    "get_user_documents_by_ids",
+    "user_exists",
+    "existing_user_ids",
     "get_user_by_email",
     "update_user",
+    "rehash_password",
     "delete_user",
 ]
\ No newline at end of file
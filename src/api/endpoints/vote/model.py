@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from pydantic import BaseModel, Field
+
+
+class Vote(BaseModel):
+    id: Optional[ObjectId] = Field(default=None, alias="_id")
+    user_id: ObjectId
+    post_id: ObjectId
+    value: int  # 1 for an upvote, -1 for a downvote
+    created_at: datetime
+
+    class Config:
+        validate_by_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+
+
+__all__ = ["Vote"]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from ..auth.dependencies import get_optional_user_id, resolve_author
+from ..post.router import to_post_response
+from ..post.schemas import PostResponse
+from .schemas import VoteCreate
+from .service import DOWNVOTE, UPVOTE, cast_vote
+
+
+router = APIRouter()
+
+
+async def _vote(post_id: str, vote: Optional[VoteCreate], auth_user_id: Optional[str], value: int) -> PostResponse:
+    vote = vote or VoteCreate()
+    vote.user_id = resolve_author(vote.user_id, auth_user_id)
+    try:
+        post = await cast_vote(post_id, vote, value, author_verified=auth_user_id is not None)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not post:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+    return to_post_response(post)
+
+
+@router.post("/posts/{post_id}/upvote", response_model=PostResponse)
+async def upvote_post_endpoint(
+    post_id: str,
+    vote: Optional[VoteCreate] = None,
+    auth_user_id: Optional[str] = Depends(get_optional_user_id)
+) -> PostResponse:
+    """Upvote a post, replacing any previous vote by the same user."""
+    return await _vote(post_id, vote, auth_user_id, UPVOTE)
+
+
+@router.post("/posts/{post_id}/downvote", response_model=PostResponse)
+async def downvote_post_endpoint(
+    post_id: str,
+    vote: Optional[VoteCreate] = None,
+    auth_user_id: Optional[str] = Depends(get_optional_user_id)
+) -> PostResponse:
+    """Downvote a post, replacing any previous vote by the same user."""
+    return await _vote(post_id, vote, auth_user_id, DOWNVOTE)
+
+
+__all__ = ["router"]
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class VoteCreate(BaseModel):
+    user_id: Optional[str] = None  # Will convert to ObjectId; taken from the bearer token if omitted
+
+
+__all__ = ["VoteCreate"]
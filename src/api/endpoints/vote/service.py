@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from typing import Dict, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ...core import Repository, get_collection, register_indexes
+from ...utilities import settings, versioned_update
+from ..user.service import user_exists
+from ..post.counters import counter_buffer
+from ..post.model import Post
+from ..post.service import get_post_by_id, post_cache, post_loader, posts_collection
+from .schemas import VoteCreate
+
+
+UPVOTE = 1
+DOWNVOTE = -1
+
+# Post counter incremented by each vote value
+VOTE_COUNTERS = {UPVOTE: "upvotes", DOWNVOTE: "downvotes"}
+
+
+# Get the votes collection
+votes_collection: Repository = get_collection("votes")
+
+register_indexes("votes", [
+    IndexModel([("user_id", ASCENDING), ("post_id", ASCENDING)], unique=True, name="user_id_post_id_unique"),
+    IndexModel([("post_id", ASCENDING)], name="post_id"),
+])
+
+
+def vote_delta(previous: Optional[int], value: int) -> Dict[str, int]:
+    """Counter increments, including the stored score, that turn a user's previous vote into the new one."""
+    if previous == value:
+        return {}
+    delta = {VOTE_COUNTERS[value]: 1, "score": value}
+    if previous in VOTE_COUNTERS:
+        delta[VOTE_COUNTERS[previous]] = -1
+        delta["score"] -= previous
+    return delta
+
+
+async def _record_vote(user_id: ObjectId, post_id: ObjectId, value: int) -> Optional[int]:
+    """Upsert the user's vote in one conditional write and return the previous value."""
+    for attempt in range(2):
+        try:
+            previous_doc = await votes_collection.find_one_and_update(
+                {"user_id": user_id, "post_id": post_id},
+                {"$set": {"value": value}, "$setOnInsert": {"created_at": datetime.utcnow()}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+            return previous_doc["value"] if previous_doc else None
+        except DuplicateKeyError:
+            # A concurrent first vote by the same user won the upsert; retry as an update
+            if attempt:
+                raise
+
+
+async def _restore_vote(user_id: ObjectId, post_id: ObjectId, previous: Optional[int]) -> None:
+    """Undo a recorded vote whose post turned out not to exist."""
+    if previous is None:
+        await votes_collection.delete_one({"user_id": user_id, "post_id": post_id})
+    else:
+        await votes_collection.update_one(
+            {"user_id": user_id, "post_id": post_id},
+            {"$set": {"value": previous}}
+        )
+
+
+async def _cast_buffered_vote(
+    post_id: str, user_id_obj: ObjectId, post_id_obj: ObjectId, value: int
+) -> Optional[Post]:
+    """Record a vote and queue the counter change in the write-behind buffer."""
+    post = await get_post_by_id(post_id)
+    if not post:
+        return None
+
+    previous = await _record_vote(user_id_obj, post_id_obj, value)
+    delta = vote_delta(previous, value)
+    if delta:
+        counter_buffer.add(post_id_obj, delta)
+    return post
+
+
+async def cast_vote(
+    post_id: str, vote_data: VoteCreate, value: int, author_verified: bool = False
+) -> Optional[Post]:
+    """Record a user's vote on a post and atomically adjust the post counters.
+
+    `author_verified` skips the user lookup when `user_id` comes from a signed token.
+    """
+    try:
+        post_id_obj = ObjectId(post_id)
+    except:
+        return None
+
+    if not vote_data.user_id:
+        raise ValueError("user_id is required")
+    try:
+        user_id_obj = ObjectId(vote_data.user_id)
+    except:
+        raise ValueError("Invalid user_id")
+
+    # Check if user exists
+    if not author_verified and not await user_exists(vote_data.user_id):
+        raise ValueError("User not found")
+
+    if settings.vote_buffer_enabled:
+        return await _cast_buffered_vote(post_id, user_id_obj, post_id_obj, value)
+
+    previous = await _record_vote(user_id_obj, post_id_obj, value)
+    delta = vote_delta(previous, value)
+    if not delta:
+        # Repeated vote: counters are already up to date
+        return await get_post_by_id(post_id)
+
+    post_doc = await posts_collection.find_one_and_update(
+        {"_id": post_id_obj},
+        versioned_update({"$inc": delta}),
+        return_document=ReturnDocument.AFTER
+    )
+    if not post_doc:
+        await _restore_vote(user_id_obj, post_id_obj, previous)
+        return None
+    post = Post(**post_doc)
+    post_cache.set(post_id_obj, post)
+    post_loader.forget(post_id_obj)
+    return post
+
+
+__all__ = [
+    "UPVOTE",
+    "DOWNVOTE",
+    "vote_delta",
+    "cast_vote",
+]
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from fastapi import APIRouter, Response, status
+from prometheus_client import Gauge
+
+from .core import get_database, ping_database, settings
+from .utilities import DocumentResponse
+
+
+logger = logging.getLogger(__name__)
+
+startup_phase_seconds = Gauge(
+    "startup_phase_seconds",
+    "Time spent in each phase of the worker's cold start",
+    ["phase"],
+)
+
+
+class StartupTimings:
+    """Durations of the phases of a worker's cold start, from importing the app to ready."""
+
+    def __init__(self):
+        self._phases: Dict[str, float] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        self._phases[phase] = seconds
+        startup_phase_seconds.labels(phase).set(seconds)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as startup phase `name`."""
+        _started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - _started)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the phase durations in milliseconds, in the order they ran."""
+        return {_phase: round(_seconds * 1000, 2) for _phase, _seconds in self._phases.items()}
+
+    def log(self) -> None:
+        _total = sum(self._phases.values()) * 1000
+        logger.info("Worker ready in %.1f ms: %s", _total, self.stats())
+
+
+startup_timings = StartupTimings()
+
+
+class ReadinessCheck:
+    """Reports whether this worker is warm and its database reachable.
+
+    The worker is only ready between the end of the startup warm-up and the start
+    of shutdown. The database ping result is reused for `cache_seconds`, and
+    concurrent probes share one ping, so probes never load the database.
+
+    Args:
+        timeout_ms    (int  , required): Database ping timeout.
+        cache_seconds (float, required): How long a ping result is reused.
+    """
+
+    def __init__(self, timeout_ms: int, cache_seconds: float):
+        self.timeout_seconds = timeout_ms / 1000
+        self.cache_seconds = cache_seconds
+        self.started = False
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def mark_ready(self) -> None:
+        self.started = True
+
+    def mark_stopping(self) -> None:
+        self.started = False
+        self._result = None
+
+    async def _ping(self) -> Dict[str, Any]:
+        _started = time.perf_counter()
+        try:
+            await asyncio.wait_for(ping_database(get_database()), self.timeout_seconds)
+        except Exception as error:
+            return {"status": "down", "error": type(error).__name__}
+        return {"status": "up", "latency_ms": round((time.perf_counter() - _started) * 1000, 2)}
+
+    async def check(self) -> Dict[str, Any]:
+        """Returns the readiness report; `ready` is False until warm and while the database is down."""
+        if not self.started:
+            return {"ready": False, "reason": "starting"}
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._result is None or time.monotonic() - self._checked_at >= self.cache_seconds:
+                _database = await self._ping()
+                self._result = {"ready": _database["status"] == "up", "database": _database}
+                self._checked_at = time.monotonic()
+            return self._result
+
+
+readiness = ReadinessCheck(settings.readiness_timeout_ms, settings.readiness_cache_seconds)
+
+router = APIRouter()
+
+
+@router.get("/healthz", include_in_schema=False)
+async def liveness() -> Response:
+    """Liveness probe: the worker's event loop is serving requests."""
+    return DocumentResponse({"status": "ok"})
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readiness_endpoint() -> Response:
+    """Readiness probe: 200 once the worker is warm and the database answers, 503 otherwise."""
+    _report = {**await readiness.check(), "startup_ms": startup_timings.stats()}
+    return DocumentResponse(
+        _report,
+        status_code=status.HTTP_200_OK if _report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+__all__ = [
+    "StartupTimings",
+    "startup_timings",
+    "ReadinessCheck",
+    "readiness",
+    "router",
+]
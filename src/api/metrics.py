@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+import time
+from typing import Iterable
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily, Metric
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .core import CHECKOUT_WAIT_BUCKETS, job_queue, pool_stats
+from .utilities import cache_stats, event_broker, hash_executor, loader_stats
+
+
+# Route label of requests that matched no route, so raw paths never become labels
+UNMATCHED_ROUTE = "unmatched"
+
+# Methods reported as-is; anything else is reported as OTHER
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+http_requests = Counter(
+    "http_requests_total",
+    "HTTP requests served",
+    ["method", "route", "status"],
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, including streaming the response body",
+    ["method", "route", "status"],
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served",
+    ["method"],
+)
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that served a request, e.g. `/api/posts/{post_id}`."""
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    # Routes of a router included with a prefix may report their path without it;
+    # recover the (static) prefix by rendering the template with the path parameters
+    try:
+        rendered = template.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return template
+    path = scope.get("path", "")
+    if path != rendered and path.endswith(rendered):
+        return path[:-len(rendered)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count and latency per route template and status.
+
+    Requests are labelled with the matched route's path template (e.g.
+    `/api/posts/{post_id}`), never the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in KNOWN_METHODS else "OTHER"
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_progress.labels(method).dec()
+            labels = (method, route_template(scope), str(status_code))
+            http_requests.labels(*labels).inc()
+            http_request_duration.labels(*labels).observe(elapsed)
+
+
+class StatsCollector:
+    """Exports the in-process counters of caches, loaders, the hashing pool, jobs, events and MongoDB pools."""
+
+    def collect(self) -> Iterable[Metric]:
+        caches = {
+            name: CounterMetricFamily(f"cache_{name}", f"Read-through cache {name}", labels=["cache"])
+            for name in ("hits", "misses", "evictions", "stale_fills")
+        }
+        cache_size = GaugeMetricFamily("cache_entries", "Entries held by a read-through cache", labels=["cache"])
+        for cache, stats in cache_stats().items():
+            for name, family in caches.items():
+                family.add_metric([cache], stats[name])
+            cache_size.add_metric([cache], stats["size"])
+        yield from caches.values()
+        yield cache_size
+
+        loads = CounterMetricFamily("loader_loads", "Lookups made through a batch loader", labels=["loader"])
+        coalesced = CounterMetricFamily("loader_coalesced", "Lookups that joined an in-flight load", labels=["loader"])
+        batches = CounterMetricFamily("loader_batches", "Batched queries issued by a loader", labels=["loader"])
+        for loader, stats in loader_stats().items():
+            loads.add_metric([loader], stats["loads"])
+            coalesced.add_metric([loader], stats["coalesced"])
+            batches.add_metric([loader], stats["batches"])
+        yield from (loads, coalesced, batches)
+
+        hashing = hash_executor.stats()
+        yield GaugeMetricFamily("password_hash_workers", "Argon2 hashing threads", value=hashing["workers"])
+        yield GaugeMetricFamily("password_hash_in_flight", "Argon2 calls running or queued", value=hashing["in_flight"])
+        yield GaugeMetricFamily("password_hash_queue_depth", "Argon2 calls waiting for a thread", value=hashing["queue_depth"])
+        yield CounterMetricFamily("password_hash_rejected", "Argon2 calls shed with 503", value=hashing["rejected"])
+        hash_outcomes = CounterMetricFamily("password_hash_calls", "Argon2 calls admitted, by outcome", labels=["outcome"])
+        for outcome in ("completed", "failed", "cancelled"):
+            hash_outcomes.add_metric([outcome], hashing[outcome])
+        yield hash_outcomes
+
+        jobs = job_queue.stats()
+        yield GaugeMetricFamily("jobs_workers", "Background job workers", value=jobs["workers"])
+        outcomes = CounterMetricFamily("jobs", "Background jobs run, by outcome", labels=["outcome"])
+        for outcome in ("completed", "retried", "failed"):
+            outcomes.add_metric([outcome], jobs[outcome])
+        yield outcomes
+
+        events = event_broker.stats()
+        yield GaugeMetricFamily("events_subscribers", "Open event stream subscriptions", value=events["subscribers"])
+        yield CounterMetricFamily("events_published", "Events published by this worker", value=events["published"])
+        yield CounterMetricFamily("events_delivered", "Events queued for a subscriber", value=events["delivered"])
+        yield CounterMetricFamily("events_dropped", "Subscribers dropped as slow consumers", value=events["dropped"])
+
+        open_connections = GaugeMetricFamily("mongodb_pool_connections", "Open pool connections", labels=["address"])
+        in_use = GaugeMetricFamily("mongodb_pool_connections_in_use", "Checked-out pool connections", labels=["address"])
+        failures = CounterMetricFamily(
+            "mongodb_pool_checkout_failures", "Failed connection checkouts", labels=["address", "reason"]
+        )
+        cleared = CounterMetricFamily("mongodb_pool_cleared", "Times a pool was cleared", labels=["address"])
+        wait = HistogramMetricFamily(
+            "mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pool connection", labels=["address"]
+        )
+        for address, stats in pool_stats().items():
+            open_connections.add_metric([address], stats["open"])
+            in_use.add_metric([address], stats["in_use"])
+            cleared.add_metric([address], stats["cleared"])
+            for reason, count in stats["checkout_failures"].items():
+                failures.add_metric([address, reason], count)
+            cumulative, buckets = 0, []
+            for bound, count in zip(CHECKOUT_WAIT_BUCKETS, stats["wait_buckets"]):
+                cumulative += count
+                buckets.append((str(bound), cumulative))
+            observed = stats["checkouts"] + sum(stats["checkout_failures"].values())
+            buckets.append(("+Inf", observed))
+            wait.add_metric([address], buckets, stats["wait_seconds_total"])
+        yield from (open_connections, in_use, failures, cleared, wait)
+
+
+REGISTRY.register(StatsCollector())
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint() -> Response:
+    """Metrics in the Prometheus text exposition format."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+__all__ = [
+    "UNMATCHED_ROUTE",
+    "route_template",
+    "MetricsMiddleware",
+    "StatsCollector",
+    "router",
+]
@@ -1,13 +1,22 @@
 # -*- coding: utf-8 -*-
 from fastapi import APIRouter
 
+from .endpoints.auth.router import router as auth_router
 from .endpoints.user.router import router as user_router
 from .endpoints.post.router import router as post_router
 from .endpoints.comment.router import router as comment_router
+from .endpoints.vote.router import router as vote_router
+from .endpoints.feed.router import router as feed_router
+from .endpoints.events.router import router as events_router
+from .endpoints.post import jobs as post_jobs  # noqa: F401  (registers background job handlers)
+from .endpoints.user import jobs as user_jobs  # noqa: F401
 
 
 router = APIRouter()
 
+# Include auth endpoints
+router.include_router(auth_router, prefix="/api", tags=["auth"])
+
 # Include user endpoints
 router.include_router(user_router, prefix="/api", tags=["users"])
 
@@ -17,5 +26,14 @@ router.include_router(post_router, prefix="/api", tags=["posts"])
 # Include comment endpoints
 router.include_router(comment_router, prefix="/api", tags=["comments"])
 
+# Include vote endpoints
+router.include_router(vote_router, prefix="/api", tags=["votes"])
+
+# Include feed endpoints
+router.include_router(feed_router, prefix="/api", tags=["feed"])
+
+# Include real-time event streams
+router.include_router(events_router, prefix="/api", tags=["events"])
+
 
 __all__ = ["router"]
\ No newline at end of file
@@ -1,2 +1,12 @@
 from .password import *
-from ..core.database import *
\ No newline at end of file
+from .pagination import *
+from .serialization import *
+from .streaming import *
+from .fields import *
+from .conditional import *
+from .cache import *
+from .token import *
+from .ids import *
+from .loader import *
+from .events import *
+from ..core.database import *
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+
+V = TypeVar("V")
+
+# Caches created in this process, keyed by name
+_caches: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache(Generic[V]):
+    """Bounded LRU cache whose entries also expire after a fixed time-to-live.
+
+    Every write or invalidation of a key bumps its generation. A read-through fill
+    takes the `generation` before loading and passes it to `set`, which then skips
+    the fill if the key was written meanwhile, so a slow read cannot replace
+    fresher data with the document it loaded before the write.
+
+    Args:
+        name        (str  , required): Name the cache is reported under.
+        max_entries (int  , required): Entries kept before the least recently used is evicted.
+        ttl_seconds (float, required): Seconds an entry stays valid.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_fills = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        # Generation of each written key; reset with a new epoch when it outgrows the cache
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        _caches[name] = self
+
+    def generation(self, key: Hashable) -> Tuple[int, int]:
+        """Token to pass to `set` when filling `key` from a read started now."""
+        return self._epoch, self._generations.get(key, 0)
+
+    def _bump(self, key: Hashable) -> None:
+        if key not in self._generations and len(self._generations) >= max(self.max_entries, 1):
+            # Forgetting the generations invalidates every token handed out so far
+            self._generations.clear()
+            self._epoch += 1
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Returns the cached value, or None if it is missing or expired."""
+        _entry = self._entries.get(key)
+        if _entry is None or _entry[0] < time.monotonic():
+            if _entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return _entry[1]
+
+    def set(self, key: Hashable, value: V, generation: Optional[Tuple[int, int]] = None) -> None:
+        """Stores a value, evicting the least recently used entry when full.
+
+        Args:
+            key        (Hashable                 , required): Cache key.
+            value      (V                        , required): Value to store.
+            generation (Optional[Tuple[int, int]], optional): `generation(key)` taken before the value
+                was read; the value is dropped if the key was written since. Omitted by writers.
+        """
+        if generation is None:
+            self._bump(key)
+        elif generation != self.generation(key):
+            self.stale_fills += 1
+            return
+        if self.max_entries <= 0:
+            return
+        # Concurrent writers may finish out of order; keep the higher document version
+        _current = self._entries.get(key)
+        if _current is not None and getattr(_current[1], "version", 0) > getattr(value, "version", 0):
+            self.stale_fills += 1
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drops a key from the cache; fills of reads started before are skipped."""
+        self._bump(key)
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drops every entry."""
+        self._entries.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_fills": self.stale_fills,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns the counters of every cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+__all__ = [
+    "TTLCache",
+    "cache_stats",
+]
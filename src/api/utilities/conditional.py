@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from fastapi import Request, Response, status
+
+from .serialization import DocumentResponse
+
+
+# Projection fetching only what ETag and Last-Modified are derived from
+VERSION_PROJECTION: Dict[str, int] = {"_id": 1, "version": 1, "updated_at": 1, "created_at": 1}
+
+
+def versioned_update(update: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Adds the document version bump and `updated_at` stamp to a MongoDB update.
+
+    Every write that changes a versioned document goes through this, so ETags
+    derived from `version` change whenever the representation may have.
+
+    Args:
+        update (Dict[str, Any]    , required): Update operators, e.g. `{"$set": {...}}`.
+        now    (Optional[datetime], optional): Modification time. Defaults to the current UTC time.
+
+    Returns:
+        Dict[str, Any]: The update with `$inc.version` and `$set.updated_at` added.
+    """
+    _update = dict(update)
+    _update["$inc"] = {**_update.get("$inc", {}), "version": 1}
+    _update["$set"] = {**_update.get("$set", {}), "updated_at": now or datetime.utcnow()}
+    return _update
+
+
+def with_version_fields(projection: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    """Extends an inclusion projection with the fields validators are derived from.
+
+    Args:
+        projection (Optional[Dict[str, int]], required): Inclusion projection, or None for whole documents.
+    """
+    if projection is None:
+        return None
+    return {**projection, **VERSION_PROJECTION}
+
+
+def model_version(model: Any) -> Dict[str, Any]:
+    """The version fields of a versioned document model, shaped like a `VERSION_PROJECTION` result."""
+    return {"_id": model.id, "version": model.version, "updated_at": model.updated_at, "created_at": model.created_at}
+
+
+def document_etag(doc: Mapping[str, Any], suffix: str = "") -> str:
+    """Strong ETag of a versioned document, e.g. `"65f0c1...-3"`.
+
+    Args:
+        doc    (Mapping[str, Any], required): Document with `_id` and, once modified, `version`.
+        suffix (str              , optional): Extra state the representation depends on.
+    """
+    return f'"{doc["_id"]}-{doc.get("version", 0)}{suffix}"'
+
+
+def page_etag(docs: Iterable[Mapping[str, Any]], *extra: Any) -> str:
+    """Weak ETag of a list page, derived from the IDs and versions of its documents.
+
+    Args:
+        docs  (Iterable[Mapping[str, Any]], required): Documents of the page, in order.
+        extra (Any                        , optional): Other state the page depends on, e.g. the next cursor.
+    """
+    _digest = hashlib.blake2b(digest_size=12)
+    for _doc in docs:
+        _digest.update(f'{_doc["_id"]}-{_doc.get("version", 0)};'.encode())
+    for _value in extra:
+        _digest.update(f"|{_value}".encode())
+    return f'W/"{_digest.hexdigest()}"'
+
+
+def last_modified(doc: Mapping[str, Any]) -> Optional[datetime]:
+    """Time a document was last changed; documents never updated report their creation time."""
+    return doc.get("updated_at") or doc.get("created_at")
+
+
+def validator_headers(etag: str, modified: Optional[datetime] = None) -> Dict[str, str]:
+    """Builds the `ETag` and `Last-Modified` response headers.
+
+    Args:
+        etag     (str               , required): Entity tag.
+        modified (Optional[datetime], optional): Naive UTC modification time.
+    """
+    _headers = {"ETag": etag}
+    if modified is not None:
+        _headers["Last-Modified"] = format_datetime(modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return _headers
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, etag: str, modified: Optional[datetime] = None) -> bool:
+    """Evaluates `If-None-Match`, or `If-Modified-Since` when no entity tags were sent.
+
+    Entity tags are compared weakly, as RFC 9110 requires for `If-None-Match`.
+
+    Args:
+        request  (Request           , required): Incoming request.
+        etag     (str               , required): Current entity tag.
+        modified (Optional[datetime], optional): Current naive UTC modification time.
+
+    Returns:
+        bool: True if the client's copy is current and a 304 should be sent.
+    """
+    _if_none_match = request.headers.get("if-none-match")
+    if _if_none_match is not None:
+        _tags = {_opaque_tag(_tag.strip()) for _tag in _if_none_match.split(",")}
+        return "*" in _tags or _opaque_tag(etag) in _tags
+    _if_modified_since = request.headers.get("if-modified-since")
+    if _if_modified_since is None or modified is None:
+        return False
+    try:
+        _since = parsedate_to_datetime(_if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if _since.tzinfo is None:
+        _since = _since.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second precision
+    return modified.replace(microsecond=0, tzinfo=timezone.utc) <= _since
+
+
+def is_conditional(request: Request) -> bool:
+    """Checks whether a request carries `If-None-Match` or `If-Modified-Since`."""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def not_modified_response(etag: str, modified: Optional[datetime] = None) -> Response:
+    """Empty 304 response repeating the current validators."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, modified))
+
+
+
+def page_response(request: Request, content: Any, etag: str) -> Response:
+    """Renders a list page, or answers 304 if the client's copy has the same (weak) ETag.
+
+    Args:
+        request (Request, required): Incoming request.
+        content (Any    , required): Page to render.
+        etag    (str    , required): ETag of the page, usually from `page_etag`.
+    """
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return DocumentResponse(content, headers={"ETag": etag})
+
+
+__all__ = [
+    "VERSION_PROJECTION",
+    "versioned_update",
+    "with_version_fields",
+    "model_version",
+    "document_etag",
+    "page_etag",
+    "last_modified",
+    "validator_headers",
+    "is_not_modified",
+    "is_conditional",
+    "not_modified_response",
+    "page_response",
+]
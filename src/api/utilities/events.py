@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+
+from ..core.database import settings
+from ..core.indexes import register_indexes
+from ..core.repository import Database, Repository, get_collection
+from .serialization import dumps
+
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in the events collection, so a worker skips its own events
+ORIGIN = ObjectId()
+
+# Events relayed between workers expire from the collection after the retention period
+register_indexes("events", [
+    IndexModel([("created_at", ASCENDING)], expireAfterSeconds=settings.events_retention_seconds, name="created_at_ttl"),
+])
+
+
+def topic(kind: str, id: Any) -> str:
+    """Name of the topic carrying the events of one resource, e.g. `post:65f0c1...`.
+
+    Args:
+        kind (str, required): Resource kind, e.g. "post" or "user".
+        id   (Any, required): Resource ID.
+    """
+    return f"{kind}:{id}"
+
+
+class Event(NamedTuple):
+    type: str
+    topics: Tuple[str, ...]
+    message: str  # JSON `{"type": ..., "data": ...}`, encoded once for every subscriber
+
+
+class Subscription:
+    """Events of a set of topics, buffered for one connection in a bounded queue.
+
+    `get` returns None once the subscription is closed; `dropped` tells whether it was
+    closed for falling `max_queue` events behind.
+
+    Args:
+        topics    (Iterable[str], required): Topics to receive events of.
+        max_queue (int          , required): Events buffered before the subscriber is dropped.
+    """
+
+    def __init__(self, topics: Iterable[str], max_queue: int):
+        self.topics = frozenset(topics)
+        self.dropped = False
+        self._queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(max_queue)
+
+    async def get(self) -> Optional[Event]:
+        """Waits for the next event; None once the subscription is closed."""
+        return await self._queue.get()
+
+    def offer(self, event: Event) -> bool:
+        """Queues an event without waiting; False if the queue is full."""
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self, dropped: bool = False) -> None:
+        """Ends the subscription; events not yet consumed are discarded."""
+        self.dropped = dropped
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class EventBroker:
+    """In-process publish/subscribe of events by topic.
+
+    Publishing never waits for subscribers: each one has a bounded queue, and a
+    subscriber whose queue is full is a slow consumer and gets dropped, so one stalled
+    connection cannot hold up the others or grow memory without bound. While a
+    `ChangeStreamRelay` runs, published events are also written to the events
+    collection, from which the other workers deliver them.
+
+    Args:
+        max_queue (int, required): Events buffered per subscriber.
+    """
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._outbox: Optional[Repository] = None
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """Opens a subscription to the events of `topics`."""
+        _subscription = Subscription(topics, self.max_queue)
+        for _topic in _subscription.topics:
+            self._topics.setdefault(_topic, set()).add(_subscription)
+        return _subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Removes a subscription; it is safe to call more than once."""
+        for _topic in subscription.topics:
+            _subscribers = self._topics.get(_topic)
+            if _subscribers is None:
+                continue
+            _subscribers.discard(subscription)
+            if not _subscribers:
+                del self._topics[_topic]
+
+    def deliver(self, event: Event) -> int:
+        """Queues an event for the subscribers of its topics; returns how many received it."""
+        if len(event.topics) == 1:
+            _subscribers: Iterable[Subscription] = list(self._topics.get(event.topics[0], ()))
+        else:
+            _subscribers = {_subscription for _topic in event.topics for _subscription in self._topics.get(_topic, ())}
+        _delivered = 0
+        for _subscription in _subscribers:
+            if _subscription.offer(event):
+                _delivered += 1
+            else:
+                # Slow consumer: disconnect rather than block the publisher or buffer without bound
+                self.unsubscribe(_subscription)
+                _subscription.close(dropped=True)
+                self.dropped += 1
+        self.delivered += _delivered
+        return _delivered
+
+    async def publish(self, type: str, topics: Iterable[str], data: Dict[str, Any]) -> None:
+        """Delivers an event to this process's subscribers and, when relaying, to the other workers.
+
+        Args:
+            type   (str          , required): Event type, e.g. "comment.created".
+            topics (Iterable[str], required): Topics the event belongs to.
+            data   (Dict         , required): Event payload.
+        """
+        await self.publish_many(type, [(topics, data)])
+
+    async def publish_many(self, type: str, events: Iterable[Tuple[Iterable[str], Dict[str, Any]]]) -> None:
+        """Publishes events of one type, relaying them to the other workers with a single write.
+
+        Args:
+            type   (str                                 , required): Event type, e.g. "comment.created".
+            events (Iterable[Tuple[Iterable[str], Dict]], required): Topics and payload of each event.
+        """
+        _now = datetime.utcnow()
+        _outbox_docs: List[Dict[str, Any]] = []
+        for _topics, _data in events:
+            _topics = tuple(_topics)
+            self.published += 1
+            self.deliver(Event(type, _topics, dumps({"type": type, "data": _data}).decode()))
+            _outbox_docs.append({
+                "origin": ORIGIN,
+                "type": type,
+                "topics": list(_topics),
+                "data": _data,
+                "created_at": _now,
+            })
+        if self._outbox is None or not _outbox_docs:
+            return
+        try:
+            await self._outbox.insert_many(_outbox_docs, ordered=False)
+        except Exception:
+            # The writes that raised the events already succeeded; only other workers miss them
+            logger.exception("Failed to relay %d %s events", len(_outbox_docs), type)
+
+    def relay_to(self, outbox: Optional[Repository]) -> None:
+        """Also writes published events to `outbox` for other workers; None stops it."""
+        self._outbox = outbox
+
+    def close_all(self) -> None:
+        """Ends every subscription, e.g. on shutdown."""
+        _subscriptions = {_subscription for _subscribers in self._topics.values() for _subscription in _subscribers}
+        self._topics = {}
+        for _subscription in _subscriptions:
+            _subscription.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns subscriber and event counters."""
+        return {
+            "subscribers": len({_subscription for _subscribers in self._topics.values() for _subscription in _subscribers}),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+async def supports_change_streams(database: Database) -> bool:
+    """Checks whether the database is a replica set or sharded cluster, where change streams exist.
+
+    Args:
+        database (Database, required): Database to check.
+    """
+    _hello = await database.command("hello")
+    return "setName" in _hello or _hello.get("msg") == "isdbgrid"
+
+
+class ChangeStreamRelay:
+    """Delivers events published by other workers, read from a change stream on the events collection.
+
+    The stream is resumed after errors from the last event seen.
+
+    Args:
+        broker     (EventBroker, required): Broker to deliver relayed events to.
+        collection (Repository , required): Collection events are written to.
+    """
+
+    def __init__(self, broker: EventBroker, collection: Repository):
+        self._broker = broker
+        self._collection = collection
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def _run(self) -> None:
+        _pipeline: List[Dict[str, Any]] = [
+            {"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": ORIGIN}}}
+        ]
+        while True:
+            try:
+                async with self._collection.watch(_pipeline, resume_after=self._resume_token) as _stream:
+                    async for _change in _stream:
+                        self._resume_token = _stream.resume_token
+                        _doc = _change["fullDocument"]
+                        _message = dumps({"type": _doc["type"], "data": _doc["data"]}).decode()
+                        self._broker.deliver(Event(_doc["type"], tuple(_doc["topics"]), _message))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event change stream failed; resuming")
+                await asyncio.sleep(1)
+
+    async def start(self, database: Database) -> bool:
+        """Starts relaying if change streams are enabled and supported; returns whether it started."""
+        if self._task is not None:
+            return True
+        if not settings.events_change_streams:
+            return False
+        try:
+            if not await supports_change_streams(database):
+                return False
+        except Exception:
+            # Events are then only delivered within each worker; startup goes on
+            logger.exception("Could not check for change stream support; not relaying events")
+            return False
+        self._task = asyncio.create_task(self._run())
+        self._broker.relay_to(self._collection)
+        return True
+
+    async def stop(self) -> None:
+        """Stops relaying; published events are then only delivered in this process."""
+        self._broker.relay_to(None)
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+event_broker = EventBroker(settings.events_queue_size)
+
+event_relay = ChangeStreamRelay(event_broker, get_collection("events"))
+
+
+__all__ = [
+    "ORIGIN",
+    "topic",
+    "Event",
+    "Subscription",
+    "EventBroker",
+    "event_broker",
+    "supports_change_streams",
+    "ChangeStreamRelay",
+    "event_relay",
+]
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+
+# Projection that only confirms a document exists
+ID_ONLY_PROJECTION: Dict[str, int] = {"_id": 1}
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """Parses a `?fields=` sparse fieldset against a response model.
+
+    Args:
+        fields (Optional[str]  , required): Comma-separated field names, or None for all.
+        model  (Type[BaseModel], required): Response model the fields belong to.
+
+    Returns:
+        Optional[List[str]]: Requested field names in response order, or None for all.
+
+    Raises:
+        ValueError: If a field is not part of the response model.
+    """
+    if not fields:
+        return None
+    _requested = {_field.strip() for _field in fields.split(",") if _field.strip()}
+    _unknown = _requested - set(model.model_fields)
+    if _unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(_unknown))}")
+    return [_field for _field in model.model_fields if _field in _requested]
+
+
+def fields_projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """Builds the MongoDB projection for a sparse fieldset; `_id` is always returned.
+
+    Args:
+        fields (Optional[List[str]], required): Response field names, or None for all.
+
+    Returns:
+        Optional[Dict[str, int]]: Inclusion projection, or None to fetch whole documents.
+    """
+    if fields is None:
+        return None
+    _projection = dict(ID_ONLY_PROJECTION)
+    _projection.update({_field: 1 for _field in fields if _field != "id"})
+    return _projection
+
+
+def project_document(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Applies a top-level projection to a document already in memory, e.g. a cached model's dump.
+
+    Args:
+        doc        (Dict[str, Any]          , required): Whole document.
+        projection (Optional[Dict[str, Any]], required): Inclusion or exclusion projection, or None for all.
+
+    Returns:
+        Dict[str, Any]: The fields the same projection returns from the database.
+    """
+    if not projection:
+        return dict(doc)
+    _include_id = bool(projection.get("_id", 1))
+    _fields = {_field: _flag for _field, _flag in projection.items() if _field != "_id"}
+    if any(_fields.values()) or not _fields:
+        _projected = {_field: doc[_field] for _field, _flag in _fields.items() if _flag and _field in doc}
+        if _include_id and "_id" in doc:
+            _projected = {"_id": doc["_id"], **_projected}
+        return _projected
+    return {
+        _field: _value for _field, _value in doc.items()
+        if _field not in _fields and (_include_id or _field != "_id")
+    }
+
+
+def select_fields(content: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Reduces a rendered response to the requested fields.
+
+    Args:
+        content (Dict[str, Any]     , required): Rendered response.
+        fields  (Optional[List[str]], required): Response field names, or None for all.
+
+    Returns:
+        Dict[str, Any]: Response with only the requested fields.
+    """
+    if fields is None:
+        return content
+    return {_field: content[_field] for _field in fields}
+
+
+__all__ = [
+    "ID_ONLY_PROJECTION",
+    "parse_fields",
+    "fields_projection",
+    "project_document",
+    "select_fields",
+]
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from ..core.repository import Repository
+from .pagination import MAX_PAGE_SIZE
+
+
+def parse_object_id(value: Optional[str]) -> Optional[ObjectId]:
+    """Parses a document ID received from a client.
+
+    Args:
+        value (Optional[str], required): Hex encoded ObjectId.
+
+    Returns:
+        Optional[ObjectId]: Parsed ID, or None if it is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def split_ids(ids: str, max_ids: int = MAX_PAGE_SIZE) -> List[str]:
+    """Splits a comma-separated `?ids=` parameter, dropping blanks and repeats.
+
+    Args:
+        ids     (str, required): Comma-separated IDs.
+        max_ids (int, optional): Largest number of distinct IDs accepted.
+
+    Returns:
+        List[str]: Distinct IDs in the order they were given.
+
+    Raises:
+        ValueError: If no IDs or more than `max_ids` IDs are given.
+    """
+    _ids = list(dict.fromkeys(_id.strip() for _id in ids.split(",") if _id.strip()))
+    if not _ids:
+        raise ValueError("No ids given")
+    if len(_ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids can be requested at once")
+    return _ids
+
+
+async def find_by_ids(
+    collection: Repository,
+    ids: List[str],
+    projection: Optional[Dict[str, int]] = None,
+    key: str = "_id",
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Fetches documents matching a list of IDs with one `$in` query.
+
+    Args:
+        collection (Repository              , required): Collection to query.
+        ids        (List[str]               , required): IDs in the order results are wanted.
+        projection (Optional[Dict[str, int]], optional): Projection applied to the query.
+        key        (str                     , optional): Field the IDs are matched against.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], List[str]]: Documents in input order and the IDs that matched nothing.
+    """
+    _parsed = {_id: parse_object_id(_id) for _id in ids}
+    _wanted = [_obj_id for _obj_id in _parsed.values() if _obj_id is not None]
+    if projection is not None and key != "_id":
+        projection = {**projection, key: 1}
+    _found: Dict[ObjectId, Dict[str, Any]] = {}
+    if _wanted:
+        async for _doc in collection.find({key: {"$in": _wanted}}, projection):
+            _found[_doc[key]] = _doc
+    _docs = [_found[_obj_id] for _obj_id in _parsed.values() if _obj_id in _found]
+    _missing = [_id for _id, _obj_id in _parsed.items() if _obj_id not in _found]
+    return _docs, _missing
+
+
+__all__ = [
+    "parse_object_id",
+    "split_ids",
+    "find_by_ids",
+]
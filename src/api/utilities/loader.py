@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Set, Tuple, TypeVar
+
+from .pagination import MAX_PAGE_SIZE
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Loaders created in this process, keyed by name
+_loaders: Dict[str, "BatchLoader"] = {}
+
+
+class BatchLoader(Generic[K, V]):
+    """Coalesces concurrent lookups by key into batched queries (single-flight + DataLoader).
+
+    Concurrent loads of the same key share one in-flight future, and distinct keys
+    requested within the same event-loop tick are fetched together with one call to
+    `load_many`, so backend load grows with the number of distinct keys rather than
+    with the request rate.
+
+    Args:
+        name           (str     , required): Name the loader is reported under.
+        load_many      (Callable, required): Async function fetching `Dict[K, V]` for a list of keys;
+            keys missing from the result resolve to None.
+        max_batch_size (int     , optional): Largest number of keys per call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load_many: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        max_batch_size: int = MAX_PAGE_SIZE,
+    ):
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.loads = 0
+        self.coalesced = 0
+        self.batches = 0
+        self._load_many = load_many
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[K, asyncio.Future] = {}
+        self._queue: List[Tuple[K, asyncio.Future]] = []
+        self._tasks: Set[asyncio.Task] = set()
+        _loaders[name] = self
+
+    async def load(self, key: K) -> Optional[V]:
+        """Returns the value for a key, joining an in-flight load of it if there is one."""
+        _loop = asyncio.get_running_loop()
+        if _loop is not self._loop:
+            # Futures are bound to their loop; start over when it changes
+            self._loop = _loop
+            self._inflight = {}
+            self._queue = []
+        self.loads += 1
+        _future = self._inflight.get(key)
+        if _future is not None:
+            self.coalesced += 1
+        else:
+            _future = _loop.create_future()
+            self._inflight[key] = _future
+            if not self._queue:
+                _loop.call_soon(self._dispatch)
+            self._queue.append((key, _future))
+        # Shield the shared future so one cancelled caller does not fail the others
+        return await asyncio.shield(_future)
+
+    def forget(self, key: K) -> None:
+        """Detaches an in-flight load so later loads of the key issue a fresh query.
+
+        Call after writing a key, so readers that arrive after the write do not
+        receive a value fetched before it.
+        """
+        self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns load and batch counters."""
+        return {
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "inflight": len(self._inflight),
+        }
+
+    def _dispatch(self) -> None:
+        _batch, self._queue = self._queue, []
+        for _start in range(0, len(_batch), self.max_batch_size):
+            # Keep a reference so the task is not garbage collected mid-flight
+            _task = asyncio.ensure_future(self._run(_batch[_start:_start + self.max_batch_size]))
+            self._tasks.add(_task)
+            _task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[K, asyncio.Future]]) -> None:
+        self.batches += 1
+        try:
+            _values = await self._load_many([_key for _key, _ in batch])
+        except Exception as e:
+            for _key, _future in batch:
+                self._settle(_key, _future)
+                if not _future.done():
+                    _future.set_exception(e)
+            return
+        for _key, _future in batch:
+            self._settle(_key, _future)
+            if not _future.done():
+                _future.set_result(_values.get(_key))
+
+    def _settle(self, key: K, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+
+def loader_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns the counters of every loader, keyed by loader name."""
+    return {name: loader.stats() for name, loader in _loaders.items()}
+
+
+__all__ = [
+    "BatchLoader",
+    "loader_stats",
+]
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from bson.errors import InvalidBSON
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encodes sort key values into an opaque pagination cursor.
+
+    Args:
+        values (List[Any], required): Sort key values of the last document on a page.
+
+    Returns:
+        str: URL-safe opaque cursor.
+    """
+    _raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(_raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decodes an opaque pagination cursor back into sort key values.
+
+    Args:
+        cursor (str, required): Cursor previously returned by `encode_cursor`.
+
+    Returns:
+        List[Any]: Sort key values.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        _padded = cursor + "=" * (-len(cursor) % 4)
+        _values = json_util.loads(base64.urlsafe_b64decode(_padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, InvalidBSON):
+        raise ValueError("Invalid cursor")
+    if not isinstance(_values, list):
+        raise ValueError("Invalid cursor")
+    return _values
+
+
+def keyset_filter(query: Dict[str, Any], after: Optional[str]) -> Dict[str, Any]:
+    """Extends a query so it only matches documents after the cursor (ordered by `_id`).
+
+    Args:
+        query (Dict[str, Any], required): Base MongoDB filter.
+        after (Optional[str], required): Cursor of the previous page, if any.
+
+    Returns:
+        Dict[str, Any]: MongoDB filter for the next page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if not after:
+        return query
+    _values = decode_cursor(after)
+    if len(_values) != 1:
+        raise ValueError("Invalid cursor")
+    return {**query, "_id": {"$gt": _values[0]}}
+
+
+def split_page(docs: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Splits `limit + 1` fetched documents into a page and the cursor of the next one.
+
+    Args:
+        docs  (List[Dict[str, Any]], required): Documents fetched with `limit + 1`.
+        limit (int                 , required): Requested page size.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]]: Page documents and next cursor, if any.
+    """
+    if len(docs) <= limit:
+        return docs, None
+    _page = docs[:limit]
+    return _page, encode_cursor([_page[-1]["_id"]])
+
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "MAX_PAGE_SIZE",
+    "encode_cursor",
+    "decode_cursor",
+    "keyset_filter",
+    "split_page",
+]
@@ -1,8 +1,161 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional, TypeVar
+
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
+from prometheus_client import Histogram
 from pydantic import validate_call, SecretStr
-from fastapi.concurrency import run_in_threadpool
+
+from ..core.database import settings
+
+
+T = TypeVar("T")
+
+# Shared hasher; PasswordHasher is stateless and thread-safe
+_password_hasher = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism,
+)
+
+# Argon2 latency as seen by callers, including time queued for a hashing thread
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds",
+    "Argon2 hash and verify latency, including queueing",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class PasswordCheck(NamedTuple):
+    """Outcome of verifying a password."""
+
+    is_match: bool
+    needs_rehash: bool
+
+
+class HashQueueFullError(RuntimeError):
+    """Raised when the hashing executor cannot accept more work."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class HashExecutor:
+    """Dedicated thread pool for Argon2 work with a bounded wait queue.
+
+    Argon2 is memory-hard and releases the GIL, so it runs on its own threads
+    instead of the shared anyio pool; callers beyond `max_workers + max_queue`
+    are rejected immediately with `HashQueueFullError`.
+
+    A call holds its slot until its thread work is done, not until its caller stops
+    waiting: a cancelled caller (e.g. a disconnected client) frees the slot at once
+    only if the work had not started, so `in_flight` always bounds the pool's queue.
+
+    Args:
+        max_workers (int, required): Threads hashing concurrently.
+        max_queue   (int, required): Calls allowed to wait for a thread.
+        retry_after (int, required): Seconds suggested to rejected callers.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, retry_after: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Slots are released from the hashing threads
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a hashing thread."""
+        return max(0, self.in_flight - self.max_workers)
+
+    def _release(self, started: float, future: Future) -> None:
+        _elapsed = time.perf_counter() - started
+        with self._lock:
+            self.in_flight -= 1
+            if not future.cancelled():
+                self.total_seconds += _elapsed
+                self.max_seconds = max(self.max_seconds, _elapsed)
+        if not future.cancelled():
+            password_hash_duration.observe(_elapsed)
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Runs `func(*args)` on the hashing pool.
+
+        Raises:
+            HashQueueFullError: If the wait queue is full.
+        """
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HashQueueFullError(self.retry_after)
+            self.in_flight += 1
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="argon2")
+        try:
+            _future = self._executor.submit(func, *args)
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        _future.add_done_callback(functools.partial(self._release, time.perf_counter()))
+        try:
+            # Cancelling the wait also cancels the work if it is still queued
+            _result = await asyncio.wrap_future(_future)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return _result
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns queue depth, outcome and latency counters."""
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+        }
+
+    def shutdown(self) -> None:
+        """Stops the hashing threads without blocking; the pool is recreated on next use.
+
+        Queued hashes are cancelled and running ones finish in the background, so the
+        event loop calling this is never held up by Argon2 work.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hash_executor = HashExecutor(
+    settings.hash_workers or os.cpu_count() or 1,
+    settings.hash_max_queue,
+    settings.hash_retry_after_seconds,
+)
 
 
 @validate_call
@@ -19,13 +172,12 @@ def hash(
     Returns:
         str: Hashed password.
     """
-    _ph = PasswordHasher()
     _seasoned_password = (
         password.get_secret_value()
         + password_salt.get_secret_value()
         + password_pepper.get_secret_value()
     )
-    _hash_password = _ph.hash(_seasoned_password)
+    _hash_password = _password_hasher.hash(_seasoned_password)
     return _hash_password
 
 
@@ -47,14 +199,13 @@ def verify(
     Returns:
         bool: True if password is match, False otherwise.
     """
-    _ph = PasswordHasher()
     _seasoned_password = (
         password.get_secret_value()
         + password_salt.get_secret_value()
         + password_pepper.get_secret_value()
     )
     try:
-        _ph.verify(hashed_password, _seasoned_password)
+        _password_hasher.verify(hashed_password, _seasoned_password)
         return True
     except VerifyMismatchError:
         return False
@@ -73,8 +224,11 @@ async def async_hash(
     
     Returns:
         str: Hashed password.
+
+    Raises:
+        HashQueueFullError: If the hashing executor is saturated.
     """
-    _hash_password: str = await run_in_threadpool(
+    _hash_password: str = await hash_executor.run(
         hash, password, password_salt, password_pepper
     )
     return _hash_password
@@ -97,16 +251,183 @@ async def async_verify(
     
     Returns:
         bool: True if password is match, False otherwise.
+
+    Raises:
+        HashQueueFullError: If the hashing executor is saturated.
     """
-    _is_match: bool = await run_in_threadpool(
+    _is_match: bool = await hash_executor.run(
         verify, hashed_password, password, password_salt, password_pepper
     )
     return _is_match
 
 
+# Throwaway hash and salt verified for unknown accounts, made with the current parameters
+_dummy_credentials: Dict[str, str] = {}
+
+
+async def _get_dummy_credentials() -> Dict[str, str]:
+    if not _dummy_credentials:
+        _salt = os.urandom(16).hex()
+        _hash = await async_hash(SecretStr(os.urandom(16).hex()), SecretStr(_salt), settings.password_pepper)
+        _dummy_credentials.update(hash=_hash, salt=_salt)
+    return _dummy_credentials
+
+
+async def warm_up_hashing() -> None:
+    """Runs one throwaway hash so Argon2 and a hashing thread are loaded before the first request.
+
+    The hash is kept for `async_verify_dummy`.
+
+    Raises:
+        HashQueueFullError: If the hashing executor is saturated.
+    """
+    await _get_dummy_credentials()
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Checks whether a hash was made with other parameters than the configured ones.
+    
+    Args:
+        hashed_password (str, required): Hashed password.
+    
+    Returns:
+        bool: True if the password should be hashed again.
+    """
+    return _password_hasher.check_needs_rehash(hashed_password)
+
+
+def verify_with_rehash(
+    hashed_password: str,
+    password: SecretStr,
+    password_salt: SecretStr,
+    password_pepper: SecretStr,
+) -> PasswordCheck:
+    """Verifies password and reports whether its hash uses outdated parameters.
+    
+    Args:
+        hashed_password (str      , required): Hashed password.
+        password        (SecretStr, required): Raw password to verify.
+        password_salt   (SecretStr, required): Salt to verify password with.
+        password_pepper (SecretStr, required): Pepper to verify password with.
+    
+    Returns:
+        PasswordCheck: Whether the password matches and whether it needs a rehash.
+    """
+    _is_match = verify(hashed_password, password, password_salt, password_pepper)
+    return PasswordCheck(_is_match, _is_match and needs_rehash(hashed_password))
+
+
+@validate_call
+async def async_verify_with_rehash(
+    hashed_password: str,
+    password: SecretStr,
+    password_salt: SecretStr,
+    password_pepper: SecretStr,
+) -> PasswordCheck:
+    """Async verifies password and reports whether its hash uses outdated parameters.
+    
+    Args:
+        hashed_password (str      , required): Hashed password.
+        password        (SecretStr, required): Raw password to verify.
+        password_salt   (SecretStr, required): Salt to verify password with.
+        password_pepper (SecretStr, required): Pepper to verify password with.
+    
+    Returns:
+        PasswordCheck: Whether the password matches and whether it needs a rehash.
+
+    Raises:
+        HashQueueFullError: If the hashing executor is saturated.
+    """
+    _check: PasswordCheck = await hash_executor.run(
+        verify_with_rehash, hashed_password, password, password_salt, password_pepper
+    )
+    return _check
+
+
+async def async_verify_dummy(password: SecretStr) -> PasswordCheck:
+    """Verifies a password against a throwaway hash, taking as long as a real check.
+
+    Used when the account does not exist, so response times do not reveal which do.
+
+    Args:
+        password (SecretStr, required): Raw password to verify.
+
+    Returns:
+        PasswordCheck: Never a match.
+
+    Raises:
+        HashQueueFullError: If the hashing executor is saturated.
+    """
+    _dummy = await _get_dummy_credentials()
+    await async_verify_with_rehash(_dummy["hash"], password, SecretStr(_dummy["salt"]), settings.password_pepper)
+    return PasswordCheck(is_match=False, needs_rehash=False)
+
+
+def _measure_hash_ms(time_cost: int, memory_cost: int, parallelism: int, samples: int) -> float:
+    _hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    _timings = []
+    for _ in range(samples):
+        _started = time.perf_counter()
+        _hasher.hash("calibration-password")
+        _timings.append((time.perf_counter() - _started) * 1000)
+    return sorted(_timings)[len(_timings) // 2]
+
+
+def calibrate(
+    target_ms: float,
+    max_memory_cost: int = 65536,
+    parallelism: Optional[int] = None,
+    samples: int = 3,
+) -> Dict[str, Any]:
+    """Benchmarks Argon2 on this host and picks cost parameters for a latency budget.
+
+    Memory is kept as high as allowed (halved only if even one pass is too slow),
+    then passes are added while a hash still fits in `target_ms`.
+    
+    Args:
+        target_ms       (float, required): Latency budget for one hash in milliseconds.
+        max_memory_cost (int  , optional): Upper bound for memory in KiB.
+        parallelism     (int  , optional): Lanes; defaults to the CPU count.
+        samples         (int  , optional): Hashes timed per candidate (median is used).
+    
+    Returns:
+        Dict[str, Any]: `time_cost`, `memory_cost`, `parallelism` and measured `latency_ms`.
+    """
+    _parallelism = parallelism or os.cpu_count() or 1
+    _min_memory = 8 * _parallelism
+    _memory = max(max_memory_cost, _min_memory)
+    _time_cost = 1
+    _latency = _measure_hash_ms(_time_cost, _memory, _parallelism, samples)
+    while _latency > target_ms and _memory // 2 >= _min_memory:
+        _memory //= 2
+        _latency = _measure_hash_ms(_time_cost, _memory, _parallelism, samples)
+    while True:
+        _next_latency = _measure_hash_ms(_time_cost + 1, _memory, _parallelism, samples)
+        if _next_latency > target_ms:
+            break
+        _time_cost += 1
+        _latency = _next_latency
+    return {
+        "time_cost": _time_cost,
+        "memory_cost": _memory,
+        "parallelism": _parallelism,
+        "latency_ms": round(_latency, 2),
+    }
+
+
 __all__ = [
+    "HashQueueFullError",
+    "HashExecutor",
+    "hash_executor",
     "hash",
     "verify",
     "async_hash",
     "async_verify",
+    "warm_up_hashing",
+    "PasswordCheck",
+    "needs_rehash",
+    "verify_with_rehash",
+    "async_verify_with_rehash",
+    "async_verify_dummy",
+    "calibrate",
 ]
\ No newline at end of file
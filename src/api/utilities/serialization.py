@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serializes content to JSON bytes, writing ObjectIds as hex strings.
+
+    Datetimes are written natively by orjson in ISO 8601 format.
+
+    Args:
+        content (Any, required): Dicts, lists and scalars, possibly containing ObjectIds.
+
+    Returns:
+        bytes: JSON document.
+    """
+    return orjson.dumps(content, default=_default)
+
+
+class DocumentResponse(Response):
+    """JSON response rendered straight from MongoDB values, skipping model validation."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+__all__ = [
+    "dumps",
+    "DocumentResponse",
+]
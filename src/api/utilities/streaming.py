@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from typing import Any, AsyncIterator, Callable, Dict
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from .serialization import dumps
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def accepts_ndjson(request: Request) -> bool:
+    """Checks whether the client asked for a newline-delimited JSON stream.
+
+    Args:
+        request (Request, required): Incoming request.
+
+    Returns:
+        bool: True if the `Accept` header lists `application/x-ndjson`.
+    """
+    _accept = request.headers.get("accept", "")
+    return any(
+        _media_range.split(";", 1)[0].strip().lower() == NDJSON_MEDIA_TYPE
+        for _media_range in _accept.split(",")
+    )
+
+
+def ndjson_response(
+    documents: AsyncIterator[Dict[str, Any]],
+    render: Callable[[Dict[str, Any]], Dict[str, Any]],
+) -> StreamingResponse:
+    """Streams documents as newline-delimited JSON, one line per document as it arrives.
+
+    Args:
+        documents (AsyncIterator[Dict[str, Any]]          , required): Raw MongoDB documents.
+        render    (Callable[[Dict[str, Any]], Dict[str, Any]], required): Maps a document to its API shape.
+
+    Returns:
+        StreamingResponse: Response writing one JSON document per line.
+    """
+    async def _lines() -> AsyncIterator[bytes]:
+        async for _document in documents:
+            yield dumps(render(_document)) + b"\n"
+
+    return StreamingResponse(_lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+__all__ = [
+    "NDJSON_MEDIA_TYPE",
+    "accepts_ndjson",
+    "ndjson_response",
+]
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import NamedTuple, Optional
+
+from pydantic import SecretStr
+
+
+class TokenClaims(NamedTuple):
+    """Claims carried by a session token."""
+
+    user_id: str
+    expires_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _sign(payload: bytes, secret: SecretStr) -> bytes:
+    _digest = hmac.new(secret.get_secret_value().encode("utf-8"), payload, hashlib.sha256).digest()
+    return _b64encode(_digest).encode("ascii")
+
+
+def issue_token(user_id: str, secret: SecretStr, ttl_seconds: int) -> str:
+    """Issues a compact HMAC-SHA256 signed session token.
+
+    Args:
+        user_id     (str      , required): Authenticated user ID.
+        secret      (SecretStr, required): Signing key.
+        ttl_seconds (int      , required): Seconds until the token expires.
+
+    Returns:
+        str: Token in the form `<payload>.<signature>`.
+    """
+    _claims = {"sub": user_id, "exp": int(time.time()) + ttl_seconds}
+    _payload = _b64encode(json.dumps(_claims, separators=(",", ":")).encode("utf-8"))
+    return f"{_payload}.{_sign(_payload.encode('ascii'), secret).decode('ascii')}"
+
+
+def verify_token(token: str, secret: SecretStr) -> Optional[TokenClaims]:
+    """Checks a token's signature and expiry without any database lookup.
+
+    Args:
+        token  (str      , required): Token from `issue_token`.
+        secret (SecretStr, required): Signing key.
+
+    Returns:
+        Optional[TokenClaims]: Claims if the token is authentic and unexpired, None otherwise.
+    """
+    # Tokens are base64url text; anything else (e.g. Latin-1 header bytes) is just invalid
+    try:
+        _token = token.encode("ascii")
+    except UnicodeError:
+        return None
+    _payload, _, _signature = _token.partition(b".")
+    if not _payload or not _signature:
+        return None
+    if not hmac.compare_digest(_signature, _sign(_payload, secret)):
+        return None
+    try:
+        _claims = json.loads(_b64decode(_payload))
+        _user_id, _expires_at = str(_claims["sub"]), int(_claims["exp"])
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        return None
+    if _expires_at <= time.time():
+        return None
+    return TokenClaims(_user_id, _expires_at)
+
+
+__all__ = [
+    "TokenClaims",
+    "issue_token",
+    "verify_token",
+]
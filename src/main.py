@@ -1,20 +1,102 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
+import time
+from contextlib import asynccontextmanager
+
+_import_started = time.perf_counter()
 
 # Add src directory to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
+from api.core import close_client, ensure_indexes, get_database, job_queue, ping_database, settings
+from api.endpoints.post.counters import counter_buffer
+from api.health import readiness, router as health_router, startup_timings
+from api.metrics import MetricsMiddleware, router as metrics_router
 from api.router import router
+from api.utilities import HashQueueFullError, event_broker, event_relay, hash_executor, warm_up_hashing
+
+startup_timings.record("import", time.perf_counter() - _import_started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the worker up before it reports ready, so the first requests pay no setup costs."""
+    # Each worker process opens its own MongoDB client here, on its own event loop,
+    # and pre-opens the minimum pool size with concurrent pings
+    with startup_timings.phase("connect"):
+        _database = get_database()
+        await ping_database(_database, settings.mongodb_min_pool_size)
+
+    # Ensure the indexes declared by the service modules
+    with startup_timings.phase("indexes"):
+        await ensure_indexes(_database)
+
+    # Load Argon2 and start a hashing thread ahead of the first login
+    with startup_timings.phase("argon2"):
+        await warm_up_hashing()
+
+    with startup_timings.phase("background"):
+        # Start the write-behind vote counter buffer
+        if settings.vote_buffer_enabled:
+            await counter_buffer.start()
+
+        # Start the background job workers
+        await job_queue.start()
+
+        # Relay comment events between workers when MongoDB offers change streams
+        await event_relay.start(_database)
+
+    readiness.mark_ready()
+    startup_timings.log()
+
+    yield
 
+    # Take the worker out of rotation before draining
+    readiness.mark_stopping()
 
-app = FastAPI(title="Rest Redirect Chat API")
+    # End any event streams still open and stop relaying
+    event_broker.close_all()
+    await event_relay.stop()
+
+    await job_queue.stop()
+
+    # Persist buffered vote counters before exiting
+    if settings.vote_buffer_enabled:
+        await counter_buffer.stop()
+
+    hash_executor.shutdown()
+
+    # Close the worker's MongoDB connections
+    close_client()
+
+
+app = FastAPI(title="Rest Redirect Chat API", lifespan=lifespan)
 
 app.include_router(router)
 
+# Liveness and readiness probes
+app.include_router(health_router)
+
+# Prometheus metrics, labelled by route template
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+
+@app.exception_handler(HashQueueFullError)
+async def hash_queue_full_handler(request: Request, exc: HashQueueFullError) -> JSONResponse:
+    """Shed load when password hashing is saturated."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8081)
\ No newline at end of file
+    uvicorn.run(app, host=settings.server_host, port=settings.server_port)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Maintenance commands.
+
+Usage:
+    python src/manage.py ensure-indexes
+    python src/manage.py check-indexes
+    python src/manage.py backfill-scores
+    python src/manage.py calibrate-argon2 [--target-ms 250] [--max-memory-mib 64]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.dirname(__file__))
+
+from api.core import ensure_indexes, find_collection_scans, get_collection, get_database
+from api.utilities import calibrate
+import api.router  # noqa: F401  (imports the service modules, which declare their indexes)
+
+
+async def _ensure_indexes(args: argparse.Namespace) -> int:
+    for collection, names in (await ensure_indexes(get_database())).items():
+        print(f"{collection}: {', '.join(names)}")
+    return 0
+
+
+async def _check_indexes(args: argparse.Namespace) -> int:
+    scans = await find_collection_scans(get_database())
+    for scan in scans:
+        print(f"COLLSCAN {scan['collection']} filter={scan['filter']} sort={scan['sort']} stages={scan['stages']}")
+    if not scans:
+        print("All registered query shapes are index-backed.")
+    return 1 if scans else 0
+
+
+async def _backfill_scores(args: argparse.Namespace) -> int:
+    # Posts written before the score was stored have none, or only the votes cast since;
+    # every score is recomputed, and those already right are not counted as modified
+    result = await get_collection("posts").update_many(
+        {},
+        [{"$set": {"score": {"$subtract": [{"$ifNull": ["$upvotes", 0]}, {"$ifNull": ["$downvotes", 0]}]}}}]
+    )
+    print(f"posts: set the score of {result.modified_count}")
+    return 0
+
+
+async def _calibrate_argon2(args: argparse.Namespace) -> int:
+    result = calibrate(args.target_ms, args.max_memory_mib * 1024, args.parallelism)
+    print(f"# Median hash latency: {result['latency_ms']} ms (target {args.target_ms} ms)")
+    print(f"ARGON2_TIME_COST={result['time_cost']}")
+    print(f"ARGON2_MEMORY_COST={result['memory_cost']}")
+    print(f"ARGON2_PARALLELISM={result['parallelism']}")
+    return 0
+
+
+COMMANDS = {
+    "ensure-indexes": _ensure_indexes,
+    "check-indexes": _check_indexes,
+    "backfill-scores": _backfill_scores,
+    "calibrate-argon2": _calibrate_argon2,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rest Redirect Chat maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--target-ms", type=float, default=250.0, help="calibrate-argon2: latency budget per hash")
+    parser.add_argument("--max-memory-mib", type=int, default=64, help="calibrate-argon2: memory cap per hash")
+    parser.add_argument("--parallelism", type=int, default=None, help="calibrate-argon2: lanes (default: CPU count)")
+    args = parser.parse_args()
+    return asyncio.run(COMMANDS[args.command](args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
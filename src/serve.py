@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Production server: runs the API in several uvicorn worker processes.
+
+Workers default to one per CPU core and use uvloop and httptools when they are
+installed. Each worker imports the app afresh and opens its own MongoDB client
+in the app lifespan, so no connection is shared across processes.
+
+Usage:
+    python src/serve.py [--host 0.0.0.0] [--port 8081] [--workers 4]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.dirname(__file__))
+
+import uvicorn
+
+from api.core import MEMORY_BACKEND, settings
+
+
+def _implementation(module: str) -> str:
+    """Names `module` as the uvicorn implementation if installed, otherwise "auto"."""
+    return module if importlib.util.find_spec(module) is not None else "auto"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers, help="defaults to the CPU count")
+    parser.add_argument("--access-log", action="store_true", default=settings.server_access_log)
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    if settings.storage_backend == MEMORY_BACKEND and workers > 1:
+        print(f"warning: each of the {workers} workers gets its own in-memory store", file=sys.stderr)
+
+    uvicorn.run(
+        "main:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=_implementation("uvloop"),
+        http=_implementation("httptools"),
+        access_log=args.access_log,
+        timeout_keep_alive=settings.server_timeout_keep_alive,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import uuid
+
+import pytest
+
+# Import the application packages the way src/main.py does
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# Run against the in-memory store, so no database server is needed
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user_id(client) -> str:
+    """ID of a new user; the store is shared by the whole session, so every name is unique."""
+    name = uuid.uuid4().hex[:12]
+    response = client.post("/api/users", json={"username": name, "email": f"{name}@example.com", "password": "password1"})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from api.endpoints.post.service import get_post_by_id, get_post_document, post_cache
+from api.endpoints.user.service import get_user_by_id, get_user_document, user_cache
+from api.utilities import ID_ONLY_PROJECTION, fields_projection, with_version_fields
+
+
+PROJECTIONS = [None, ID_ONLY_PROJECTION, with_version_fields(fields_projection(["id", "title", "username"]))]
+
+
+def miss_then_hit(cache, load, get_document, id, projection):
+    async def read():
+        cache.invalidate(ObjectId(id))
+        miss = await get_document(id, projection)
+        assert cache.get(ObjectId(id)) is None
+        await load(id)
+        assert cache.get(ObjectId(id)) is not None
+        return miss, await get_document(id, projection)
+
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize("projection", PROJECTIONS)
+def test_cached_user_document_is_projected_like_a_stored_one(user_id, projection):
+    miss, hit = miss_then_hit(user_cache, get_user_by_id, get_user_document, user_id, projection)
+    assert hit == miss
+    if projection is None:
+        assert "password" not in hit and "password_salt" not in hit
+
+
+@pytest.mark.parametrize("projection", PROJECTIONS + [{"comment_id": 1}])
+def test_cached_post_document_is_projected_like_a_stored_one(client, user_id, projection):
+    post_id = client.post("/api/posts", json={"user_id": user_id, "title": "cached"}).json()["id"]
+    miss, hit = miss_then_hit(post_cache, get_post_by_id, get_post_document, post_id, projection)
+    assert hit == miss
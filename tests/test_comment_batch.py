@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from pymongo.errors import BulkWriteError
+
+from api.endpoints.post.service import posts_collection
+
+
+def test_comments_whose_post_link_fails_are_reported_and_removed(client, user_id, monkeypatch):
+    post_ids = [client.post("/api/posts", json={"user_id": user_id, "title": f"post {i}"}).json()["id"] for i in range(3)]
+    bulk_write = posts_collection.bulk_write
+
+    async def fail_second_link(requests, **kwargs):
+        await bulk_write([requests[0], requests[2]], **kwargs)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "Document failed validation"}]})
+
+    monkeypatch.setattr(posts_collection, "bulk_write", fail_second_link)
+    response = client.post("/api/comments:batch", json={"items": [
+        {"user_id": user_id, "post_id": post_id, "title": "comment"} for post_id in post_ids
+    ]})
+    monkeypatch.undo()
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["created"], body["failed"]) == (2, 1)
+    assert body["results"][1]["error"] == "Document failed validation"
+    # The unlinked comment is gone, so the post can still get one
+    assert client.get(f"/api/posts/{post_ids[1]}/comment").status_code == 404
+    retry = client.post("/api/comments:batch", json={"items": [{"user_id": user_id, "post_id": post_ids[1], "title": "retry"}]})
+    assert retry.json()["created"] == 1
+    assert client.get(f"/api/posts/{post_ids[0]}/comment").status_code == 200
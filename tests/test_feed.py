@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from bson import ObjectId
+
+from api.endpoints.post.service import posts_collection
+from api.utilities import encode_cursor
+
+
+def read_feed(client, path, **params):
+    titles, after = [], None
+    while True:
+        response = client.get(path, params={**params, **({"after": after} if after else {})})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        titles += [item["title"] for item in page["items"]]
+        after = page["next_cursor"]
+        if after is None:
+            return titles
+
+
+def test_score_feed_pages_through_posts_without_a_stored_score(client, user_id):
+    post_ids = [client.post("/api/posts", json={"user_id": user_id, "title": f"post {i}"}).json()["id"] for i in range(6)]
+
+    async def unset_scores():
+        for post_id in post_ids[:3]:
+            await posts_collection.update_one({"_id": ObjectId(post_id)}, {"$unset": {"score": ""}})
+
+    asyncio.run(unset_scores())
+    assert client.post(f"/api/posts/{post_ids[4]}/downvote", json={"user_id": user_id}).status_code == 200
+
+    # Stored scores first, then posts not yet backfilled, each newest first
+    assert read_feed(client, f"/api/users/{user_id}/feed", sort="score", limit=2) == [
+        "post 5", "post 3", "post 4", "post 2", "post 1", "post 0",
+    ]
+
+
+def test_score_feed_rejects_a_cursor_with_an_operator(client):
+    after = encode_cursor([{"$ne": None}, ObjectId()])
+    assert client.get("/api/feed", params={"sort": "score", "after": after}).status_code == 400
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.utilities import HashExecutor
+
+
+def test_shutdown_cancels_queued_work_without_waiting_for_running_work():
+    executor = HashExecutor(1, 1, 1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        executor.shutdown()
+        assert time.perf_counter() - started < 0.5
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert executor.in_flight == 1
+        release.set()
+        assert await running is True
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+    assert (executor.in_flight, executor.completed, executor.cancelled) == (0, 1, 1)
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+import argparse
+import asyncio
+
+from bson import ObjectId
+
+import manage
+from api.endpoints.post.service import posts_collection
+
+
+def test_backfill_scores_recomputes_missing_and_stale_scores(client, user_id):
+    post_ids = [client.post("/api/posts", json={"user_id": user_id, "title": f"post {i}"}).json()["id"] for i in range(3)]
+
+    async def backfill():
+        await posts_collection.update_one({"_id": ObjectId(post_ids[0])}, {"$unset": {"score": ""}})
+        await posts_collection.update_one({"_id": ObjectId(post_ids[1])}, {"$set": {"upvotes": 4, "downvotes": 1, "score": 1}})
+        assert await manage._backfill_scores(argparse.Namespace()) == 0
+        return [(await posts_collection.find_one({"_id": ObjectId(post_id)}))["score"] for post_id in post_ids]
+
+    assert asyncio.run(backfill()) == [0, 3, 0]
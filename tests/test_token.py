@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import pytest
+from pydantic import SecretStr
+
+from api.utilities import issue_token, verify_token
+
+
+SECRET = SecretStr("test-secret")
+
+
+def test_round_trip():
+    claims = verify_token(issue_token("user-1", SECRET, 60), SECRET)
+    assert claims is not None
+    assert claims.user_id == "user-1"
+
+
+def test_expired_token_is_rejected():
+    assert verify_token(issue_token("user-1", SECRET, -1), SECRET) is None
+
+
+def test_tampered_signature_is_rejected():
+    payload, _, _ = issue_token("user-1", SECRET, 60).partition(".")
+    forged, _, _ = issue_token("user-2", SECRET, 60).partition(".")
+    _, _, signature = issue_token("user-1", SECRET, 60).partition(".")
+    assert verify_token(f"{forged}.{signature}", SECRET) is None
+    assert verify_token(f"{payload}.{signature}", SECRET) is not None
+
+
+@pytest.mark.parametrize("token", ["", ".", "abc", "abc.", ".abc", "not.base64!", "\xe9.\xe9", "é.sig", "a.☃"])
+def test_malformed_or_non_ascii_token_is_rejected(token):
+    assert verify_token(token, SECRET) is None